@@ -1,21 +1,60 @@
 import os
 import subprocess
 from ..base_module_adapter import BaseModuleAdapter
+from .transcription_queue import TranscriptionQueue
+from ...core.audio_utils import to_float32
 
 class FasterWhisperAdapter(BaseModuleAdapter):
     def __init__(self):
         self.model = None
+        self.queue = None
         self.status = "Idle"
         self.model_name = "None"
+        self.options = {"beam_size": 5, "vad_filter": False}
+        self.compute_type = None
+        self.batched = False
 
     def load(self, config):
+        self.unload()
         self.status = "Loading"
         model_size = config.get("model", "base")
         device = "cuda" if config.get("gpu_layers", 0) > 0 else "cpu"
-        
+        compute_type = config.get("compute_type", "auto")
+        if compute_type == "auto":
+            compute_type = "float16" if device == "cuda" else "int8"
+        num_workers = max(1, int(config.get("workers", 2)))
+        batch_size = int(config.get("batch_size", 8))
+
         try:
             from faster_whisper import WhisperModel
-            self.model = WhisperModel(model_size, device=device, compute_type="float16" if device == "cuda" else "int8")
+            # num_workers lets that many transcribe() calls run at once; split the cores between them
+            cpu_threads = max(1, (os.cpu_count() or 4) // num_workers)
+            model = WhisperModel(
+                model_size, device=device, compute_type=compute_type,
+                num_workers=num_workers, cpu_threads=cpu_threads
+            )
+            pipeline = None
+            if batch_size > 1:
+                try:
+                    from faster_whisper import BatchedInferencePipeline
+                    pipeline = BatchedInferencePipeline(model=model)
+                except ImportError:
+                    print("⚠️ faster-whisper has no BatchedInferencePipeline (needs >= 1.1), decoding unbatched")
+
+            def transcribe(audio, options):
+                # The batched pipeline splits long audio on VAD boundaries and decodes the chunks together
+                if pipeline and options.get("vad_filter"):
+                    return pipeline.transcribe(audio, batch_size=batch_size, **options)
+                return model.transcribe(audio, **options)
+
+            self.model = model
+            self.queue = TranscriptionQueue(transcribe, num_workers=num_workers)
+            self.options = {
+                "beam_size": int(config.get("beam_size", 5)),
+                "vad_filter": bool(config.get("silence_detection", False))
+            }
+            self.compute_type = compute_type
+            self.batched = pipeline is not None
             self.model_name = model_size
             self.status = "Running"
             return True
@@ -23,17 +62,71 @@ class FasterWhisperAdapter(BaseModuleAdapter):
             self.status = f"Error: {str(e)}"
             return False
 
+    def _options(self, params):
+        options = dict(self.options)
+        for key in ("beam_size", "vad_filter"):
+            if key in params:
+                options[key] = params[key]
+        return options
+
     def generate(self, audio_path, params):
         if not self.model: return "Error: Model not loaded"
         try:
-            segments, info = self.model.transcribe(audio_path, beam_size=5)
-            return " ".join([segment.text for segment in segments]).strip()
+            return self.queue.transcribe(audio_path, self._options(params))
+        except Exception as e:
+            return f"Error: {str(e)}"
+
+    async def agenerate(self, audio_path, params):
+        if not self.model: return "Error: Model not loaded"
+        try:
+            return await self.queue.atranscribe(audio_path, self._options(params))
+        except Exception as e:
+            return f"Error: {str(e)}"
+
+    async def agenerate_stream(self, audio, params):
+        """Yields segment texts as they decode; audio is a file path or 16 kHz mono PCM."""
+        if not self.model:
+            yield "Error: Model not loaded"
+            return
+        if not isinstance(audio, str):
+            audio = to_float32(audio)
+        try:
+            async for text in self.queue.astream(audio, self._options(params)):
+                yield text
+        except Exception as e:
+            yield f"Error: {str(e)}"
+
+    def transcribe_pcm(self, pcm, params):
+        """Transcribes 16 kHz mono PCM (int16 or float32 NumPy array) without touching disk."""
+        if not self.model: return "Error: Model not loaded"
+        try:
+            return self.queue.transcribe(to_float32(pcm), self._options(params))
+        except Exception as e:
+            return f"Error: {str(e)}"
+
+    async def atranscribe_pcm(self, pcm, params):
+        # Waits on the request queue; decoding happens in its worker threads
+        if not self.model: return "Error: Model not loaded"
+        try:
+            return await self.queue.atranscribe(to_float32(pcm), self._options(params))
         except Exception as e:
             return f"Error: {str(e)}"
 
     def unload(self):
+        if self.queue:
+            self.queue.stop()
+        self.queue = None
         self.model = None
         self.status = "Idle"
 
     def get_status(self):
-        return {"status": self.status, "model": self.model_name}
+        status = {"status": self.status, "model": self.model_name}
+        if self.queue:
+            status.update({
+                "compute_type": self.compute_type,
+                "batched": self.batched,
+                "beam_size": self.options["beam_size"],
+                "vad_filter": self.options["vad_filter"],
+                "queue": self.queue.get_status()
+            })
+        return status
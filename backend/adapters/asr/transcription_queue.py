@@ -0,0 +1,116 @@
+import time
+import queue
+import asyncio
+import threading
+from concurrent.futures import Future
+
+class QueueFullError(Exception):
+    pass
+
+
+class TranscriptionQueue:
+    """
+    Request queue in front of one loaded model. Worker threads each run a whole
+    transcription, so concurrent requests decode in parallel (CTranslate2 releases the
+    GIL) instead of serializing on the model. Segments are handed back as they decode.
+    """
+
+    def __init__(self, transcribe_fn, num_workers=1, max_pending=32):
+        # transcribe_fn(audio, options) -> (segment iterator, info), as WhisperModel.transcribe
+        self.transcribe_fn = transcribe_fn
+        self.requests = queue.Queue(maxsize=max_pending)
+        self.workers = []
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_latency = 0.0
+        self.lock = threading.Lock()
+        for i in range(max(1, int(num_workers))):
+            worker = threading.Thread(target=self._run, name=f"asr-worker-{i}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def submit(self, audio, options, on_segment=None):
+        """Queues a transcription; returns a Future with the joined text. on_segment(text) sees each segment."""
+        future = Future()
+        try:
+            self.requests.put_nowait((audio, options, on_segment, future, time.perf_counter()))
+        except queue.Full:
+            raise QueueFullError("Transcription queue is full")
+        return future
+
+    def transcribe(self, audio, options):
+        return self.submit(audio, options).result()
+
+    async def atranscribe(self, audio, options):
+        return await asyncio.wrap_future(self.submit(audio, options))
+
+    async def astream(self, audio, options):
+        """Yields segment texts as the worker decodes them."""
+        loop = asyncio.get_running_loop()
+        segments = asyncio.Queue()
+        put = lambda text: loop.call_soon_threadsafe(segments.put_nowait, text)
+        future = self.submit(audio, options, put)
+        future.add_done_callback(lambda _: put(None))
+        while True:
+            text = await segments.get()
+            if text is None:
+                break
+            yield text
+        future.result() # Re-raise decoding errors
+
+    def stop(self):
+        # Fail whatever is still waiting, then let each worker exit after its current request
+        while True:
+            try:
+                request = self.requests.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None and request[3].set_running_or_notify_cancel():
+                request[3].set_exception(RuntimeError("Model unloaded"))
+        for _ in self.workers:
+            self.requests.put(None)
+        self.workers = []
+
+    def _run(self):
+        while True:
+            request = self.requests.get()
+            if request is None:
+                return
+            audio, options, on_segment, future, queued_at = request
+            if not future.set_running_or_notify_cancel():
+                continue
+            with self.lock:
+                self.active += 1
+            try:
+                segments, info = self.transcribe_fn(audio, options)
+                texts = []
+                # The segment iterator is lazy: decoding happens while we walk it
+                for segment in segments:
+                    text = segment.text.strip()
+                    if not text:
+                        continue
+                    texts.append(text)
+                    if on_segment:
+                        on_segment(text)
+                future.set_result(" ".join(texts))
+                with self.lock:
+                    self.completed += 1
+                    self.total_latency += time.perf_counter() - queued_at
+            except Exception as e:
+                future.set_exception(e)
+                with self.lock:
+                    self.failed += 1
+            finally:
+                with self.lock:
+                    self.active -= 1
+
+    def get_status(self):
+        return {
+            "workers": len(self.workers),
+            "active": self.active,
+            "pending": self.requests.qsize(),
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_latency_s": round(self.total_latency / self.completed, 3) if self.completed else None
+        }
@@ -1,11 +1,127 @@
+import asyncio
 import os
 import wave
 import json
+import threading
+from contextlib import contextmanager
 from ..base_module_adapter import BaseModuleAdapter
+from ...core.audio_utils import TARGET_RATE, to_int16
+
+# 4000 frames of 16-bit audio per AcceptWaveform step
+CHUNK_BYTES = 8000
+
+class RecognizerPool:
+    """
+    Idle KaldiRecognizers kept per (sample rate, grammar). Building one, and especially
+    compiling a grammar into it, costs more than decoding a short command, so they are
+    Reset() and reused instead.
+    """
+
+    def __init__(self, model, max_idle=4):
+        self.model = model
+        self.max_idle = max_idle
+        self.idle = {}
+        self.created = 0
+        self.reused = 0
+        self.lock = threading.Lock()
+
+    def acquire(self, sample_rate=TARGET_RATE, grammar=None):
+        """Returns (key, recognizer); hand both back to release()."""
+        key = (int(sample_rate), tuple(grammar) if grammar else None)
+        with self.lock:
+            free = self.idle.get(key)
+            if free:
+                self.reused += 1
+                return key, free.pop()
+            self.created += 1
+        from vosk import KaldiRecognizer
+        if key[1]:
+            return key, KaldiRecognizer(self.model, key[0], json.dumps(list(key[1])))
+        return key, KaldiRecognizer(self.model, key[0])
+
+    def release(self, key, rec):
+        try:
+            rec.Reset()
+        except Exception:
+            return # Older vosk without Reset(): drop it rather than reuse stale state
+        with self.lock:
+            free = self.idle.setdefault(key, [])
+            if len(free) < self.max_idle:
+                free.append(rec)
+
+    @contextmanager
+    def borrow(self, sample_rate=TARGET_RATE, grammar=None):
+        key, rec = self.acquire(sample_rate, grammar)
+        try:
+            yield rec
+        finally:
+            self.release(key, rec)
+
+    def get_status(self):
+        return {
+            "idle": sum(len(free) for free in self.idle.values()),
+            "created": self.created,
+            "reused": self.reused
+        }
+
+
+def recognize(rec, data, on_partial=None):
+    """Runs raw S16_LE bytes through a recognizer; on_partial(text) sees the transcript so far."""
+    parts = []
+    last_partial = None
+    view = memoryview(data)
+    for i in range(0, len(view), CHUNK_BYTES):
+        if rec.AcceptWaveform(bytes(view[i:i + CHUNK_BYTES])):
+            parts.append(json.loads(rec.Result()).get("text", ""))
+            partial = ""
+        elif on_partial:
+            partial = json.loads(rec.PartialResult()).get("partial", "")
+        else:
+            continue
+        if on_partial:
+            text = " ".join(p for p in parts + [partial] if p)
+            if text and text != last_partial:
+                last_partial = text
+                on_partial(text)
+    parts.append(json.loads(rec.FinalResult()).get("text", ""))
+    return " ".join(p for p in parts if p).strip()
+
+
+class VoskStream:
+    """Incremental recognition on one KaldiRecognizer; partials come straight from Kaldi."""
+
+    def __init__(self, recognizer, release=None):
+        self.rec = recognizer
+        self.release = release
+        self.parts = []
+
+    def accept(self, pcm):
+        """Feeds 16 kHz mono PCM; returns the transcript so far (final segments + current partial)."""
+        if self.rec.AcceptWaveform(to_int16(pcm).tobytes()):
+            self.parts.append(json.loads(self.rec.Result()).get("text", ""))
+            partial = ""
+        else:
+            partial = json.loads(self.rec.PartialResult()).get("partial", "")
+        return " ".join(p for p in self.parts + [partial] if p) or None
+
+    def finish(self):
+        try:
+            self.parts.append(json.loads(self.rec.FinalResult()).get("text", ""))
+        finally:
+            self.close()
+        return " ".join(p for p in self.parts if p).strip()
+
+    def close(self):
+        """Hands the recognizer back to its pool; safe to call more than once."""
+        if self.release:
+            self.release(self.rec)
+            self.release = None
+
 
 class VoskAdapter(BaseModuleAdapter):
     def __init__(self):
         self.model = None
+        self.pool = None
         self.status = "Idle"
         self.model_name = "None"
 
@@ -15,15 +131,16 @@ class VoskAdapter(BaseModuleAdapter):
         if not model_name:
             self.status = "Error: No model specified"
             return False
-            
+
         try:
             from vosk import Model, KaldiRecognizer
             model_path = os.path.join("vosk_models", model_name)
             if not os.path.exists(model_path):
                 self.status = f"Error: {model_name} not found"
                 return False
-                
+
             self.model = Model(model_path)
+            self.pool = RecognizerPool(self.model)
             self.model_name = model_name
             self.status = "Running"
             return True
@@ -34,28 +151,48 @@ class VoskAdapter(BaseModuleAdapter):
     def generate(self, audio_path, params):
         if not self.model: return "Error: Model not loaded"
         try:
-            from vosk import KaldiRecognizer
-            wf = wave.open(audio_path, "rb")
-            rec = KaldiRecognizer(self.model, wf.getframerate())
-            
-            result = ""
-            while True:
-                data = wf.readframes(4000)
-                if len(data) == 0:
-                    break
-                if rec.AcceptWaveform(data):
-                    res = json.loads(rec.Result())
-                    result += res.get("text", "") + " "
-            
-            res = json.loads(rec.FinalResult())
-            result += res.get("text", "")
-            return result.strip()
+            with wave.open(audio_path, "rb") as wf:
+                sample_rate = wf.getframerate()
+                data = wf.readframes(wf.getnframes())
+            with self.pool.borrow(sample_rate, params.get("grammar")) as rec:
+                return recognize(rec, data, params.get("on_partial"))
         except Exception as e:
             return f"Error: {str(e)}"
 
+    def transcribe_pcm(self, pcm, params):
+        """
+        Transcribes mono PCM without touching disk: an int16/float32 NumPy array, or raw
+        S16_LE bytes at params["sample_rate"] (default 16 kHz).
+        params["grammar"] restricts recognition to a phrase list (add "[unk]" to allow rejects);
+        params["on_partial"] is called with the transcript so far as it grows.
+        """
+        if not self.model: return "Error: Model not loaded"
+        try:
+            data = pcm if isinstance(pcm, (bytes, bytearray, memoryview)) else to_int16(pcm).tobytes()
+            sample_rate = params.get("sample_rate", TARGET_RATE)
+            with self.pool.borrow(sample_rate, params.get("grammar")) as rec:
+                return recognize(rec, data, params.get("on_partial"))
+        except Exception as e:
+            return f"Error: {str(e)}"
+
+    def create_stream(self, params):
+        """A streaming recognizer for 16 kHz mono PCM pushed as it is captured."""
+        if not self.model: raise RuntimeError("Model not loaded")
+        pool = self.pool
+        key, rec = pool.acquire(TARGET_RATE, params.get("grammar"))
+        return VoskStream(rec, lambda r: pool.release(key, r))
+
+    async def atranscribe_pcm(self, pcm, params):
+        # In-process and CPU-bound: keep it off the event loop
+        return await asyncio.to_thread(self.transcribe_pcm, pcm, params)
+
     def unload(self):
         self.model = None
+        self.pool = None
         self.status = "Idle"
 
     def get_status(self):
-        return {"status": self.status, "model": self.model_name}
+        status = {"status": self.status, "model": self.model_name}
+        if self.pool:
+            status["recognizers"] = self.pool.get_status()
+        return status
@@ -1,8 +1,11 @@
 import subprocess
+import asyncio
 import os
 import tempfile
 import shutil
 from ..base_module_adapter import BaseModuleAdapter
+from .whisper_server import WhisperServer, find_whisper_server
+from ...core.audio_utils import pcm_to_wav_bytes
 
 class WhisperAdapter(BaseModuleAdapter):
     def __init__(self):
@@ -25,6 +28,10 @@ class WhisperAdapter(BaseModuleAdapter):
         if not os.path.exists(self.model_path):
             self.model_path = os.path.join(self.whisper_cpp_path, "models", default_model)
 
+        # Resident server keeps the model loaded; the CLI reloads it on every request
+        self.mode = "cli"
+        self.server = None
+
     def load(self, config):
         # Refresh binary path
         search_paths = [
@@ -55,46 +62,129 @@ class WhisperAdapter(BaseModuleAdapter):
                 self.status = f"Error: {model_name} not found"
                 return False
         
+        self._stop_server()
+        self.mode = "cli"
+        server_path = find_whisper_server(self.whisper_cpp_path)
+        if config.get("asr_mode", "server") == "server" and server_path:
+            server = WhisperServer(server_path, port=int(config.get("asr_port", 8178)))
+            if server.start(self.model_path, threads=config.get("cpu_threads", 4)):
+                self.server = server
+                self.mode = "server"
+            else:
+                print("⚠️ whisper.cpp server failed to start, falling back to whisper-cli")
+        
         self.status = "Running"
         return True
 
+    def _stop_server(self):
+        if self.server:
+            self.server.stop()
+            self.server = None
+
     def unload(self):
+        self._stop_server()
+        self.mode = "cli"
         self.status = "Idle"
 
     def generate(self, wav_path, params):
+        if self.server and self.server.is_running():
+            try:
+                return self.server.transcribe(wav_path)
+            except Exception as e:
+                print(f"⚠️ whisper.cpp server request failed, using whisper-cli: {e}")
+
+        return self._transcribe_cli(wav_path, params)
+
+    def _cli_command(self, wav_path, params):
+        return [
+            self.cli_path,
+            "-m", self.model_path,
+            "-f", wav_path,
+            "-t", str(params.get("threads", 4)),
+            "-otxt",
+            "-nt",
+            "-np" # No prints (suppress progress)
+        ]
+
+    def _cli_result(self, wav_path, returncode, stdout, stderr):
+        if returncode != 0:
+            print(f"❌ Whisper transcription failed (code {returncode}): {stderr}")
+            return f"Error: {stderr}"
+
+        txt_path = wav_path + ".txt"
+        
+        if os.path.exists(txt_path):
+            with open(txt_path, "r") as tf:
+                text = tf.read().strip()
+            os.remove(txt_path)
+            return text
+        
+        return stdout.strip()
+
+    def _transcribe_cli(self, wav_path, params):
         try:
-            command = [
-                self.cli_path,
-                "-m", self.model_path,
-                "-f", wav_path,
-                "-t", str(params.get("threads", 4)),
-                "-otxt",
-                "-nt",
-                "-np" # No prints (suppress progress)
-            ]
-            
+            command = self._cli_command(wav_path, params)
             print(f"🎙️ Running Whisper transcription: {' '.join(command)}")
             result = subprocess.run(command, capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                print(f"❌ Whisper transcription failed (code {result.returncode}): {result.stderr}")
-                return f"Error: {result.stderr}"
+            return self._cli_result(wav_path, result.returncode, result.stdout, result.stderr)
+        except Exception as e:
+            print(f"❌ Whisper adapter exception: {e}")
+            return f"Error: {e}"
 
-            txt_path = wav_path + ".txt"
-            
-            if os.path.exists(txt_path):
-                with open(txt_path, "r") as tf:
-                    text = tf.read().strip()
-                os.remove(txt_path)
-                return text
-            
-            return result.stdout.strip()
+    async def _atranscribe_cli(self, wav_path, params):
+        try:
+            command = self._cli_command(wav_path, params)
+            print(f"🎙️ Running Whisper transcription: {' '.join(command)}")
+            process = await asyncio.create_subprocess_exec(
+                *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            )
+            stdout, stderr = await process.communicate()
+            return self._cli_result(wav_path, process.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace"))
         except Exception as e:
             print(f"❌ Whisper adapter exception: {e}")
             return f"Error: {e}"
 
+    def transcribe_pcm(self, pcm, params):
+        """Transcribes 16 kHz mono PCM (int16 or float32 NumPy array)."""
+        wav_bytes = pcm_to_wav_bytes(pcm)
+        if self.server and self.server.is_running():
+            try:
+                return self.server.transcribe_bytes(wav_bytes)
+            except Exception as e:
+                print(f"⚠️ whisper.cpp server request failed, using whisper-cli: {e}")
+
+        # whisper-cli only reads files
+        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
+            tmp.write(wav_bytes)
+            wav_path = tmp.name
+        try:
+            return self._transcribe_cli(wav_path, params)
+        finally:
+            if os.path.exists(wav_path): os.remove(wav_path)
+
+    async def atranscribe_pcm(self, pcm, params):
+        """Async transcribe_pcm(): HTTP to the resident server, or whisper-cli as an async subprocess."""
+        wav_bytes = pcm_to_wav_bytes(pcm)
+        if self.server and self.server.is_running():
+            try:
+                return await self.server.atranscribe_bytes(wav_bytes)
+            except Exception as e:
+                print(f"⚠️ whisper.cpp server request failed, using whisper-cli: {e}")
+
+        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
+            tmp.write(wav_bytes)
+            wav_path = tmp.name
+        try:
+            return await self._atranscribe_cli(wav_path, params)
+        finally:
+            if os.path.exists(wav_path): os.remove(wav_path)
+
     def get_status(self):
-        return {
+        status = {
             "status": self.status,
-            "model": os.path.basename(self.model_path)
+            "model": os.path.basename(self.model_path),
+            "mode": self.mode
         }
+        if self.server:
+            status["port"] = self.server.port
+        return status
@@ -0,0 +1,105 @@
+import subprocess
+import os
+import platform
+import signal
+import shutil
+from ...core.http_utils import create_session, create_async_client, close_async_client
+from ...core.server_readiness import ServerWatcher
+
+def find_whisper_server(whisper_cpp_path):
+    search_paths = [
+        shutil.which("whisper-server"),
+        os.path.join(whisper_cpp_path, "build", "bin", "whisper-server"),
+        os.path.join(whisper_cpp_path, "build", "bin", "server"),
+    ]
+    return next((p for p in search_paths if p and os.path.exists(p)), None)
+
+
+class WhisperServer:
+    """A resident whisper.cpp server that keeps the ggml model loaded between requests."""
+
+    def __init__(self, server_path, port=8178):
+        self.server_path = server_path
+        self.port = port
+        self.server_process = None
+        self.model_path = None
+        self.load_metrics = {}
+        self.session = None
+        self.aclient = None
+
+    def start(self, model_path, threads=4):
+        self.stop()
+        self.model_path = model_path
+        self.session = create_session()
+        self.aclient = create_async_client(timeout=(3.05, 60))
+
+        command = [
+            self.server_path,
+            "-m", model_path,
+            "-t", str(threads),
+            "--host", "127.0.0.1",
+            "--port", str(self.port)
+        ]
+        print(f"🚀 Launching whisper.cpp server: {' '.join(command)}")
+
+        self.server_process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            preexec_fn=os.setsid if platform.system() == "Linux" else None,
+        )
+
+        watcher = ServerWatcher(self.server_process, name="whisper.cpp server")
+        # Builds without /health only start listening once the model is loaded
+        ready = watcher.wait_ready(self.session, f"http://127.0.0.1:{self.port}/health", timeout=30, ok_statuses=(200, 404))
+        self.load_metrics = watcher.metrics
+        if ready:
+            return True
+
+        self.stop()
+        return False
+
+    def is_running(self):
+        return self.server_process is not None and self.server_process.poll() is None
+
+    def transcribe(self, wav_path):
+        with open(wav_path, "rb") as f:
+            return self.transcribe_bytes(f.read())
+
+    def transcribe_bytes(self, wav_bytes):
+        response = self.session.post(
+            f"http://127.0.0.1:{self.port}/inference",
+            files={"file": ("audio.wav", wav_bytes, "audio/wav")},
+            data={"response_format": "json", "temperature": "0.0"},
+            timeout=60
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"whisper.cpp server returned {response.status_code}: {response.text}")
+        return response.json().get("text", "").strip()
+
+    async def atranscribe_bytes(self, wav_bytes):
+        response = await self.aclient.post(
+            f"http://127.0.0.1:{self.port}/inference",
+            files={"file": ("audio.wav", wav_bytes, "audio/wav")},
+            data={"response_format": "json", "temperature": "0.0"}
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"whisper.cpp server returned {response.status_code}: {response.text}")
+        return response.json().get("text", "").strip()
+
+    def stop(self):
+        if self.server_process:
+            try:
+                if platform.system() == "Windows":
+                    self.server_process.terminate()
+                else:
+                    os.killpg(os.getpgid(self.server_process.pid), signal.SIGTERM)
+            except: pass
+            self.server_process = None
+        # The adapter builds a new WhisperServer on every reload, so don't leave pooled connections behind
+        if self.session:
+            self.session.close()
+            self.session = None
+        if self.aclient:
+            close_async_client(self.aclient)
+            self.aclient = None
@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 
 class BaseModuleAdapter(ABC):
@@ -16,6 +17,18 @@ class BaseModuleAdapter(ABC):
         """Process input and return output."""
         pass
 
+    def generate_stream(self, input_data, params):
+        """Yield output incrementally. Defaults to a single chunk from generate()."""
+        yield self.generate(input_data, params)
+
+    async def agenerate(self, input_data, params):
+        """Async generate(). In-process engines are CPU-bound, so they default to a worker thread."""
+        return await asyncio.to_thread(self.generate, input_data, params)
+
+    async def agenerate_stream(self, input_data, params):
+        """Async generate_stream(). Defaults to a single chunk from agenerate()."""
+        yield await self.agenerate(input_data, params)
+
     @abstractmethod
     def get_status(self):
         """Return current status and metadata."""
@@ -1,12 +1,20 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable
 
 class BaseKnowledgeAdapter(ABC):
+    def load(self, config: Dict[str, Any]):
+        """Apply provider settings. Keyword-only stores need none."""
+        return True
+
     @abstractmethod
     def ingest(self, source: str, content: Any, metadata: Dict[str, Any] = None):
         """Chunk and index content into the vector store."""
         pass
 
+    def ingest_stream(self, source: str, pieces: Iterable[str], metadata: Dict[str, Any] = None):
+        """Ingest text that arrives in pieces. Defaults to buffering it for ingest()."""
+        return self.ingest(source, "".join(pieces), metadata)
+
     @abstractmethod
     def retrieve(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
         """Search for relevant context based on the query."""
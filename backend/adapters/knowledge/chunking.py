@@ -0,0 +1,33 @@
+import codecs
+from typing import Iterable, Iterator, BinaryIO
+
+MIN_CHUNK_CHARS = 20
+READ_SIZE = 1024 * 1024
+
+def iter_text(fileobj: BinaryIO, read_size: int = READ_SIZE) -> Iterator[str]:
+    """Decodes a binary file as UTF-8 piece by piece, never holding the whole file in memory."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while True:
+        data = fileobj.read(read_size)
+        if not data:
+            break
+        yield decoder.decode(data)
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+def iter_chunks(pieces: Iterable[str]) -> Iterator[str]:
+    """Splits streamed text into paragraph chunks (blank-line separated)."""
+    buffer = ""
+    for piece in pieces:
+        buffer += piece
+        parts = buffer.split("\n\n")
+        # The last part may continue in the next piece
+        buffer = parts.pop()
+        for part in parts:
+            chunk = part.strip()
+            if len(chunk) > MIN_CHUNK_CHARS:
+                yield chunk
+    chunk = buffer.strip()
+    if len(chunk) > MIN_CHUNK_CHARS:
+        yield chunk
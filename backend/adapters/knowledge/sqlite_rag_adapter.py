@@ -1,72 +1,176 @@
 import sqlite3
-import os
-from typing import List, Dict, Any
+import hashlib
+import re
+import threading
+from typing import List, Dict, Any, Iterable
 from .base_knowledge_adapter import BaseKnowledgeAdapter
+from .chunking import iter_chunks
+
+INSERT_CHUNK = "INSERT INTO knowledge_chunks (source, content, metadata, content_hash) VALUES (?, ?, ?, ?)"
+INSERT_BATCH = 500
+
+# Common words that would match nearly every chunk and drown out BM25 ranking
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from",
+    "how", "i", "in", "is", "it", "me", "my", "of", "on", "or", "please", "tell", "that",
+    "the", "this", "to", "was", "what", "when", "where", "which", "who", "why", "with",
+    "you", "your"
+}
+
+def chunk_hash(content: str) -> str:
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
 
 class SQLiteRAGAdapter(BaseKnowledgeAdapter):
     def __init__(self, db_path="knowledge.db"):
         self.db_path = db_path
+        # One connection per thread, reused across calls
+        self._local = threading.local()
         self._init_db()
         self.status = "Indexed"
 
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            # WAL lets retrieval keep reading while an ingest transaction is writing
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
     def _init_db(self):
-        with sqlite3.connect(self.db_path) as conn:
+        with self._conn() as conn:
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS knowledge_chunks (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     source TEXT,
                     content TEXT,
-                    metadata TEXT
+                    metadata TEXT,
+                    content_hash TEXT
                 )
             """)
-            # Basic Full Text Search if available
-            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS fts_chunks USING fts5(content, content_id UNINDEXED)")
+            columns = [r[1] for r in conn.execute("PRAGMA table_info(knowledge_chunks)")]
+            if "content_hash" not in columns:
+                conn.execute("ALTER TABLE knowledge_chunks ADD COLUMN content_hash TEXT")
+                for chunk_id, content in conn.execute("SELECT id, content FROM knowledge_chunks").fetchall():
+                    conn.execute("UPDATE knowledge_chunks SET content_hash = ? WHERE id = ?", (chunk_hash(content), chunk_id))
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_source ON knowledge_chunks (source)")
+
+            # Full Text Search index; porter stemming lets "run" match "runs".
+            # FTS rowids mirror knowledge_chunks ids so deletes are direct lookups.
+            row = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'fts_chunks'").fetchone()
+            if row and ("porter" not in row[0] or conn.execute(
+                "SELECT 1 FROM fts_chunks WHERE rowid != content_id LIMIT 1"
+            ).fetchone()):
+                # Rebuild indexes created before stemming / rowid mirroring
+                conn.execute("DROP TABLE fts_chunks")
+                row = None
+            if not row:
+                conn.execute("CREATE VIRTUAL TABLE fts_chunks USING fts5(content, content_id UNINDEXED, tokenize='porter unicode61')")
+                conn.execute("INSERT INTO fts_chunks (rowid, content, content_id) SELECT id, content, id FROM knowledge_chunks")
 
     def ingest(self, source: str, content: str, metadata: Dict[str, Any] = None):
-        """Simple ingestion: splits by newline/paragraphs."""
-        chunks = [c.strip() for c in content.split("\n\n") if len(c.strip()) > 20]
-        
-        with sqlite3.connect(self.db_path) as conn:
-            for chunk in chunks:
-                cursor = conn.execute(
-                    "INSERT INTO knowledge_chunks (source, content, metadata) VALUES (?, ?, ?)",
-                    (source, chunk, str(metadata))
-                )
-                chunk_id = cursor.lastrowid
-                conn.execute("INSERT INTO fts_chunks (content, content_id) VALUES (?, ?)", (chunk, chunk_id))
-        return True
+        """Splits by blank lines (paragraphs) and indexes the result."""
+        return self.ingest_stream(source, [content], metadata)
+
+    def ingest_stream(self, source: str, pieces: Iterable[str], metadata: Dict[str, Any] = None):
+        """
+        Incrementally (re)indexes a document from streamed text in one transaction.
+        Chunks whose hash is already stored for this source are kept, new ones are bulk inserted,
+        and chunks that disappeared from the document are removed.
+        """
+        conn = self._conn()
+        stats = {"added": [], "removed": [], "skipped": 0}
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            existing = {}
+            for chunk_id, content_hash in conn.execute(
+                "SELECT id, content_hash FROM knowledge_chunks WHERE source = ?", (source,)
+            ):
+                existing.setdefault(content_hash, []).append(chunk_id)
+
+            # AUTOINCREMENT ids only grow, and the write lock is held, so new rows are > last_id
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM knowledge_chunks").fetchone()[0]
+            meta_str = str(metadata)
+            batch = []
+            for chunk in iter_chunks(pieces):
+                digest = chunk_hash(chunk)
+                if existing.get(digest):
+                    existing[digest].pop()
+                    stats["skipped"] += 1
+                    continue
+                batch.append((source, chunk, meta_str, digest))
+                if len(batch) >= INSERT_BATCH:
+                    conn.executemany(INSERT_CHUNK, batch)
+                    batch = []
+            if batch:
+                conn.executemany(INSERT_CHUNK, batch)
+
+            conn.execute(
+                "INSERT INTO fts_chunks (rowid, content, content_id) SELECT id, content, id FROM knowledge_chunks WHERE id > ?",
+                (last_id,)
+            )
+            stats["added"] = [r[0] for r in conn.execute("SELECT id FROM knowledge_chunks WHERE id > ?", (last_id,))]
+
+            stale = [(chunk_id,) for ids in existing.values() for chunk_id in ids]
+            if stale:
+                conn.executemany("DELETE FROM knowledge_chunks WHERE id = ?", stale)
+                conn.executemany("DELETE FROM fts_chunks WHERE rowid = ?", stale)
+                stats["removed"] = [chunk_id for (chunk_id,) in stale]
+        return stats
 
     def retrieve(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
-        """Keyword-based retrieval using SQLite FTS."""
+        """Keyword-based retrieval ranked by SQLite FTS5 BM25."""
+        match_query = self._build_match_query(query)
+        if not match_query:
+            return []
+
         results = []
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                # Fallback simple LIKE if FTS fails or for demo
+            with self._conn() as conn:
+                # bm25() is lower-is-better, so negate it for a higher-is-better score
                 cursor = conn.execute("""
-                    SELECT source, content FROM knowledge_chunks 
-                    WHERE content LIKE ? LIMIT ?
-                """, (f"%{query}%", top_k))
+                    SELECT k.id, k.source, k.content, -bm25(fts_chunks) AS score
+                    FROM fts_chunks
+                    JOIN knowledge_chunks k ON k.id = fts_chunks.content_id
+                    WHERE fts_chunks MATCH ?
+                    ORDER BY bm25(fts_chunks)
+                    LIMIT ?
+                """, (match_query, top_k))
                 
                 for row in cursor:
                     results.append({
-                        "source": row[0],
-                        "content": row[1],
-                        "score": 1.0 # Placeholder score
+                        "id": row[0],
+                        "source": row[1],
+                        "content": row[2],
+                        "score": row[3]
                     })
-        except: pass
+        except sqlite3.OperationalError as e:
+            print(f"⚠️ FTS5 retrieval failed: {e}")
         return results
 
+    @staticmethod
+    def _build_match_query(query: str) -> str:
+        """Turns free text into an FTS5 expression: each term quoted, any term may match."""
+        terms = []
+        for token in re.findall(r"\w+", query.lower()):
+            if len(token) < 2 or token in STOPWORDS or token in terms:
+                continue
+            terms.append(token)
+        # Quoting keeps FTS5 operators (AND, NEAR, *, :) in user text from being parsed
+        return " OR ".join(f'"{t}"' for t in terms)
+
     def get_status(self) -> Dict[str, Any]:
-        with sqlite3.connect(self.db_path) as conn:
-            count = conn.execute("SELECT COUNT(*) FROM knowledge_chunks").fetchone()[0]
+        conn = self._conn()
+        count, documents = conn.execute("SELECT COUNT(*), COUNT(DISTINCT source) FROM knowledge_chunks").fetchone()
         return {
             "status": self.status,
-            "documents": count,
+            "documents": documents,
             "chunks": count,
-            "provider": "SQLite (Keyword Search)"
+            "provider": "SQLite (FTS5 BM25)"
         }
 
     def clear(self):
-        if os.path.exists(self.db_path):
-            os.remove(self.db_path)
-        self._init_db()
+        with self._conn() as conn:
+            conn.execute("DELETE FROM knowledge_chunks")
+            conn.execute("DELETE FROM fts_chunks")
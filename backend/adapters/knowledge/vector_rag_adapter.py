@@ -0,0 +1,273 @@
+import os
+import json
+import time
+import shutil
+import threading
+import numpy as np
+from typing import List, Dict, Any, Iterable
+from .base_knowledge_adapter import BaseKnowledgeAdapter
+from .sqlite_rag_adapter import SQLiteRAGAdapter
+
+# Rows scored per step so int8 -> float32 conversion never materializes the whole matrix
+SCORE_BLOCK_ROWS = 65536
+
+# (vectors, scales, ids, row_of) of an empty index
+EMPTY_INDEX = (None, None, np.zeros(0, dtype=np.int64), {})
+
+class VectorRAGAdapter(BaseKnowledgeAdapter):
+    """
+    Embedding search over the chunks stored by SQLiteRAGAdapter.
+    Vectors live in a contiguous row-major file (float32, or int8 with a per-row scale)
+    that is memory-mapped for queries, and can be fused with the FTS5 BM25 score.
+    Queries read one immutable (vectors, scales, ids, row_of) snapshot, which ingestion
+    replaces in a single assignment, so an upload never tears a running query.
+    """
+
+    def __init__(self, db_path="knowledge.db", index_dir="knowledge_index"):
+        self.store = SQLiteRAGAdapter(db_path)
+        self.db_path = db_path
+        self.index_dir = index_dir
+        self.model_name = "sentence-transformers/all-MiniLM-L6-v2"
+        self.quantize = False
+        self.hybrid_weight = 0.7 # Weight of cosine similarity vs. normalized BM25
+        self.embedder = None
+        self.status = "Indexed"
+        self.query_times = []
+        self.index = EMPTY_INDEX
+        self.lock = threading.Lock() # Guards swapping self.index and creating the embedder
+        self.write_lock = threading.RLock() # One writer (ingest / reindex / reset) at a time
+        self._load_index()
+
+    def load(self, config):
+        model_name = config.get("embedding_model", self.model_name)
+        quantize = bool(config.get("quantize_embeddings", self.quantize))
+        self.hybrid_weight = float(config.get("hybrid_weight", self.hybrid_weight))
+
+        try:
+            with self.write_lock:
+                if model_name != self.model_name or quantize != self.quantize:
+                    # Vectors from another model (or encoding) are not comparable; re-embed everything
+                    with self.lock:
+                        self.model_name = model_name
+                        self.quantize = quantize
+                        self.embedder = None
+                    self._reset_index()
+                # Picks up chunks ingested while another knowledge provider was active
+                self.reindex()
+            self.status = "Indexed"
+            return True
+        except Exception as e:
+            self.status = f"Error: {str(e)}"
+            return False
+
+    # ---------------- Index files ----------------
+
+    def _path(self, name):
+        return os.path.join(self.index_dir, name)
+
+    def _load_index(self):
+        self.meta = {"dim": 0, "count": 0, "dtype": "float32", "model": self.model_name}
+        if os.path.exists(self._path("meta.json")):
+            with open(self._path("meta.json"), "r") as f:
+                self.meta = json.load(f)
+            self.model_name = self.meta.get("model", self.model_name)
+            self.quantize = self.meta.get("dtype") == "int8"
+
+        count, dim = self.meta["count"], self.meta["dim"]
+        index = EMPTY_INDEX
+        if count:
+            # Built completely before it is published
+            dtype = np.int8 if self.quantize else np.float32
+            vectors = np.memmap(self._path("vectors.bin"), dtype=dtype, mode="r", shape=(count, dim))
+            scales = np.fromfile(self._path("scales.f32"), dtype=np.float32) if self.quantize else None
+            ids = np.fromfile(self._path("ids.i64"), dtype=np.int64)
+            index = (vectors, scales, ids, {int(chunk_id): row for row, chunk_id in enumerate(ids)})
+        with self.lock:
+            self.index = index
+
+    def _reset_index(self):
+        with self.write_lock:
+            with self.lock:
+                self.index = EMPTY_INDEX
+            # Queries still holding the old map keep their (unlinked) file until they finish
+            if os.path.exists(self.index_dir):
+                shutil.rmtree(self.index_dir)
+            self.meta = {"dim": 0, "count": 0, "dtype": "int8" if self.quantize else "float32", "model": self.model_name}
+
+    def _append(self, chunk_ids, embeddings):
+        os.makedirs(self.index_dir, exist_ok=True)
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+
+        # Appending leaves the rows already mapped by running queries untouched
+        with open(self._path("vectors.bin"), "ab") as f:
+            if self.quantize:
+                scales = np.maximum(np.abs(embeddings).max(axis=1), 1e-12) / 127.0
+                q = np.round(embeddings / scales[:, None]).astype(np.int8)
+                f.write(q.tobytes())
+                with open(self._path("scales.f32"), "ab") as sf:
+                    sf.write(scales.astype(np.float32).tobytes())
+            else:
+                f.write(embeddings.tobytes())
+        with open(self._path("ids.i64"), "ab") as f:
+            f.write(np.asarray(chunk_ids, dtype=np.int64).tobytes())
+
+        self.meta.update({
+            "dim": int(embeddings.shape[1]),
+            "count": self.meta["count"] + len(chunk_ids),
+            "dtype": "int8" if self.quantize else "float32",
+            "model": self.model_name
+        })
+        with open(self._path("meta.json"), "w") as f:
+            json.dump(self.meta, f)
+        self._load_index()
+
+    # ---------------- Embedding ----------------
+
+    def _embed(self, texts):
+        embedder = self.embedder
+        if embedder is None:
+            with self.lock:
+                if self.embedder is None:
+                    # Local CPU model; normalized outputs make dot product == cosine similarity
+                    from sentence_transformers import SentenceTransformer
+                    self.embedder = SentenceTransformer(self.model_name, device="cpu")
+                embedder = self.embedder
+        return embedder.encode(list(texts), batch_size=32, normalize_embeddings=True, convert_to_numpy=True)
+
+    def _scores(self, index, query_vec):
+        vectors, scales, ids, _ = index
+        scores = np.empty(len(ids), dtype=np.float32)
+        for start in range(0, len(ids), SCORE_BLOCK_ROWS):
+            block = vectors[start:start + SCORE_BLOCK_ROWS]
+            if scales is not None:
+                scores[start:start + len(block)] = (block.astype(np.float32) @ query_vec) * scales[start:start + len(block)]
+            else:
+                scores[start:start + len(block)] = block @ query_vec
+        return scores
+
+    # ---------------- BaseKnowledgeAdapter ----------------
+
+    def ingest(self, source: str, content: str, metadata: Dict[str, Any] = None):
+        return self.ingest_stream(source, [content], metadata)
+
+    def ingest_stream(self, source: str, pieces: Iterable[str], metadata: Dict[str, Any] = None):
+        with self.write_lock:
+            result = self.store.ingest_stream(source, pieces, metadata)
+            if result["removed"]:
+                self._remove(result["removed"])
+            for start in range(0, len(result["added"]), 512):
+                self._index_chunks(result["added"][start:start + 512])
+        return result
+
+    def _index_chunks(self, chunk_ids):
+        placeholders = ",".join("?" * len(chunk_ids))
+        rows = self.store._conn().execute(f"SELECT id, content FROM knowledge_chunks WHERE id IN ({placeholders})", chunk_ids).fetchall()
+        if rows:
+            self._append([r[0] for r in rows], self._embed(r[1] for r in rows))
+
+    def _remove(self, chunk_ids):
+        """Compacts the index without the given chunks (replaced or deleted document content)."""
+        removed = set(chunk_ids)
+        old_vectors, old_scales, old_ids, _ = self.index
+        keep = np.array([int(i) not in removed for i in old_ids], dtype=bool)
+        if keep.all():
+            return
+
+        vectors = np.array(old_vectors[keep]) if old_vectors is not None else None
+        scales = old_scales[keep] if old_scales is not None else None
+        ids = old_ids[keep]
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        # Write side files first and swap them in, so a crash never leaves a torn matrix
+        for name, array in (("vectors.bin", vectors), ("scales.f32", scales), ("ids.i64", ids)):
+            if array is None:
+                continue
+            tmp_path = self._path(name + ".tmp")
+            array.tofile(tmp_path)
+            os.replace(tmp_path, self._path(name))
+        self.meta["count"] = int(len(ids))
+        with open(self._path("meta.json"), "w") as f:
+            json.dump(self.meta, f)
+        self._load_index()
+
+    def reindex(self):
+        """
+        Brings the index in line with the store: drops vectors of chunks deleted or replaced
+        while another provider was active, then embeds every chunk not indexed yet.
+        """
+        with self.write_lock:
+            all_ids = [r[0] for r in self.store._conn().execute("SELECT id FROM knowledge_chunks ORDER BY id")]
+            stored = set(all_ids)
+            stale = [chunk_id for chunk_id in self.index[3] if chunk_id not in stored]
+            if stale:
+                self._remove(stale)
+            row_of = self.index[3]
+            missing = [i for i in all_ids if i not in row_of]
+            for start in range(0, len(missing), 512):
+                self._index_chunks(missing[start:start + 512])
+
+    def retrieve(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
+        # One consistent view of the index for the whole query
+        index = self.index
+        vectors, _, ids, row_of = index
+        if vectors is None:
+            return self.store.retrieve(query, top_k)
+
+        started = time.perf_counter()
+        query_vec = self._embed([query])[0].astype(np.float32)
+        scores = self._scores(index, query_vec)
+
+        # Vectorized top-k over the whole matrix, then fuse with BM25 candidates
+        k = min(len(scores), top_k * 4)
+        top_rows = np.argpartition(-scores, k - 1)[:k]
+        candidates = {int(ids[r]): float(scores[r]) for r in top_rows}
+
+        keyword_hits = self.store.retrieve(query, top_k * 4) if self.hybrid_weight < 1.0 else []
+        max_bm25 = max((h["score"] for h in keyword_hits), default=0.0)
+        bm25 = {h["id"]: (h["score"] / max_bm25 if max_bm25 > 0 else 0.0) for h in keyword_hits}
+        for chunk_id in bm25:
+            if chunk_id not in candidates and chunk_id in row_of:
+                candidates[chunk_id] = float(scores[row_of[chunk_id]])
+
+        fused = {
+            chunk_id: self.hybrid_weight * cos + (1.0 - self.hybrid_weight) * bm25.get(chunk_id, 0.0)
+            for chunk_id, cos in candidates.items()
+        }
+        best = sorted(fused.items(), key=lambda kv: kv[1], reverse=True)[:top_k]
+
+        results = []
+        if best:
+            placeholders = ",".join("?" * len(best))
+            rows = {r[0]: r for r in self.store._conn().execute(
+                f"SELECT id, source, content FROM knowledge_chunks WHERE id IN ({placeholders})",
+                [chunk_id for chunk_id, _ in best]
+            )}
+            for chunk_id, score in best:
+                if chunk_id in rows:
+                    results.append({"id": chunk_id, "source": rows[chunk_id][1], "content": rows[chunk_id][2], "score": score})
+
+        self.query_times = (self.query_times + [(time.perf_counter() - started) * 1000])[-100:]
+        return results
+
+    def get_status(self) -> Dict[str, Any]:
+        status = self.store.get_status()
+        index_bytes = sum(
+            os.path.getsize(self._path(f)) for f in ("vectors.bin", "scales.f32", "ids.i64")
+            if os.path.exists(self._path(f))
+        )
+        status.update({
+            "status": self.status,
+            "provider": f"Vector ({os.path.basename(self.model_name)}) + BM25",
+            "vectors": self.meta["count"],
+            "dimensions": self.meta["dim"],
+            "dtype": self.meta["dtype"],
+            "index_bytes": index_bytes,
+            "last_query_ms": round(self.query_times[-1], 2) if self.query_times else None,
+            "avg_query_ms": round(sum(self.query_times) / len(self.query_times), 2) if self.query_times else None
+        })
+        return status
+
+    def clear(self):
+        with self.write_lock:
+            self.store.clear()
+            self._reset_index()
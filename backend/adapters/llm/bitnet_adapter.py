@@ -1,10 +1,14 @@
 import subprocess
 import os
 import platform
-import time
 import requests
+import httpx
 import signal
 from ..base_module_adapter import BaseModuleAdapter
+from ...core.http_utils import create_session, create_async_client, clients_from_config, DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
+from ...core.server_readiness import ServerWatcher
+from .stream_utils import aiter_sse_json
+from .slot_utils import SlotAffinity, SlotDispatcher, ServerBusyError, read_total_slots
 
 class BitNetAdapter(BaseModuleAdapter):
     def __init__(self):
@@ -12,10 +16,29 @@ class BitNetAdapter(BaseModuleAdapter):
         self.port = 5000
         self.status = "Idle"
         self.model_name = "BitNet b1.58 2B"
+        # Generation endpoint that last worked, tried first from then on
+        self.endpoint = None
+        # Pooled keep-alive connections to the local model server
+        self.session = create_session()
+        self.aclient = create_async_client()
+        self.timeout = (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)
+        # Context size the server is launched with (-c)
+        self.context_window = 1024
+        self.tokenize_supported = True
+        # Session -> server slot, so each conversation keeps reusing its own KV cache
+        self.slots = SlotAffinity()
+        # Concurrent requests -> free slots, with a bounded wait queue
+        self.dispatcher = SlotDispatcher(self.slots)
+        self.parallel_slots = 1
+        # Startup timings from the last load (see ServerWatcher)
+        self.load_metrics = {}
 
     def load(self, config):
         self.status = "Loading"
         self.unload()
+        self.session, self.aclient, self.timeout = clients_from_config(config, self.session, self.aclient)
+        self.endpoint = None
+        self.tokenize_supported = True
         
         root_dir = os.path.join(os.getcwd(), "BitNet")
         server_script = os.path.join(root_dir, "run_inference_server.py")
@@ -30,9 +53,6 @@ class BitNetAdapter(BaseModuleAdapter):
             python_exe = env_path
             print(f"🐍 Using BitNet environment python: {python_exe}")
 
-        # Set port to 5000 as per the user's command example
-        self.port = 5000
-        
         model_name = config.get("model")
         model_path = ""
         
@@ -54,31 +74,42 @@ class BitNetAdapter(BaseModuleAdapter):
         else:
             model_path = model_name or "models/BitNet-b1.58-2B-4T/ggml-model-i2_s.gguf"
 
-        # BitNet is locked to these settings for stability
-        command = [
-            python_exe, server_script,
+        # Verify binary exists to avoid silent failures
+        binary_path = os.path.join(root_dir, "build", "bin", "llama-server")
+        if not os.path.exists(binary_path):
+            print(f"⚠️ Warning: BitNet binary not found at {binary_path}. The server script might fail.")
+
+        # BitNet is locked to these settings for stability; both launch paths get the same ones
+        system_prompt = config.get("system_prompt") or "You are a humorous AI assistant. Respond in exactly one line."
+        settings = [
             "-m", model_path,
             "-t", "2", # Locked to 2 threads
-            "-c", "1024", # Lower context size for stability
             "-n", "512", # Prediction limit
             "--port", str(self.port),
             "--host", "127.0.0.1",
-            "--temperature", "0.8" # Preferred humor temperature
+            "--temp", "0.8", # Preferred humor temperature (the script takes it as a prefix of --temperature)
+            "-p", system_prompt
         ]
-        
-        system_prompt = config.get("system_prompt") or "You are a humorous AI assistant. Respond in exactly one line."
-        command.extend(["-p", system_prompt])
+
+        # The wrapper script can't pass -np, so parallel slots launch the llama-server binary directly
+        self.parallel_slots = max(1, int(config.get("parallel_slots", 1)))
+        if self.parallel_slots > 1 and os.path.exists(binary_path):
+            command = [binary_path] + settings + [
+                "-c", str(self.context_window * self.parallel_slots), # Split across the slots
+                "-np", str(self.parallel_slots),
+                "-cb" # Continuous batching
+            ]
+        else:
+            self.parallel_slots = 1
+            command = [python_exe, server_script] + settings + [
+                "-c", str(self.context_window) # Lower context size for stability
+            ]
         
         print(f"🚀 Launching BitNet server: {' '.join(command)}")
         
-        # Log to a temp file outside BitNet
-        log_path = os.path.join(os.getcwd(), "bitnet_server.log")
+        # Log to a temp file outside BitNet, one per port so resident servers keep their own
+        log_path = os.path.join(os.getcwd(), f"bitnet_server_{self.port}.log")
         log_file = open(log_path, "w")
-        
-        # Verify binary exists to avoid silent failures
-        binary_path = os.path.join(root_dir, "build", "bin", "llama-server")
-        if not os.path.exists(binary_path):
-            print(f"⚠️ Warning: BitNet binary not found at {binary_path}. The server script might fail.")
 
         self.server_process = subprocess.Popen(
             command,
@@ -88,70 +119,181 @@ class BitNetAdapter(BaseModuleAdapter):
             preexec_fn=os.setsid if platform.system() == "Linux" else None,
         )
         
-        # Poll health endpoint - give it more time (60s)
-        for i in range(60):
-            try:
-                res = requests.get(f"http://127.0.0.1:{self.port}/health", timeout=2)
-                if res.status_code == 200:
-                    print(f"✅ BitNet server is up on port {self.port}")
-                    self.status = "Running"
-                    return True
-            except: pass
-            if i % 5 == 0:
-                print(f"⏳ Waiting for BitNet server... ({i}s)")
-            time.sleep(1)
+        # Tails the log file for the server's "listening" line; give it more time (60s)
+        watcher = ServerWatcher(self.server_process, log_path=log_path, name="BitNet server")
+        ready = watcher.wait_ready(self.session, f"http://127.0.0.1:{self.port}/health", timeout=60)
+        self.load_metrics = watcher.metrics
+        if ready:
+            self.dispatcher.reset(
+                read_total_slots(self.session, self.port, default=self.parallel_slots),
+                max_waiting=int(config.get("queue_size", 4 * self.parallel_slots))
+            )
+            self.status = "Running"
+            return True
         
-        self.status = "Error: Startup Timeout"
+        self.status = f"Error: {watcher.error}"
         return False
 
-    def generate(self, prompt, params):
+    def _endpoint_order(self):
         # BitNet llama-server usually uses /completion or /v1/chat/completions
         endpoints = ["/completion", "/v1/chat/completions", "/v1/completions"]
-        
-        data_legacy = {
+        if self.endpoint:
+            endpoints.remove(self.endpoint)
+            endpoints.insert(0, self.endpoint)
+        return endpoints
+
+    def _build_payload(self, endpoint, prompt, params, stream=False):
+        # llama-server extensions: reuse the slot's KV cache for the shared prompt prefix
+        slot = params["id_slot"] if "id_slot" in params else self.slots.slot_for(params.get("session_id"))
+        cache = {"cache_prompt": True, "id_slot": slot}
+        if "v1" in endpoint:
+            return {
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": params.get("max_tokens", 128),
+                "temperature": params.get("temperature", 0.7),
+                "top_p": params.get("top_p", 1.0),
+                "presence_penalty": params.get("frequency_penalty", 0.0),
+                "stream": stream,
+                **cache
+            }
+        return {
             "prompt": prompt,
             "n_predict": params.get("max_tokens", 128),
             "temperature": params.get("temperature", 0.7),
             "top_p": params.get("top_p", 1.0),
             "repeat_penalty": 1.0 + params.get("frequency_penalty", 0.0),
-            "stop": ["User:", "\n\n", "Jarvis:"]
-        }
-        
-        data_v1 = {
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": params.get("max_tokens", 128),
-            "temperature": params.get("temperature", 0.7),
-            "top_p": params.get("top_p", 1.0),
-            "presence_penalty": params.get("frequency_penalty", 0.0)
+            "stop": ["User:", "\n\n", "Jarvis:"],
+            "stream": stream,
+            **cache
         }
 
-        for endpoint in endpoints:
+    def _parse_response(self, res_json):
+        if "content" in res_json:
+            return res_json["content"].strip()
+        if "choices" in res_json:
+            choice = res_json["choices"][0]
+            if "message" in choice:
+                return choice["message"]["content"].strip()
+            if "text" in choice:
+                return choice["text"].strip()
+        return str(res_json)
+
+    def _parse_chunk(self, chunk):
+        """Returns (text, stop) for one streamed SSE event from either endpoint family."""
+        if "content" in chunk:
+            return chunk["content"], bool(chunk.get("stop"))
+        if chunk.get("choices"):
+            choice = chunk["choices"][0]
+            return choice.get("delta", {}).get("content") or choice.get("text"), False
+        return None, False
+
+    def generate(self, prompt, params):
+        for endpoint in self._endpoint_order():
             url = f"http://127.0.0.1:{self.port}{endpoint}"
-            payload = data_v1 if "v1" in endpoint else data_legacy
+            payload = self._build_payload(endpoint, prompt, params)
             
             try:
-                print(f"🔍 Attempting generation at {url}...")
-                response = requests.post(url, json=payload, timeout=60)
+                if endpoint != self.endpoint:
+                    print(f"🔍 Attempting generation at {url}...")
+                response = self.session.post(url, json=payload, timeout=self.timeout)
                 
                 if response.status_code == 200:
-                    res_json = response.json()
-                    if "content" in res_json:
-                        return res_json["content"].strip()
-                    if "choices" in res_json:
-                        choice = res_json["choices"][0]
-                        if "message" in choice:
-                            return choice["message"]["content"].strip()
-                        if "text" in choice:
-                            return choice["text"].strip()
-                    return str(res_json)
+                    self.endpoint = endpoint
+                    return self._parse_response(response.json())
                 
                 print(f"⚠️ Endpoint {endpoint} returned {response.status_code}")
-            except Exception as e:
+            except requests.ConnectionError as e:
+                # The server itself is unreachable; other endpoints will fail the same way
                 print(f"❌ Connection failed to {endpoint}: {e}")
+                break
+            except Exception as e:
+                print(f"❌ Request failed at {endpoint}: {e}")
                 continue
         
         return "Error: All generation endpoints failed (Connection Refused or 404)"
 
+    async def agenerate(self, prompt, params):
+        # Waits for a free server slot; the request is decoded alongside the other slots' requests
+        try:
+            async with self.dispatcher.slot(params.get("session_id")) as slot:
+                return await self._agenerate(prompt, {**params, "id_slot": slot})
+        except ServerBusyError as e:
+            return f"Error: {e}"
+
+    async def agenerate_stream(self, prompt, params):
+        try:
+            async with self.dispatcher.slot(params.get("session_id")) as slot:
+                async for text in self._agenerate_stream(prompt, {**params, "id_slot": slot}):
+                    yield text
+        except ServerBusyError as e:
+            yield f"Error: {e}"
+
+    async def _agenerate(self, prompt, params):
+        for endpoint in self._endpoint_order():
+            url = f"http://127.0.0.1:{self.port}{endpoint}"
+            payload = self._build_payload(endpoint, prompt, params)
+
+            try:
+                if endpoint != self.endpoint:
+                    print(f"🔍 Attempting generation at {url}...")
+                response = await self.aclient.post(url, json=payload)
+
+                if response.status_code == 200:
+                    self.endpoint = endpoint
+                    return self._parse_response(response.json())
+
+                print(f"⚠️ Endpoint {endpoint} returned {response.status_code}")
+            except httpx.ConnectError as e:
+                print(f"❌ Connection failed to {endpoint}: {e}")
+                break
+            except Exception as e:
+                print(f"❌ Request failed at {endpoint}: {e}")
+                continue
+
+        return "Error: All generation endpoints failed (Connection Refused or 404)"
+
+    async def _agenerate_stream(self, prompt, params):
+        for endpoint in self._endpoint_order():
+            url = f"http://127.0.0.1:{self.port}{endpoint}"
+            payload = self._build_payload(endpoint, prompt, params, stream=True)
+
+            try:
+                async with self.aclient.stream("POST", url, json=payload) as response:
+                    if response.status_code != 200:
+                        print(f"⚠️ Endpoint {endpoint} returned {response.status_code}")
+                        continue
+
+                    self.endpoint = endpoint
+                    async for chunk in aiter_sse_json(response):
+                        text, stop = self._parse_chunk(chunk)
+                        if text:
+                            yield text
+                        if stop:
+                            break
+                    return
+            except httpx.ConnectError as e:
+                print(f"❌ Connection failed to {endpoint}: {e}")
+                break
+            except Exception as e:
+                print(f"❌ Request failed at {endpoint}: {e}")
+                continue
+
+        yield "Error: All generation endpoints failed (Connection Refused or 404)"
+
+    async def acount_tokens(self, text):
+        """Exact token count from llama-server's /tokenize; None when unavailable."""
+        if not self.tokenize_supported:
+            return None
+        try:
+            response = await self.aclient.post(f"http://127.0.0.1:{self.port}/tokenize", json={"content": text})
+            if response.status_code == 200:
+                return len(response.json().get("tokens", []))
+            if response.status_code == 404:
+                self.tokenize_supported = False
+        except Exception:
+            pass
+        return None
+
     def unload(self):
         if self.server_process:
             try:
@@ -168,5 +310,7 @@ class BitNetAdapter(BaseModuleAdapter):
         return {
             "status": self.status,
             "model": self.model_name,
-            "port": self.port
+            "port": self.port,
+            "load": self.load_metrics,
+            "slots": self.dispatcher.get_status()
         }
@@ -1,11 +1,13 @@
 import subprocess
 import os
 import platform
-import time
-import requests
 import signal
 import shutil
 from ..base_module_adapter import BaseModuleAdapter
+from ...core.http_utils import create_session, create_async_client, clients_from_config, DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
+from ...core.server_readiness import ServerWatcher
+from .stream_utils import aiter_sse_json
+from .slot_utils import SlotAffinity, SlotDispatcher, ServerBusyError, read_total_slots
 
 class LlamaCppAdapter(BaseModuleAdapter):
     def __init__(self):
@@ -13,10 +15,24 @@ class LlamaCppAdapter(BaseModuleAdapter):
         self.port = 8080
         self.status = "Idle"
         self.model_name = "None"
+        # Pooled keep-alive connections to the local model server
+        self.session = create_session()
+        self.aclient = create_async_client()
+        self.timeout = (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)
+        self.context_window = 2048
+        self.tokenize_supported = True
+        # Session -> server slot, so each conversation keeps reusing its own KV cache
+        self.slots = SlotAffinity()
+        # Concurrent requests -> free slots, with a bounded wait queue
+        self.dispatcher = SlotDispatcher(self.slots)
+        self.parallel_slots = 1
+        # Startup timings from the last load (see ServerWatcher)
+        self.load_metrics = {}
 
     def load(self, config):
         self.status = "Loading"
         self.unload()
+        self.session, self.aclient, self.timeout = clients_from_config(config, self.session, self.aclient)
         
         # Search for llama-server in PATH and local build directory
         search_paths = [
@@ -51,50 +67,66 @@ class LlamaCppAdapter(BaseModuleAdapter):
             return False
 
         self.model_name = os.path.basename(model_path)
+        self.context_window = int(config.get("context_window", 2048))
+        self.tokenize_supported = True
+        # llama-server splits -c across its slots, so each slot still gets the full window
+        self.parallel_slots = max(1, int(config.get("parallel_slots", 1)))
 
         command = [
             server_path,
             "-m", model_path,
             "-t", str(config.get("cpu_threads", 4)),
-            "-c", str(config.get("context_window", 2048)),
+            "-c", str(self.context_window * self.parallel_slots),
+            "-np", str(self.parallel_slots),
+            "-cb", # Continuous batching: slots decode together instead of taking turns
             "-n", str(config.get("max_tokens", 2048)),
             "--port", str(self.port),
             "--host", "127.0.0.1",
             "-ngl", str(config.get("gpu_layers", 0))
         ]
         
+        # Output is piped so the watcher can see the "listening" line and the exit reason
         self.server_process = subprocess.Popen(
             command,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
             preexec_fn=os.setsid if platform.system() == "Linux" else None,
         )
         
-        for _ in range(30):
-            try:
-                res = requests.get(f"http://127.0.0.1:{self.port}/health", timeout=2)
-                if res.status_code == 200:
-                    self.status = "Running"
-                    return True
-            except: pass
-            time.sleep(1)
+        watcher = ServerWatcher(self.server_process, name="llama-server")
+        ready = watcher.wait_ready(self.session, f"http://127.0.0.1:{self.port}/health", timeout=30)
+        self.load_metrics = watcher.metrics
+        if ready:
+            self.dispatcher.reset(
+                read_total_slots(self.session, self.port, default=self.parallel_slots),
+                max_waiting=int(config.get("queue_size", 4 * self.parallel_slots))
+            )
+            self.status = "Running"
+            return True
         
-        self.status = "Error: Startup Timeout"
+        self.status = f"Error: {watcher.error}"
         return False
 
-    def generate(self, prompt, params):
-        url = f"http://127.0.0.1:{self.port}/completion"
-        payload = {
+    def _build_payload(self, prompt, params, stream=False):
+        return {
             "prompt": prompt,
             "n_predict": params.get("max_tokens", 128),
             "temperature": params.get("temperature", 0.7),
             "top_p": params.get("top_p", 1.0),
             "repeat_penalty": 1.0 + params.get("frequency_penalty", 0.0),
-            "stop": ["User:", "\n\n", "Jarvis:"]
+            "stop": ["User:", "\n\n", "Jarvis:"],
+            "stream": stream,
+            # Reuse the slot's KV cache for the shared prompt prefix; only new tokens are prefilled
+            "cache_prompt": True,
+            "id_slot": params["id_slot"] if "id_slot" in params else self.slots.slot_for(params.get("session_id"))
         }
+
+    def generate(self, prompt, params):
+        url = f"http://127.0.0.1:{self.port}/completion"
+        payload = self._build_payload(prompt, params)
         
         try:
-            response = requests.post(url, json=payload, timeout=60)
+            response = self.session.post(url, json=payload, timeout=self.timeout)
             if response.status_code == 200:
                 return response.json().get("content", "").strip()
         except Exception as e:
@@ -102,6 +134,66 @@ class LlamaCppAdapter(BaseModuleAdapter):
         
         return "Error: Generation failed"
 
+    async def agenerate(self, prompt, params):
+        # Waits for a free server slot; the request is decoded alongside the other slots' requests
+        try:
+            async with self.dispatcher.slot(params.get("session_id")) as slot:
+                return await self._agenerate(prompt, {**params, "id_slot": slot})
+        except ServerBusyError as e:
+            return f"Error: {e}"
+
+    async def agenerate_stream(self, prompt, params):
+        try:
+            async with self.dispatcher.slot(params.get("session_id")) as slot:
+                async for text in self._agenerate_stream(prompt, {**params, "id_slot": slot}):
+                    yield text
+        except ServerBusyError as e:
+            yield f"Error: {e}"
+
+    async def _agenerate(self, prompt, params):
+        url = f"http://127.0.0.1:{self.port}/completion"
+        payload = self._build_payload(prompt, params)
+
+        try:
+            response = await self.aclient.post(url, json=payload)
+            if response.status_code == 200:
+                return response.json().get("content", "").strip()
+        except Exception as e:
+            return f"Error: {str(e)}"
+
+        return "Error: Generation failed"
+
+    async def _agenerate_stream(self, prompt, params):
+        url = f"http://127.0.0.1:{self.port}/completion"
+        payload = self._build_payload(prompt, params, stream=True)
+
+        try:
+            async with self.aclient.stream("POST", url, json=payload) as response:
+                if response.status_code != 200:
+                    yield "Error: Generation failed"
+                    return
+                async for chunk in aiter_sse_json(response):
+                    if chunk.get("content"):
+                        yield chunk["content"]
+                    if chunk.get("stop"):
+                        break
+        except Exception as e:
+            yield f"Error: {str(e)}"
+
+    async def acount_tokens(self, text):
+        """Exact token count from llama-server's /tokenize; None when unavailable."""
+        if not self.tokenize_supported:
+            return None
+        try:
+            response = await self.aclient.post(f"http://127.0.0.1:{self.port}/tokenize", json={"content": text})
+            if response.status_code == 200:
+                return len(response.json().get("tokens", []))
+            if response.status_code == 404:
+                self.tokenize_supported = False
+        except Exception:
+            pass
+        return None
+
     def unload(self):
         if self.server_process:
             try:
@@ -117,5 +209,7 @@ class LlamaCppAdapter(BaseModuleAdapter):
         return {
             "status": self.status,
             "model": self.model_name,
-            "port": self.port
+            "port": self.port,
+            "load": self.load_metrics,
+            "slots": self.dispatcher.get_status()
         }
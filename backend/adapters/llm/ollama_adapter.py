@@ -1,4 +1,3 @@
-import requests
 import json
 import subprocess
 import time
@@ -6,6 +5,7 @@ import os
 import signal
 import platform
 from ..base_module_adapter import BaseModuleAdapter
+from ...core.http_utils import create_session, create_async_client, clients_from_config, DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
 
 class OllamaAdapter(BaseModuleAdapter):
     def __init__(self):
@@ -13,13 +13,21 @@ class OllamaAdapter(BaseModuleAdapter):
         self.status = "Idle"
         self.model_name = "None"
         self.server_process = None
+        # Ollama has no tokenize endpoint, so prompts are budgeted with the approximate count
+        self.context_window = 2048
+        # Pooled keep-alive connections to the local model server
+        self.session = create_session()
+        self.aclient = create_async_client()
+        self.timeout = (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)
 
     def load(self, config):
         self.model_name = config.get("model", "llama3.2:3b")
+        self.context_window = int(config.get("context_window", 2048))
+        self.session, self.aclient, self.timeout = clients_from_config(config, self.session, self.aclient)
         
         # 1. Check if Ollama is already running
         try:
-            res = requests.get(f"http://127.0.0.1:{self.port}/api/tags", timeout=2)
+            res = self.session.get(f"http://127.0.0.1:{self.port}/api/tags", timeout=2)
             if res.status_code == 200:
                 self.status = "Running"
                 return True
@@ -39,7 +47,7 @@ class OllamaAdapter(BaseModuleAdapter):
             # Wait for server to be ready
             for _ in range(10):
                 try:
-                    res = requests.get(f"http://127.0.0.1:{self.port}/api/tags", timeout=1)
+                    res = self.session.get(f"http://127.0.0.1:{self.port}/api/tags", timeout=1)
                     if res.status_code == 200:
                         self.status = "Running"
                         return True
@@ -53,22 +61,26 @@ class OllamaAdapter(BaseModuleAdapter):
         self.status = "Error: Timeout starting Ollama"
         return False
 
-    def generate(self, prompt, params):
-        url = f"http://127.0.0.1:{self.port}/api/generate"
-        payload = {
+    def _build_payload(self, prompt, params, stream=False):
+        return {
             "model": self.model_name,
             "prompt": prompt,
-            "stream": False,
+            "stream": stream,
             "options": {
                 "temperature": params.get("temperature", 0.7),
                 "num_predict": params.get("max_tokens", 128),
                 "top_p": params.get("top_p", 1.0),
                 "repeat_penalty": 1.0 + params.get("frequency_penalty", 0.0),
+                "num_ctx": self.context_window,
             }
         }
+
+    def generate(self, prompt, params):
+        url = f"http://127.0.0.1:{self.port}/api/generate"
+        payload = self._build_payload(prompt, params)
         
         try:
-            response = requests.post(url, json=payload, timeout=60)
+            response = self.session.post(url, json=payload, timeout=self.timeout)
             if response.status_code == 200:
                 return response.json().get("response", "").strip()
         except Exception as e:
@@ -76,6 +88,39 @@ class OllamaAdapter(BaseModuleAdapter):
         
         return "Error: Generation failed"
 
+    async def agenerate(self, prompt, params):
+        url = f"http://127.0.0.1:{self.port}/api/generate"
+        payload = self._build_payload(prompt, params)
+
+        try:
+            response = await self.aclient.post(url, json=payload)
+            if response.status_code == 200:
+                return response.json().get("response", "").strip()
+        except Exception as e:
+            return f"Error: {str(e)}"
+
+        return "Error: Generation failed"
+
+    async def agenerate_stream(self, prompt, params):
+        url = f"http://127.0.0.1:{self.port}/api/generate"
+        payload = self._build_payload(prompt, params, stream=True)
+
+        try:
+            async with self.aclient.stream("POST", url, json=payload) as response:
+                if response.status_code != 200:
+                    yield "Error: Generation failed"
+                    return
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("response"):
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        break
+        except Exception as e:
+            yield f"Error: {str(e)}"
+
     def unload(self):
         if self.server_process:
             try:
@@ -0,0 +1,134 @@
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+class SlotAffinity:
+    """
+    Pins each chat session to one llama-server slot, so the slot's KV cache still holds
+    that session's prompt prefix on the next turn. The least recently used session
+    gives up its slot when more sessions than slots are active.
+    """
+
+    def __init__(self, total_slots=1):
+        self.total_slots = max(1, int(total_slots))
+        self.slot_of = OrderedDict()
+
+    def reset(self, total_slots=1):
+        self.total_slots = max(1, int(total_slots))
+        self.slot_of.clear()
+
+    def slot_for(self, session_id):
+        if session_id is None:
+            return -1 # Let the server pick an idle slot
+        if session_id in self.slot_of:
+            self.slot_of.move_to_end(session_id)
+            return self.slot_of[session_id]
+
+        used = set(self.slot_of.values())
+        free = [slot for slot in range(self.total_slots) if slot not in used]
+        if free:
+            slot = free[0]
+        else:
+            _, slot = self.slot_of.popitem(last=False)
+        self.slot_of[session_id] = slot
+        return slot
+
+    def claim(self, session_id, busy):
+        """
+        A free slot for the session: its own when idle, else an idle slot nobody is pinned
+        to, else the idle slot of the least recently used session. Re-pins the session.
+        """
+        free = [slot for slot in range(self.total_slots) if slot not in busy]
+        if session_id in self.slot_of and self.slot_of[session_id] in free:
+            self.slot_of.move_to_end(session_id)
+            return self.slot_of[session_id]
+        pinned = set(self.slot_of.values())
+        unpinned = [slot for slot in free if slot not in pinned]
+        if unpinned:
+            slot = unpinned[0]
+        else:
+            owner = next(s for s, slot in self.slot_of.items() if slot in free)
+            slot = self.slot_of.pop(owner)
+        if session_id is not None:
+            self.slot_of.pop(session_id, None)
+            self.slot_of[session_id] = slot
+        return slot
+
+
+class ServerBusyError(Exception):
+    pass
+
+
+class SlotDispatcher:
+    """
+    Hands llama-server's parallel slots to concurrent requests, so every slot decodes
+    (continuous batching) while sessions keep landing on the slot that caches their prefix.
+    Requests beyond the slot count wait in a bounded queue; past that they are refused
+    instead of piling up behind the server.
+    """
+
+    def __init__(self, affinity, max_waiting=8):
+        self.affinity = affinity
+        self.max_waiting = max_waiting
+        self.busy = set()
+        self.waiting = 0
+        self.cond = asyncio.Condition()
+        self.dispatched = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+
+    def reset(self, total_slots=1, max_waiting=None):
+        self.affinity.reset(total_slots)
+        self.busy.clear()
+        if max_waiting is not None:
+            self.max_waiting = max_waiting
+
+    @asynccontextmanager
+    async def slot(self, session_id=None):
+        if len(self.busy) >= self.affinity.total_slots and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise ServerBusyError("Server busy, try again shortly")
+
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            async with self.cond:
+                await self.cond.wait_for(lambda: len(self.busy) < self.affinity.total_slots)
+                slot = self.affinity.claim(session_id, self.busy)
+                self.busy.add(slot)
+        finally:
+            self.waiting -= 1
+        self.dispatched += 1
+        self.total_wait += time.perf_counter() - queued_at
+
+        try:
+            yield slot
+        finally:
+            self.busy.discard(slot)
+            async with self.cond:
+                self.cond.notify()
+
+    def get_status(self):
+        return {
+            "slots": self.affinity.total_slots,
+            "busy": len(self.busy),
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "dispatched": self.dispatched,
+            "rejected": self.rejected,
+            "avg_wait_s": round(self.total_wait / self.dispatched, 3) if self.dispatched else None
+        }
+
+
+def read_total_slots(session, port, default=1):
+    """
+    Number of parallel slots a running llama-server was started with. Older forks (BitNet's)
+    may not report it, so callers pass the -np they launched with as the default.
+    """
+    try:
+        res = session.get(f"http://127.0.0.1:{port}/props", timeout=2)
+        if res.status_code == 200:
+            return int(res.json().get("total_slots") or default)
+    except: pass
+    return default
@@ -0,0 +1,14 @@
+import json
+
+async def aiter_sse_json(response):
+    """Yields decoded JSON payloads from a server-sent events httpx streaming response."""
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            break
+        try:
+            yield json.loads(data)
+        except ValueError:
+            continue
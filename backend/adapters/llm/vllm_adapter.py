@@ -1,10 +1,11 @@
 import subprocess
 import os
 import platform
-import time
-import requests
 import signal
 from ..base_module_adapter import BaseModuleAdapter
+from ...core.http_utils import create_session, create_async_client, clients_from_config, DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
+from ...core.server_readiness import ServerWatcher
+from .stream_utils import aiter_sse_json
 
 class VLLMAdapter(BaseModuleAdapter):
     def __init__(self):
@@ -12,10 +13,19 @@ class VLLMAdapter(BaseModuleAdapter):
         self.port = 8081
         self.status = "Idle"
         self.model_name = "None"
+        # Pooled keep-alive connections to the local model server
+        self.session = create_session()
+        self.aclient = create_async_client()
+        self.timeout = (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)
+        self.context_window = 4096
+        self.tokenize_supported = True
+        # Startup timings from the last load (see ServerWatcher)
+        self.load_metrics = {}
 
     def load(self, config):
         self.status = "Loading"
         self.unload()
+        self.session, self.aclient, self.timeout = clients_from_config(config, self.session, self.aclient)
         
         model_name = config.get("model")
         if not model_name:
@@ -23,6 +33,8 @@ class VLLMAdapter(BaseModuleAdapter):
             return False
             
         self.model_name = model_name
+        self.context_window = int(config.get("context_window", 4096))
+        self.tokenize_supported = True
 
         # Command to start vLLM OpenAI-compatible server
         command = [
@@ -35,41 +47,48 @@ class VLLMAdapter(BaseModuleAdapter):
         # Add GPU config if present
         gpu_memory_utilization = config.get("gpu_memory_utilization", 0.9)
         command.extend(["--gpu-memory-utilization", str(gpu_memory_utilization)])
+        # Shares KV blocks between requests with a common prompt prefix
+        command.append("--enable-prefix-caching")
+        if config.get("context_window"):
+            command.extend(["--max-model-len", str(self.context_window)])
         
+        # Output is piped so the watcher can see the "listening" line and the exit reason
         self.server_process = subprocess.Popen(
             command,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
             preexec_fn=os.setsid if platform.system() == "Linux" else None,
         )
         
-        # Poll health endpoint (vLLM has /health)
-        for _ in range(60): # vLLM can take longer to load models
-            try:
-                res = requests.get(f"http://127.0.0.1:{self.port}/health", timeout=2)
-                if res.status_code == 200:
-                    self.status = "Running"
-                    return True
-            except: pass
-            time.sleep(2)
+        # vLLM can take much longer to load models
+        watcher = ServerWatcher(self.server_process, name="vLLM")
+        ready = watcher.wait_ready(self.session, f"http://127.0.0.1:{self.port}/health", timeout=120)
+        self.load_metrics = watcher.metrics
+        if ready:
+            self.status = "Running"
+            return True
         
-        self.status = "Error: Startup Timeout"
+        self.status = f"Error: {watcher.error}"
         return False
 
-    def generate(self, prompt, params):
-        url = f"http://127.0.0.1:{self.port}/v1/completions"
-        payload = {
+    def _build_payload(self, prompt, params, stream=False):
+        return {
             "model": self.model_name,
             "prompt": prompt,
             "max_tokens": params.get("max_tokens", 128),
             "temperature": params.get("temperature", 0.7),
             "top_p": params.get("top_p", 1.0),
             "frequency_penalty": params.get("frequency_penalty", 0.0),
-            "stop": ["User:", "\n\n", "Jarvis:"]
+            "stop": ["User:", "\n\n", "Jarvis:"],
+            "stream": stream
         }
+
+    def generate(self, prompt, params):
+        url = f"http://127.0.0.1:{self.port}/v1/completions"
+        payload = self._build_payload(prompt, params)
         
         try:
-            response = requests.post(url, json=payload, timeout=60)
+            response = self.session.post(url, json=payload, timeout=self.timeout)
             if response.status_code == 200:
                 res_json = response.json()
                 if "choices" in res_json and len(res_json["choices"]) > 0:
@@ -79,6 +98,54 @@ class VLLMAdapter(BaseModuleAdapter):
         
         return "Error: Generation failed"
 
+    async def agenerate(self, prompt, params):
+        url = f"http://127.0.0.1:{self.port}/v1/completions"
+        payload = self._build_payload(prompt, params)
+
+        try:
+            response = await self.aclient.post(url, json=payload)
+            if response.status_code == 200:
+                res_json = response.json()
+                if "choices" in res_json and len(res_json["choices"]) > 0:
+                    return res_json["choices"][0].get("text", "").strip()
+        except Exception as e:
+            return f"Error: {str(e)}"
+
+        return "Error: Generation failed"
+
+    async def agenerate_stream(self, prompt, params):
+        url = f"http://127.0.0.1:{self.port}/v1/completions"
+        payload = self._build_payload(prompt, params, stream=True)
+
+        try:
+            async with self.aclient.stream("POST", url, json=payload) as response:
+                if response.status_code != 200:
+                    yield "Error: Generation failed"
+                    return
+                async for chunk in aiter_sse_json(response):
+                    choices = chunk.get("choices") or []
+                    if choices and choices[0].get("text"):
+                        yield choices[0]["text"]
+        except Exception as e:
+            yield f"Error: {str(e)}"
+
+    async def acount_tokens(self, text):
+        """Exact token count from vLLM's /tokenize; None when unavailable."""
+        if not self.tokenize_supported:
+            return None
+        try:
+            response = await self.aclient.post(
+                f"http://127.0.0.1:{self.port}/tokenize",
+                json={"model": self.model_name, "prompt": text, "add_special_tokens": False}
+            )
+            if response.status_code == 200:
+                return response.json().get("count")
+            if response.status_code == 404:
+                self.tokenize_supported = False
+        except Exception:
+            pass
+        return None
+
     def unload(self):
         if self.server_process:
             try:
@@ -94,5 +161,6 @@ class VLLMAdapter(BaseModuleAdapter):
         return {
             "status": self.status,
             "model": self.model_name,
-            "port": self.port
+            "port": self.port,
+            "load": self.load_metrics
         }
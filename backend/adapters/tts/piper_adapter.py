@@ -1,9 +1,13 @@
 import subprocess
 import os
 import shutil
-import json
+import threading
 import wave
+import numpy as np
 from ..base_module_adapter import BaseModuleAdapter
+from .piper_worker import PiperWorkerPool, read_voice_sample_rate
+from ...core.phrase_cache import PhraseAudioCache, DEFAULT_PHRASES
+from ...core.audio_utils import pcm_to_wav_bytes
 
 class PiperAdapter(BaseModuleAdapter):
     def __init__(self):
@@ -21,6 +25,11 @@ class PiperAdapter(BaseModuleAdapter):
 
         # Default model path in the new structure
         self.model_path = os.path.join(self.root_dir, "piper", "voices", "en_US-ryan-high.onnx")
+        self.sample_rate = 22050
+        self.num_workers = 1
+        self.workers = None
+        self.workers_lock = threading.Lock()
+        self.phrases = PhraseAudioCache(os.path.join(self.root_dir, "phrase_cache"))
 
     def load(self, config):
         if not os.path.exists(self.piper_exe):
@@ -52,68 +61,76 @@ class PiperAdapter(BaseModuleAdapter):
                 if not found:
                     self.status = f"Error: {model_name} not found"
                     return False
-                
+        
+        self.num_workers = int(config.get("tts_workers", 1))
+        self._start_workers()
+        # Fixed acknowledgements are rendered once per voice and then served from disk
+        self.phrases.prerender(self._voice(), self.sample_rate, config.get("cached_phrases", DEFAULT_PHRASES), self._render_pcm)
         self.status = "Running"
         return True
 
+    def _voice(self):
+        return os.path.basename(self.model_path)
+
+    def _start_workers(self):
+        """(Re)starts the resident piper processes for the current voice."""
+        with self.workers_lock:
+            if self.workers:
+                self.workers.close()
+            # Voice config is parsed once per load, not per utterance
+            self.sample_rate = read_voice_sample_rate(self.model_path)
+            print(f"🔊 Piper: starting {self.num_workers} worker(s) for {self.model_path} ({self.sample_rate}Hz)")
+            self.workers = PiperWorkerPool(self.piper_exe, self.model_path, self.num_workers)
+            self.workers.start()
+
+    def synthesize_pcm(self, text):
+        """Returns raw S16_LE mono PCM at self.sample_rate, or None on failure."""
+        pcm = self.phrases.get(self._voice(), self.sample_rate, text)
+        if pcm is not None:
+            return pcm
+        return self._render_pcm(text)
+
+    def phrase_wav(self, text):
+        """WAV bytes of a pre-rendered phrase, or None when it is not cached."""
+        pcm = self.phrases.get(self._voice(), self.sample_rate, text)
+        if pcm is None:
+            return None
+        return pcm_to_wav_bytes(np.frombuffer(pcm, dtype=np.int16), self.sample_rate)
+
+    def _render_pcm(self, text):
+        workers = self.workers
+        if not workers or workers.model_path != self.model_path:
+            self._start_workers()
+            workers = self.workers
+        return workers.synthesize(text)
+
     def generate(self, text, params):
+        """
+        Writes the speech to params["output_path"] and returns that path. It is also played
+        on the server's speaker unless params["play_local"] is False, which callers that send
+        the audio to a client use so synthesis isn't held up by (or doubled with) playback.
+        """
         output_wav = params.get("output_path")
         if not output_wav: return None
 
-        # Environment handling
-        piper_dir = os.path.dirname(self.piper_exe)
-        env = os.environ.copy()
-        if os.path.exists(piper_dir):
-            if "LD_LIBRARY_PATH" in env:
-                env["LD_LIBRARY_PATH"] = f"{piper_dir}:{env['LD_LIBRARY_PATH']}"
-            else:
-                env["LD_LIBRARY_PATH"] = piper_dir
-
-        # Get sample rate from config json
-        sample_rate = 22050
-        config_path = self.model_path + ".json"
-        if os.path.exists(config_path):
-            try:
-                with open(config_path, "r") as f:
-                    cfg = json.load(f)
-                    sample_rate = cfg.get("audio", {}).get("sample_rate", 22050)
-            except: pass
-
         try:
-            print(f"🔊 Piper: {self.model_path} ({sample_rate}Hz)")
-            
-            piper_cmd = [
-                self.piper_exe,
-                "--model", self.model_path,
-                "--output_raw"
-            ]
-            
-            p1 = subprocess.Popen(
-                piper_cmd, 
-                stdin=subprocess.PIPE, 
-                stdout=subprocess.PIPE, 
-                stderr=subprocess.PIPE,
-                env=env
-            )
-            
-            pcm_data, stderr_data = p1.communicate(input=text.encode('utf-8'))
-            
-            if p1.returncode != 0:
-                print(f"❌ Piper process failed: {stderr_data.decode()}")
+            pcm_data = self.synthesize_pcm(text)
+            if not pcm_data:
                 return None
 
             # Local playback
-            try:
-                aplay_cmd = ["aplay", "-r", str(sample_rate), "-f", "S16_LE", "-t", "raw", "-"]
-                aplay_proc = subprocess.Popen(aplay_cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                aplay_proc.communicate(input=pcm_data)
-            except: pass
+            if params.get("play_local", True):
+                try:
+                    aplay_cmd = ["aplay", "-r", str(self.sample_rate), "-f", "S16_LE", "-t", "raw", "-"]
+                    aplay_proc = subprocess.Popen(aplay_cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                    aplay_proc.communicate(input=pcm_data)
+                except: pass
 
             # Save to WAV for UI
             with wave.open(output_wav, "wb") as wav_file:
                 wav_file.setnchannels(1)
                 wav_file.setsampwidth(2)
-                wav_file.setframerate(sample_rate)
+                wav_file.setframerate(self.sample_rate)
                 wav_file.writeframes(pcm_data)
                 
             return output_wav
@@ -122,6 +139,9 @@ class PiperAdapter(BaseModuleAdapter):
             return None
 
     def unload(self):
+        if self.workers:
+            self.workers.close()
+            self.workers = None
         self.status = "Idle"
 
     def get_status(self):
@@ -0,0 +1,134 @@
+import subprocess
+import os
+import json
+import queue
+import tempfile
+import threading
+import wave
+
+def piper_env(piper_exe):
+    """Environment with the bundled piper shared objects on LD_LIBRARY_PATH."""
+    piper_dir = os.path.dirname(piper_exe)
+    env = os.environ.copy()
+    if os.path.exists(piper_dir):
+        if "LD_LIBRARY_PATH" in env:
+            env["LD_LIBRARY_PATH"] = f"{piper_dir}:{env['LD_LIBRARY_PATH']}"
+        else:
+            env["LD_LIBRARY_PATH"] = piper_dir
+    return env
+
+def read_voice_sample_rate(model_path, default=22050):
+    """Reads the sample rate from the voice's .onnx.json config."""
+    config_path = model_path + ".json"
+    if os.path.exists(config_path):
+        try:
+            with open(config_path, "r") as f:
+                return json.load(f).get("audio", {}).get("sample_rate", default)
+        except: pass
+    return default
+
+
+class PiperWorker:
+    """
+    A long-lived piper process that keeps the voice model and espeak-ng data loaded.
+    Text is sent as JSON lines; piper answers each line with the path of the finished WAV,
+    which is read back as raw 16-bit PCM and removed.
+    """
+
+    def __init__(self, piper_exe, model_path):
+        self.piper_exe = piper_exe
+        self.model_path = model_path
+        self.process = None
+        self.lock = threading.Lock()
+        # Prefer a RAM-backed directory for the per-utterance handoff file
+        base_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        self.work_dir = tempfile.mkdtemp(prefix="piper_", dir=base_dir)
+        self._counter = 0
+
+    def start(self):
+        self.process = subprocess.Popen(
+            [self.piper_exe, "--model", self.model_path, "--json-input", "--output_dir", self.work_dir],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=piper_env(self.piper_exe),
+            text=True,
+            bufsize=1
+        )
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def synthesize(self, text):
+        """Returns raw S16_LE mono PCM for text, or None on failure."""
+        with self.lock:
+            if not self.is_alive():
+                self.start()
+
+            self._counter += 1
+            wav_path = os.path.join(self.work_dir, f"utt_{self._counter}.wav")
+            try:
+                self.process.stdin.write(json.dumps({"text": text, "output_file": wav_path}) + "\n")
+                self.process.stdin.flush()
+                done_path = self.process.stdout.readline().strip()
+            except (BrokenPipeError, OSError) as e:
+                print(f"❌ Piper worker died: {e}")
+                self.stop()
+                return None
+
+            if not done_path:
+                print("❌ Piper worker exited unexpectedly")
+                self.stop()
+                return None
+
+            try:
+                with wave.open(done_path, "rb") as wav_file:
+                    return wav_file.readframes(wav_file.getnframes())
+            finally:
+                if os.path.exists(done_path):
+                    os.remove(done_path)
+
+    def stop(self):
+        if self.process:
+            try:
+                self.process.stdin.close()
+                self.process.terminate()
+                self.process.wait(timeout=2)
+            except:
+                try: self.process.kill()
+                except: pass
+            self.process = None
+
+    def close(self):
+        self.stop()
+        try:
+            for f in os.listdir(self.work_dir):
+                os.remove(os.path.join(self.work_dir, f))
+            os.rmdir(self.work_dir)
+        except: pass
+
+
+class PiperWorkerPool:
+    """A fixed set of PiperWorkers for one voice; each request borrows an idle worker."""
+
+    def __init__(self, piper_exe, model_path, size=1):
+        self.model_path = model_path
+        self.workers = [PiperWorker(piper_exe, model_path) for _ in range(max(1, size))]
+        self.idle = queue.Queue()
+        for worker in self.workers:
+            self.idle.put(worker)
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+
+    def synthesize(self, text):
+        worker = self.idle.get()
+        try:
+            return worker.synthesize(text)
+        finally:
+            self.idle.put(worker)
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, UploadFile, File, Response
+import asyncio
 import tempfile
 import os
-import subprocess
 from ..core.config_manager import ConfigManager
+from ..core.audio_utils import decode_audio, to_mono_16k
 
 router = APIRouter()
 config_mgr = ConfigManager()
@@ -14,21 +15,19 @@ from ..main import orchestrator
 @router.post("/api/audio/transcribe")
 async def transcribe_audio(file: UploadFile = File(...)):
     """Transcribes uploaded audio blob."""
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-        content = await file.read()
-        tmp.write(content)
-        tmp_path = tmp.name
+    content = await file.read()
 
+    # Decode and resample in memory; already-16 kHz mono input skips conversion
     try:
-        clean_wav = tmp_path + "_clean.wav"
-        subprocess.run(["ffmpeg", "-y", "-i", tmp_path, "-ar", "16000", "-ac", "1", clean_wav], 
-                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        
-        text = orchestrator.transcribe(clean_wav, {"threads": 4}) 
-        return {"text": text}
-    finally:
-        if os.path.exists(tmp_path): os.remove(tmp_path)
-        if os.path.exists(clean_wav): os.remove(clean_wav)
+        samples, sample_rate = await asyncio.to_thread(decode_audio, content)
+        pcm = await asyncio.to_thread(to_mono_16k, samples, sample_rate)
+    except Exception as e:
+        # Same shape ASR adapters use for failures, so the client shows it instead of a 500
+        print(f"❌ Could not decode uploaded audio: {e}")
+        return {"text": f"Error: {e}"}
+
+    text = await orchestrator.transcribe_pcm(pcm, {"threads": 4})
+    return {"text": text}
 
 @router.post("/api/audio/speech")
 async def text_to_speech(data: dict):
@@ -39,7 +38,7 @@ async def text_to_speech(data: dict):
     output_wav = tempfile.NamedTemporaryFile(suffix=".wav", delete=False).name
     
     # Generate via orchestrator
-    result_path = orchestrator.synthesize(text, {"output_path": output_wav})
+    result_path = await orchestrator.synthesize(text, {"output_path": output_wav})
     
     if not result_path or not os.path.exists(result_path):
         return {"error": "TTS Generation Failed"}
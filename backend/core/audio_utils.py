@@ -0,0 +1,111 @@
+import io
+import subprocess
+import wave
+import numpy as np
+
+TARGET_RATE = 16000
+
+def decode_audio(data: bytes):
+    """
+    Decodes an encoded audio blob (WAV, WebM/Opus, Ogg, ...) in memory.
+    Returns (float32 samples, sample_rate); samples are mono or shaped (frames, channels).
+    """
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        pcm = _decode_wav(data)
+        if pcm is not None:
+            return pcm
+
+    try:
+        return _decode_with_av(data)
+    except ImportError:
+        pass
+    except Exception as e:
+        # PyAV can't handle some browser blobs (truncated WebM, odd codecs); ffmpeg often can
+        print(f"⚠️ PyAV decode failed ({e}), trying ffmpeg")
+
+    return _decode_with_ffmpeg_pipe(data)
+
+def to_mono_16k(samples, sample_rate):
+    """Downmixes and resamples to 16 kHz mono float32. No-op when already in that format."""
+    samples = to_float32(samples)
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    if sample_rate == TARGET_RATE:
+        return np.ascontiguousarray(samples, dtype=np.float32)
+    return resample(samples, sample_rate, TARGET_RATE)
+
+def resample(samples, src_rate, dst_rate):
+    try:
+        from math import gcd
+        from scipy.signal import resample_poly
+        g = gcd(int(src_rate), int(dst_rate))
+        return resample_poly(samples, dst_rate // g, src_rate // g).astype(np.float32)
+    except ImportError:
+        duration = len(samples) / float(src_rate)
+        dst_len = int(round(duration * dst_rate))
+        src_t = np.linspace(0.0, duration, num=len(samples), endpoint=False)
+        dst_t = np.linspace(0.0, duration, num=dst_len, endpoint=False)
+        return np.interp(dst_t, src_t, samples).astype(np.float32)
+
+def to_float32(samples):
+    samples = np.asarray(samples)
+    if samples.dtype == np.int16:
+        return samples.astype(np.float32) / 32768.0
+    return samples.astype(np.float32, copy=False)
+
+def to_int16(samples):
+    samples = np.asarray(samples)
+    if samples.dtype == np.int16:
+        return samples
+    return (np.clip(samples, -1.0, 1.0) * 32767.0).astype(np.int16)
+
+def pcm_to_wav_bytes(samples, sample_rate=TARGET_RATE):
+    """Wraps 16 kHz mono PCM in an in-memory WAV container."""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(to_int16(samples).tobytes())
+    return buf.getvalue()
+
+def _decode_wav(data):
+    try:
+        with wave.open(io.BytesIO(data), "rb") as wav_file:
+            if wav_file.getsampwidth() != 2:
+                return None
+            channels = wav_file.getnchannels()
+            pcm = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16)
+            if channels > 1:
+                pcm = pcm.reshape(-1, channels)
+            return pcm, wav_file.getframerate()
+    except wave.Error:
+        # Browsers label WebM blobs as .wav; fall through to the container decoders
+        return None
+
+def _decode_with_av(data):
+    import av
+    resampler = av.AudioResampler(format="s16", layout="mono", rate=TARGET_RATE)
+    chunks = []
+    with av.open(io.BytesIO(data)) as container:
+        for frame in container.decode(audio=0):
+            for out in resampler.resample(frame):
+                chunks.append(out.to_ndarray().reshape(-1))
+        for out in resampler.resample(None):
+            chunks.append(out.to_ndarray().reshape(-1))
+    pcm = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int16)
+    return pcm.astype(np.int16, copy=False), TARGET_RATE
+
+def _decode_with_ffmpeg_pipe(data):
+    # Last resort: one ffmpeg process over pipes, no temp files
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+             "-f", "s16le", "-ac", "1", "-ar", str(TARGET_RATE), "pipe:1"],
+            input=data, capture_output=True
+        )
+    except FileNotFoundError:
+        raise RuntimeError("ffmpeg not found, can't decode this audio format")
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg decode failed: {result.stderr.decode(errors='replace')}")
+    return np.frombuffer(result.stdout, dtype=np.int16), TARGET_RATE
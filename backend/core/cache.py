@@ -0,0 +1,72 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+
+def normalize_text(text):
+    """Case-, whitespace- and trailing-punctuation-insensitive form used in cache keys."""
+    return re.sub(r"\s+", " ", text).strip().lower().rstrip(".!?")
+
+
+class TTLCache:
+    """
+    LRU cache with per-entry expiry and an optional byte budget.
+    Thread-safe, since retrieval and TTS results are produced in worker threads.
+    """
+
+    def __init__(self, max_entries=256, ttl=3600, max_bytes=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, value, size = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, size=0):
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self.entries[key] = (time.monotonic() + self.ttl, value, size)
+            self.total_bytes += size
+            while len(self.entries) > self.max_entries or (
+                self.max_bytes is not None and self.total_bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self.entries)))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def _remove(self, key):
+        _, _, size = self.entries.pop(key)
+        self.total_bytes -= size
+
+    def get_status(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None
+        }
@@ -0,0 +1,63 @@
+import asyncio
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 60
+
+def create_session(pool_size=DEFAULT_POOL_SIZE):
+    """A keep-alive session whose connection pool is reused across requests to a local model server."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def clients_from_config(config, old_session=None, old_aclient=None):
+    """
+    Builds (session, async_client, timeout) from http_pool_size / connect_timeout / request_timeout.
+    The clients they replace are closed, so reloads don't leak pooled connections.
+    """
+    if old_session:
+        old_session.close()
+    if old_aclient:
+        close_async_client(old_aclient)
+    pool_size = int(config.get("http_pool_size", DEFAULT_POOL_SIZE))
+    timeout = (
+        float(config.get("connect_timeout", DEFAULT_CONNECT_TIMEOUT)),
+        float(config.get("request_timeout", DEFAULT_READ_TIMEOUT))
+    )
+    return create_session(pool_size), create_async_client(pool_size, timeout), timeout
+
+def create_async_client(pool_size=DEFAULT_POOL_SIZE, timeout=(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)):
+    """Async counterpart of create_session for calls made from the event loop."""
+    async def remember_loop(request):
+        # Its connections belong to this loop, so aclose() has to run there too
+        client.loop = asyncio.get_running_loop()
+
+    client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        timeout=httpx.Timeout(timeout[1], connect=timeout[0]),
+        event_hooks={"request": [remember_loop]}
+    )
+    client.loop = None
+    return client
+
+def close_async_client(client):
+    """Closes an AsyncClient from any thread: scheduled on the loop that used it, else run here."""
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    loop = getattr(client, "loop", None)
+    try:
+        if loop is not None and loop is not running and loop.is_running():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        elif running is not None:
+            running.create_task(client.aclose())
+        else:
+            asyncio.run(client.aclose())
+    except Exception as e:
+        print(f"⚠️ Could not close HTTP client: {e}")
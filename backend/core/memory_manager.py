@@ -5,7 +5,13 @@ class MemoryManager:
     def __init__(self):
         # Short-term sliding window memory
         self.short_term_memory: List[Dict[str, str]] = []
-        self.max_history = 10  # Keep last 10 turns
+        # Hard cap only; the prompt builder picks as much history as the context window allows
+        self.max_history = 100
+        # Each message rendered once as a prompt line, so building a prompt never re-renders history
+        self.rendered_lines: List[str] = []
+        # Messages ever added, and the absolute index of the first message the prompt starts at
+        self.message_count = 0
+        self.prompt_start = 0
         
     def add_message(self, role: str, content: str):
         self.short_term_memory.append({
@@ -13,22 +19,27 @@ class MemoryManager:
             "content": content,
             "timestamp": time.time()
         })
+        speaker = "User" if role == "user" else "Jarvis"
+        self.rendered_lines.append(f"{speaker}: {content}\n")
+        self.message_count += 1
         self._prune()
 
     def get_history(self) -> List[Dict[str, str]]:
         return self.short_term_memory
 
+    def get_rendered_lines(self) -> List[str]:
+        return list(self.rendered_lines)
+
     def get_context_string(self) -> str:
         """Converts structured history into a prompt string."""
-        context = ""
-        for msg in self.short_term_memory:
-            role = "User" if msg["role"] == "user" else "Jarvis"
-            context += f"{role}: {msg['content']}\n"
-        return context
+        return "".join(self.rendered_lines)
 
     def clear(self):
         self.short_term_memory = []
+        self.rendered_lines = []
+        self.prompt_start = self.message_count
 
     def _prune(self):
         if len(self.short_term_memory) > self.max_history:
             self.short_term_memory = self.short_term_memory[-self.max_history:]
+            self.rendered_lines = self.rendered_lines[-self.max_history:]
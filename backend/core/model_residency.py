@@ -0,0 +1,208 @@
+import os
+import time
+import threading
+import psutil
+from .hardware_utils import get_system_specs
+from .model_swap import find_model_file
+
+GB = 1024 ** 3
+
+# Settings an adapter reads in load(); anything else (temperature, caches, budgets) is per
+# request, so a resident model is reused whatever those are set to
+LOAD_KEYS = (
+    "model", "context_window", "cpu_threads", "threads", "parallel_slots", "gpu_layers",
+    "queue_size", "gpu_memory_utilization", "compute_type", "batch_size", "workers",
+    "beam_size", "silence_detection", "asr_mode", "asr_port", "tts_workers", "cached_phrases"
+)
+# BitNet's launcher bakes the system prompt into the server it starts
+PROVIDER_LOAD_KEYS = {"BitNet": ("system_prompt",)}
+
+def load_signature(provider, config):
+    keys = LOAD_KEYS + PROVIDER_LOAD_KEYS.get(provider, ())
+    return provider, tuple(repr(config.get(key)) for key in keys)
+
+def process_tree_rss(pid):
+    """Resident memory of a server process and its children (BitNet's launcher spawns llama-server)."""
+    try:
+        root = psutil.Process(pid)
+        procs = [root] + root.children(recursive=True)
+    except psutil.Error:
+        return 0
+    total = 0
+    for proc in procs:
+        try:
+            total += proc.memory_info().rss
+        except psutil.Error:
+            pass
+    return total
+
+def own_rss():
+    return psutil.Process(os.getpid()).memory_info().rss
+
+
+class ResidentModel:
+    def __init__(self, kind, provider, adapter, config, ram, vram):
+        self.kind = kind
+        self.provider = provider
+        self.adapter = adapter
+        self.config = config
+        self.model = config.get("model")
+        self.signature = load_signature(provider, config)
+        self.ram = ram # Measured RSS once loaded, the estimate until then
+        self.vram = vram # Estimated; per-process VRAM isn't portable to measure
+        self.loaded_at = time.time()
+        self.last_used = time.monotonic()
+        self.load_time_s = None
+
+
+class ModelResidencyManager:
+    """
+    Keeps several models loaded at once (LLM, ASR and TTS adapters alike) and evicts the
+    least recently used one when loading another would exceed the RAM/VRAM budget.
+    Server-backed models are measured by their process tree's RSS, in-process ones by
+    how much the backend grew while loading them.
+    """
+
+    def __init__(self, ram_budget=None, vram_budget=None, ram_fraction=0.75, vram_fraction=0.9):
+        specs = get_system_specs()
+        gpu = specs.get("gpu") or {}
+        self.vram_total = int(gpu.get("vram_gb", 0) * GB)
+        self.ram_budget = ram_budget or int(specs["ram"]["total_gb"] * GB * ram_fraction)
+        self.vram_budget = vram_budget or int(self.vram_total * vram_fraction)
+        self.entries = {} # adapter -> ResidentModel
+        self.evictions = 0
+        self.lock = threading.RLock()
+        # Callers set this so adapters with requests in flight are never evicted
+        self.in_use = lambda adapter: False
+
+    def set_budget(self, ram_gb=None, vram_gb=None):
+        if ram_gb:
+            self.ram_budget = int(float(ram_gb) * GB)
+        if vram_gb:
+            self.vram_budget = int(float(vram_gb) * GB)
+
+    def estimate(self, provider, config):
+        """(ram, vram) bytes a model should take, from its file size and offload settings."""
+        if provider == "vLLM":
+            # vLLM reserves its share of GPU memory up front, whatever the model size
+            return 0, int(self.vram_total * float(config.get("gpu_memory_utilization", 0.9)))
+        path = find_model_file(config.get("model"))
+        size = os.path.getsize(path) if path else 0
+        if int(config.get("gpu_layers", 0) or 0) > 0 and self.vram_total:
+            return size // 10, size
+        return size, 0
+
+    def find(self, kind, provider, config):
+        """A loaded adapter running this provider with the same load-time settings, or None."""
+        signature = load_signature(provider, config)
+        with self.lock:
+            for entry in self.entries.values():
+                if (entry.kind, entry.signature) == (kind, signature) \
+                        and entry.adapter.get_status().get("status") == "Running":
+                    return entry.adapter
+        return None
+
+    def touch(self, adapter):
+        entry = self.entries.get(adapter)
+        if entry:
+            entry.last_used = time.monotonic()
+
+    def refresh(self):
+        """Re-reads the RSS of server-backed models (KV caches grow after load)."""
+        with self.lock:
+            for entry in self.entries.values():
+                process = getattr(entry.adapter, "server_process", None)
+                if process is not None:
+                    entry.ram = process_tree_rss(process.pid) or entry.ram
+
+    def usage(self):
+        with self.lock:
+            return (
+                sum(entry.ram for entry in self.entries.values()),
+                sum(entry.vram for entry in self.entries.values())
+            )
+
+    def _fits(self, ram, vram):
+        used_ram, used_vram = self.usage()
+        if used_ram + ram > self.ram_budget or ram > psutil.virtual_memory().available:
+            return False
+        return not vram or used_vram + vram <= self.vram_budget
+
+    def make_room(self, ram, vram, protect=()):
+        """Evicts idle models, least recently used first, until (ram, vram) fits. Returns False if it can't."""
+        with self.lock:
+            self.refresh()
+            while not self._fits(ram, vram):
+                candidates = [
+                    entry for entry in self.entries.values()
+                    if entry.adapter not in protect and not self.in_use(entry.adapter)
+                ]
+                if not candidates:
+                    return False
+                self.evict(min(candidates, key=lambda entry: entry.last_used).adapter)
+            return True
+
+    def evict(self, adapter):
+        with self.lock:
+            entry = self.entries.pop(adapter, None)
+        if entry:
+            print(f"♻️ Evicting {entry.kind} {entry.provider} / {entry.model} ({entry.ram / GB:.1f} GB)")
+            self.evictions += 1
+        adapter.unload()
+
+    def load(self, kind, provider, adapter, config, protect=()):
+        """
+        Loads config into adapter after making room for it, and tracks it from then on.
+        Refuses (returns False without loading) when the budget can't hold it; callers that
+        can free the protected models first, like a cold swap, should do so and retry.
+        """
+        ram, vram = self.estimate(provider, config)
+        with self.lock:
+            # Reloading an adapter replaces whatever model it held, so that one doesn't count
+            previous = self.entries.pop(adapter, None)
+            if not self.make_room(ram, vram, protect=set(protect) | {adapter}):
+                print(f"❌ {provider} / {config.get('model')} exceeds the memory budget even after evictions, not loading it")
+                if previous:
+                    # Still running the model it had
+                    self.entries[adapter] = previous
+                elif hasattr(adapter, "status"):
+                    adapter.status = "Error: Exceeds memory budget"
+                return False
+        started, before = time.perf_counter(), own_rss()
+        if not adapter.load(config):
+            return False
+
+        process = getattr(adapter, "server_process", None)
+        measured = process_tree_rss(process.pid) if process is not None else max(0, own_rss() - before)
+        entry = ResidentModel(kind, provider, adapter, config, measured or ram, vram)
+        entry.load_time_s = round(time.perf_counter() - started, 2)
+        with self.lock:
+            self.entries[adapter] = entry
+        return True
+
+    def get_status(self, active=()):
+        self.refresh()
+        used_ram, used_vram = self.usage()
+        now = time.monotonic()
+        with self.lock:
+            models = [
+                {
+                    "kind": entry.kind,
+                    "provider": entry.provider,
+                    "model": entry.model,
+                    "active": entry.adapter in active,
+                    "ram_mb": round(entry.ram / 1024 ** 2),
+                    "vram_mb": round(entry.vram / 1024 ** 2),
+                    "idle_s": round(now - entry.last_used, 1),
+                    "load_time_s": entry.load_time_s
+                }
+                for entry in sorted(self.entries.values(), key=lambda entry: -entry.last_used)
+            ]
+        return {
+            "ram_budget_gb": round(self.ram_budget / GB, 2),
+            "ram_used_gb": round(used_ram / GB, 2),
+            "vram_budget_gb": round(self.vram_budget / GB, 2),
+            "vram_used_gb": round(used_vram / GB, 2),
+            "evictions": self.evictions,
+            "models": models
+        }
@@ -0,0 +1,41 @@
+import os
+import socket
+
+# Folders LLM adapters look for model files in
+MODEL_DIRS = ["models", "llama.cpp/models", "BitNet/models", "."]
+
+# Providers that talk to one shared daemon rather than a server of their own
+SHARED_SERVER_PROVIDERS = {"Ollama"}
+
+def find_model_file(model_name):
+    if not model_name:
+        return None
+    if os.path.isabs(model_name):
+        return model_name if os.path.exists(model_name) else None
+    for folder in MODEL_DIRS:
+        path = os.path.join(folder, model_name)
+        if os.path.isfile(path):
+            return path
+    for root, dirs, files in os.walk("BitNet/models"):
+        if model_name in files:
+            return os.path.join(root, model_name)
+    return None
+
+def port_in_use(port):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        return s.connect_ex(("127.0.0.1", port)) == 0
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def warm_up(adapter):
+    """One tiny generation, so the first real request doesn't pay for page faults or a lazy load."""
+    try:
+        text = adapter.generate("User: Hello\nJarvis:", {"max_tokens": 1, "temperature": 0.0})
+    except Exception as e:
+        return False, str(e)
+    if isinstance(text, str) and text.startswith("Error"):
+        return False, text
+    return True, None
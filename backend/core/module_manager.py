@@ -1,3 +1,10 @@
+import asyncio
+import hashlib
+import os
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
 from ..adapters.llm.bitnet_adapter import BitNetAdapter
 from ..adapters.llm.ollama_adapter import OllamaAdapter
 from ..adapters.llm.llama_cpp_adapter import LlamaCppAdapter
@@ -8,7 +15,14 @@ from ..adapters.asr.vosk_adapter import VoskAdapter
 from ..adapters.tts.piper_adapter import PiperAdapter
 from ..adapters.tts.coqui_tts_adapter import CoquiTTSAdapter
 from ..adapters.knowledge.sqlite_rag_adapter import SQLiteRAGAdapter
-from .memory_manager import MemoryManager
+from ..adapters.knowledge.vector_rag_adapter import VectorRAGAdapter
+from .session_store import SessionStore
+from .prompt_builder import PromptBuilder
+from .cache import TTLCache, normalize_text
+from .streaming_asr import open_stream
+from .model_swap import SHARED_SERVER_PROVIDERS, port_in_use, free_port, warm_up
+from .model_residency import ModelResidencyManager
+from .request_router import RequestRouter, DEFAULT_ROUTE
 
 class ModuleOrchestrator:
     def __init__(self):
@@ -20,6 +34,14 @@ class ModuleOrchestrator:
         }
         self.active_llm_provider = "BitNet"
         self.llm = self.llm_adapters[self.active_llm_provider]
+        # Requests still running on each LLM adapter, so a swapped-out one is drained before unload
+        self.llm_users = Counter()
+        self.swap_lock = threading.Lock()
+        self.swap_status = {"state": "idle"}
+        # Per-request model choice; route name -> its loaded adapter (the default route is self.llm)
+        self.router = RequestRouter()
+        self.route_adapters = {}
+        self.route_loading = set()
         
         self.asr_adapters = {
             "Whisper.cpp": WhisperAdapter(),
@@ -37,8 +59,23 @@ class ModuleOrchestrator:
         self.active_tts_provider = "Piper (Local)"
         self.tts = self.tts_adapters[self.active_tts_provider]
         
-        self.knowledge = SQLiteRAGAdapter()
-        self.memory = MemoryManager()
+        self.knowledge_adapters = {
+            "SQLite (Keyword)": SQLiteRAGAdapter(),
+            "Vector (Hybrid)": VectorRAGAdapter()
+        }
+        self.active_knowledge_provider = "SQLite (Keyword)"
+        self.knowledge = self.knowledge_adapters[self.active_knowledge_provider]
+        # Loaded models (current and recently used) under a RAM/VRAM budget
+        self.residency = ModelResidencyManager()
+        self.residency.in_use = lambda adapter: self.llm_users[adapter] > 0
+        # Conversation memory per chat session (one per websocket client / conversation)
+        self.sessions = SessionStore()
+        self.prompt_builder = PromptBuilder()
+
+        # Whole replies (opt-in per request), retrieval results and synthesized audio
+        self.response_cache = TTLCache(max_entries=256, ttl=3600)
+        self.retrieval_cache = TTLCache(max_entries=512, ttl=600)
+        self.tts_cache = TTLCache(max_entries=128, ttl=24 * 3600, max_bytes=64 * 1024 * 1024)
         
         # Modules state
         self.enabled = {
@@ -51,16 +88,169 @@ class ModuleOrchestrator:
     def switch_llm_provider(self, provider_name):
         if provider_name in self.llm_adapters:
             if self.active_llm_provider != provider_name:
-                self.llm.unload()
+                # The previous model stays resident until the residency manager needs its memory
                 self.active_llm_provider = provider_name
                 self.llm = self.llm_adapters[self.active_llm_provider]
                 return True
         return False
 
+    def hot_swap_llm(self, provider_name, config):
+        """
+        Blue/green LLM switch: the new provider/model loads next to the current one, which keeps
+        serving until the new one answers a warm-up generation. Then traffic moves over in one
+        assignment. The old model stays resident for a quick switch back until the residency
+        manager needs its memory. A model that is already resident is switched to at once.
+        Falls back to unload-then-load when the budget can't hold both.
+        """
+        if provider_name not in self.llm_adapters:
+            return False
+        config = {k.lower().replace(" ", "_"): v for k, v in config.items()}
+        with self.swap_lock:
+            started = time.perf_counter()
+            old, old_provider = self.llm, self.active_llm_provider
+            target = f"{provider_name} / {config.get('model')}"
+
+            resident = self.residency.find("llm", provider_name, config)
+            if resident:
+                self._activate_llm(provider_name, resident)
+                self._finish_swap(True, "resident", target, started)
+                return True
+
+            ram, vram = self.residency.estimate(provider_name, config)
+            if not self.residency.make_room(ram, vram, protect=self._active_adapters()):
+                reason = "memory budget can't hold both models"
+                print(f"⚠️ Not enough room to swap in {target} live ({reason}), reloading with downtime")
+                self.swap_status = {"state": "draining", "mode": "cold", "target": target, "reason": reason}
+                self._drain(old)
+                self.residency.evict(old)
+                mode = "cold"
+            else:
+                mode = "hot"
+                print(f"🔁 Loading {target} alongside {old_provider}")
+
+            new = type(self.llm_adapters[provider_name])()
+            if provider_name not in SHARED_SERVER_PROVIDERS and port_in_use(new.port):
+                new.port = free_port()
+            self.swap_status = {"state": "loading", "mode": mode, "target": target}
+            if not self.residency.load("llm", provider_name, new, config, protect=self._active_adapters()):
+                print(f"❌ Swap aborted, {target} failed to load: {new.get_status().get('status')}")
+                self.residency.evict(new)
+                self._finish_swap(False, mode, target, started)
+                return False
+
+            self.swap_status["state"] = "warming"
+            ok, error = warm_up(new)
+            if not ok:
+                print(f"❌ Swap aborted, {target} failed its warm-up: {error}")
+                self.residency.evict(new)
+                self._finish_swap(False, mode, target, started)
+                return False
+
+            if new.port == old.port and old.server_process:
+                # Same shared daemon (Ollama): the new adapter takes over the process handle
+                new.server_process, old.server_process = old.server_process, None
+            self._activate_llm(provider_name, new)
+            self._finish_swap(True, mode, target, started)
+            return True
+
+    def _activate_llm(self, provider_name, adapter):
+        self.llm_adapters[provider_name] = adapter
+        self.active_llm_provider = provider_name
+        self.llm = adapter
+        self.residency.touch(adapter)
+
+    def _drain(self, adapter, timeout=120):
+        """Waits for requests still running on an adapter to finish."""
+        deadline = time.monotonic() + timeout
+        while self.llm_users[adapter] and time.monotonic() < deadline:
+            time.sleep(0.1)
+
+    def _active_adapters(self):
+        return {self.llm, self.asr, self.tts, *self.route_adapters.values()}
+
+    def configure_routing(self, config):
+        """Applies the "routing" config and starts loading the extra route models in the background."""
+        self.router.configure(config)
+        for name in list(self.route_adapters):
+            if name not in self.router.routes:
+                self.residency.evict(self.route_adapters.pop(name))
+        if self.router.enabled:
+            for name in self.router.routes:
+                self._ensure_route(name)
+
+    def _ensure_route(self, name):
+        """
+        The route's adapter when it is loaded; otherwise starts loading it and returns None.
+        A route whose load failed is left alone until its retry backoff has passed.
+        """
+        adapter = self.route_adapters.get(name)
+        if adapter and adapter.get_status().get("status") == "Running":
+            return adapter
+        if name not in self.route_loading and self.router.can_load(name):
+            self.route_loading.add(name)
+            threading.Thread(target=self._load_route, args=(name,), daemon=True).start()
+        return None
+
+    def _load_route(self, name):
+        try:
+            route = self.router.routes[name]
+            provider, config = route["provider"], route["config"]
+            adapter = self.residency.find("llm", provider, config)
+            if not adapter:
+                adapter = type(self.llm_adapters[provider])()
+                if provider not in SHARED_SERVER_PROVIDERS and port_in_use(adapter.port):
+                    adapter.port = free_port()
+                print(f"🧭 Loading {name} route model: {provider} / {config.get('model')}")
+                if not self.residency.load("llm", provider, adapter, config, protect=self._active_adapters()):
+                    error = adapter.get_status().get("status")
+                    print(f"❌ {name} route model failed to load: {error}")
+                    self.residency.evict(adapter)
+                    self.router.load_failed(name, error)
+                    return
+                warm_up(adapter)
+            self.route_adapters[name] = adapter
+            self.router.load_succeeded(name)
+        except Exception as e:
+            print(f"❌ Could not load {name} route model: {e}")
+            self.router.load_failed(name, str(e))
+        finally:
+            self.route_loading.discard(name)
+
+    def _route(self, user_input, retrieved, params):
+        """(route, reason, adapter) for one request."""
+        available = [name for name in self.router.routes if self._ensure_route(name)] if self.router.enabled else []
+        route, reason = self.router.choose(user_input, retrieved, params, available)
+        if route == DEFAULT_ROUTE:
+            return route, reason, self.llm
+        return route, reason, self.route_adapters[route]
+
+    def _finish_swap(self, ok, mode, target, started):
+        self.swap_status = {
+            "state": "done" if ok else "failed",
+            "mode": mode,
+            "target": target,
+            "duration_s": round(time.perf_counter() - started, 2)
+        }
+        if ok:
+            print(f"✅ Switched to {target} in {self.swap_status['duration_s']}s ({mode})")
+
+    @contextmanager
+    def _hold_llm(self, llm=None):
+        """An LLM adapter (the active one by default), pinned for one request even if a swap happens meanwhile."""
+        llm = llm or self.llm
+        self.llm_users[llm] += 1
+        self.residency.touch(llm)
+        try:
+            yield llm
+        finally:
+            self.llm_users[llm] -= 1
+            if not self.llm_users[llm]:
+                del self.llm_users[llm]
+
     def switch_asr_provider(self, provider_name):
         if provider_name in self.asr_adapters:
             if self.active_asr_provider != provider_name:
-                self.asr.unload()
+                # The previous model stays resident until the residency manager needs its memory
                 self.active_asr_provider = provider_name
                 self.asr = self.asr_adapters[self.active_asr_provider]
                 return True
@@ -69,18 +259,29 @@ class ModuleOrchestrator:
     def switch_tts_provider(self, provider_name):
         if provider_name in self.tts_adapters:
             if self.active_tts_provider != provider_name:
-                self.tts.unload()
+                # The previous model stays resident until the residency manager needs its memory
                 self.active_tts_provider = provider_name
                 self.tts = self.tts_adapters[self.active_tts_provider]
                 return True
         return False
 
+    def switch_knowledge_provider(self, provider_name):
+        if provider_name in self.knowledge_adapters:
+            if self.active_knowledge_provider != provider_name:
+                self.active_knowledge_provider = provider_name
+                self.knowledge = self.knowledge_adapters[self.active_knowledge_provider]
+                return True
+        return False
+
     def get_system_overview(self):
         return {
             "llm": { 
                 "enabled": self.enabled["llm"], 
                 "active_provider": self.active_llm_provider,
-                **self.llm.get_status() 
+                **self.llm.get_status(),
+                "prompt": self.prompt_builder.get_status(),
+                "swap": self.swap_status,
+                "routing": self.router.get_status()
             },
             "asr": { 
                 "enabled": self.enabled["asr"], 
@@ -92,66 +293,213 @@ class ModuleOrchestrator:
                 "active_provider": self.active_tts_provider,
                 **self.tts.get_status() 
             },
-            "knowledge": { "enabled": self.enabled["knowledge"], **self.knowledge.get_status() }
+            "knowledge": { 
+                "enabled": self.enabled["knowledge"], 
+                "active_provider": self.active_knowledge_provider,
+                **self.knowledge.get_status() 
+            },
+            "memory": self.sessions.get_status(),
+            "residency": self.residency.get_status(active=self._active_adapters()),
+            "cache": {
+                "responses": self.response_cache.get_status(),
+                "retrieval": self.retrieval_cache.get_status(),
+                "tts": self.tts_cache.get_status()
+            }
         }
 
     def load_module(self, module_type, config):
         # Normalize config keys (e.g., "Model Provider" -> "model_provider")
         normalized_config = {k.lower().replace(" ", "_"): v for k, v in config.items()}
         
-        if module_type == "llm": 
-            return self.llm.load(normalized_config)
-        if module_type == "asr": 
-            return self.asr.load(normalized_config)
-        if module_type == "tts": 
-            return self.tts.load(normalized_config)
+        if module_type in ("llm", "asr", "tts"):
+            provider = getattr(self, f"active_{module_type}_provider")
+            adapter = getattr(self, module_type)
+            if self.residency.find(module_type, provider, normalized_config) is adapter:
+                self.residency.touch(adapter)
+                return True
+            return self.residency.load(module_type, provider, adapter, normalized_config, protect=self._active_adapters())
+        if module_type == "knowledge": 
+            self._invalidate_knowledge_caches()
+            return self.knowledge.load(normalized_config)
         return False
 
-    def generate_llm(self, user_input, params):
+    async def _retrieve(self, user_input, params):
+        if not (self.enabled["knowledge"] and params.get("use_rag", True)):
+            return []
+        key = (self.active_knowledge_provider, normalize_text(user_input))
+        retrieved = self.retrieval_cache.get(key)
+        if retrieved is None:
+            # SQLite / embedding search is blocking; keep it off the event loop
+            retrieved = await asyncio.to_thread(self.knowledge.retrieve, user_input)
+            self.retrieval_cache.put(key, retrieved)
+        return retrieved
+
+    def _response_key(self, user_input, params, retrieved, llm, memory):
+        """Cache key for a whole reply, or None when response caching is off."""
+        if not params.get("response_cache"):
+            return None
+        # The conversation the prompt continues: "why?" means something else in every session
+        lines = memory.get_rendered_lines()
+        first = memory.message_count - len(lines)
+        history = "".join(lines[max(memory.prompt_start - first, 0):])
+        return (
+            hashlib.sha1(history.encode("utf-8")).hexdigest(),
+            normalize_text(user_input),
+            type(llm).__name__,
+            llm.get_status().get("model"),
+            params.get("system_prompt"),
+            params.get("temperature"),
+            params.get("top_p"),
+            params.get("max_tokens"),
+            params.get("frequency_penalty"),
+            # Fingerprint of the knowledge the answer was grounded in
+            tuple(item.get("id", item["source"]) for item in retrieved)
+        )
+
+    async def _build_prompt(self, llm, memory, user_input, retrieved, params):
+        # Update Memory, then fit system prompt, context and history into the model's context window
+        memory.add_message("user", user_input)
+        # Clamp the reply length too, so the server's n_predict matches what the prompt left free
+        params["max_tokens"] = self.prompt_builder.generation_reserve(llm, params)
+        return await self.prompt_builder.build(llm, memory, retrieved, params)
+
+    async def generate_llm(self, user_input, params, session_id=None):
         if not self.enabled["llm"]: return "LLM Module is disabled."
         
-        # 1. RAG Retrieval (If enabled)
-        context = ""
-        sources = []
-        if self.enabled["knowledge"] and params.get("use_rag", True):
-            retrieved = self.knowledge.retrieve(user_input)
-            if retrieved:
-                context = "\nRELEVANT CONTEXT FROM KNOWLEDGE BASE:\n"
-                for item in retrieved:
-                    context += f"--- Source: {item['source']} ---\n{item['content']}\n"
-                    sources.append(item['source'])
-                context += "\nEND OF CONTEXT.\n"
-
-        # 2. Update Memory
-        self.memory.add_message("user", user_input)
-        
-        # 3. Build Contextual Prompt
-        history = self.memory.get_context_string()
-        system_prompt = params.get("system_prompt", "You are Jarvis.")
-        full_prompt = f"{system_prompt}\n{context}\n{history}Jarvis:"
-        
-        # 4. Generate
-        response = self.llm.generate(full_prompt, params)
-        
-        # 5. Save Response
-        if response and not response.startswith("Error"):
-            self.memory.add_message("assistant", response)
+        session = self.sessions.get(session_id)
+        # Lets servers with prompt caching pin the session to one KV cache slot
+        params = {**params, "session_id": session.session_id}
+        async with session.lock:
+            # 1. RAG Retrieval (If enabled)
+            retrieved = await self._retrieve(user_input, params)
+            route, reason, llm = self._route(user_input, retrieved, params)
+
+            cache_key = self._response_key(user_input, params, retrieved, llm, session.memory)
+            cached = self.response_cache.get(cache_key) if cache_key else None
+            if cached:
+                session.memory.add_message("user", user_input)
+                session.memory.add_message("assistant", cached["text"])
+                return dict(cached)
+
+            with self._hold_llm(llm):
+                full_prompt, sources = await self._build_prompt(llm, session.memory, user_input, retrieved, params)
+                
+                # 2. Generate
+                started = time.perf_counter()
+                response = await llm.agenerate(full_prompt, params)
+            ok = bool(response) and not response.startswith("Error")
+            self.router.record(route, reason, time.perf_counter() - started, ok=ok)
+            
+            # 3. Save Response
+            if ok:
+                session.memory.add_message("assistant", response)
+                if cache_key:
+                    self.response_cache.put(cache_key, {"text": response, "sources": sources})
             
         return {
             "text": response,
-            "sources": sources
+            "sources": sources,
+            "route": route
         }
 
-    def transcribe(self, wav_path, params):
+    async def generate_llm_stream(self, user_input, params, session_id=None):
+        """Yields {"type": "token"} events as they arrive, then one {"type": "final"} event."""
+        if not self.enabled["llm"]:
+            yield {"type": "final", "text": "LLM Module is disabled.", "sources": []}
+            return
+
+        session = self.sessions.get(session_id)
+        params = {**params, "session_id": session.session_id}
+        async with session.lock:
+            retrieved = await self._retrieve(user_input, params)
+            route, reason, llm = self._route(user_input, retrieved, params)
+
+            cache_key = self._response_key(user_input, params, retrieved, llm, session.memory)
+            cached = self.response_cache.get(cache_key) if cache_key else None
+            if cached:
+                session.memory.add_message("user", user_input)
+                session.memory.add_message("assistant", cached["text"])
+                yield {"type": "token", "text": cached["text"]}
+                yield {"type": "final", **cached}
+                return
+
+            parts = []
+            first_token_s = None
+            with self._hold_llm(llm):
+                full_prompt, sources = await self._build_prompt(llm, session.memory, user_input, retrieved, params)
+                started = time.perf_counter()
+                async for token in llm.agenerate_stream(full_prompt, params):
+                    if first_token_s is None:
+                        first_token_s = time.perf_counter() - started
+                    parts.append(token)
+                    yield {"type": "token", "text": token}
+
+            response = "".join(parts).strip()
+            ok = bool(response) and not response.startswith("Error")
+            self.router.record(route, reason, time.perf_counter() - started, first_token_s, ok=ok)
+            if ok:
+                session.memory.add_message("assistant", response)
+                if cache_key:
+                    self.response_cache.put(cache_key, {"text": response, "sources": sources})
+
+        yield {"type": "final", "text": response, "sources": sources, "route": route}
+
+    async def transcribe(self, wav_path, params):
+        if not self.enabled["asr"]: return None
+        self.residency.touch(self.asr)
+        return await self.asr.agenerate(wav_path, params)
+
+    async def transcribe_pcm(self, pcm, params):
+        if not self.enabled["asr"]: return None
+        self.residency.touch(self.asr)
+        return await self.asr.atranscribe_pcm(pcm, params)
+
+    def open_asr_stream(self, params, partial_interval_s=None):
+        """Incremental recognizer on the active ASR adapter (see streaming_asr.open_stream)."""
         if not self.enabled["asr"]: return None
-        return self.asr.generate(wav_path, params)
+        self.residency.touch(self.asr)
+        return open_stream(self.asr, params, partial_interval_s)
 
-    def synthesize(self, text, params):
+    async def synthesize(self, text, params):
         if not self.enabled["tts"]: return None
-        return self.tts.generate(text, params)
+        output_path = params.get("output_path")
+        key = (self.active_tts_provider, self.tts.get_status().get("model"), text.strip())
+
+        audio = self.tts_cache.get(key)
+        if audio is not None and output_path:
+            with open(output_path, "wb") as f:
+                f.write(audio)
+            return output_path
+
+        self.residency.touch(self.tts)
+        result = await self.tts.agenerate(text, params)
+        if result and os.path.exists(result):
+            with open(result, "rb") as f:
+                audio = f.read()
+            self.tts_cache.put(key, audio, len(audio))
+        return result
     
-    def ingest_knowledge(self, source: str, content: str):
-        return self.knowledge.ingest(source, content)
+    def phrase_audio(self, text):
+        """WAV bytes for a pre-rendered fixed phrase in the active voice, if the TTS provider has one."""
+        if not self.enabled["tts"]: return None
+        phrase_wav = getattr(self.tts, "phrase_wav", None)
+        return phrase_wav(text) if phrase_wav else None
+
+    async def ingest_knowledge(self, source: str, content: str):
+        result = await asyncio.to_thread(self.knowledge.ingest, source, content)
+        self._invalidate_knowledge_caches()
+        return result
+
+    async def ingest_knowledge_stream(self, source: str, pieces):
+        # Reads, chunks and writes the spooled upload in a worker thread
+        result = await asyncio.to_thread(self.knowledge.ingest_stream, source, pieces)
+        self._invalidate_knowledge_caches()
+        return result
+
+    def _invalidate_knowledge_caches(self):
+        # Cached retrievals and the replies grounded in them may be stale now
+        self.retrieval_cache.clear()
+        self.response_cache.clear()
 
-    def clear_memory(self):
-        self.memory.clear()
+    def clear_memory(self, session_id=None):
+        self.sessions.clear(session_id)
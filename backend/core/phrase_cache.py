@@ -0,0 +1,67 @@
+import os
+import hashlib
+import threading
+
+# Fixed lines spoken on every wake word / empty reply
+DEFAULT_PHRASES = [
+    "Yes, sir?",
+    "Yes, sir? I'm listening.",
+    "I'm here, sir."
+]
+
+class PhraseAudioCache:
+    """
+    Pre-rendered raw PCM for fixed assistant phrases, stored on disk per voice + text.
+    Rendering happens once per voice; later lookups are a dict hit or one small file read.
+    """
+
+    def __init__(self, cache_dir="phrase_cache"):
+        self.cache_dir = cache_dir
+        self.pcm = {}
+        self.lock = threading.Lock()
+
+    def _path(self, voice, sample_rate, text):
+        digest = hashlib.sha1(f"{voice}\0{sample_rate}\0{text}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.pcm")
+
+    def get(self, voice, sample_rate, text):
+        """Returns S16_LE mono PCM for the phrase, or None when it was never rendered."""
+        key = (voice, sample_rate, text.strip())
+        pcm = self.pcm.get(key)
+        if pcm is not None:
+            return pcm
+        path = self._path(*key)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            pcm = f.read()
+        with self.lock:
+            self.pcm[key] = pcm
+        return pcm
+
+    def prerender(self, voice, sample_rate, phrases, synthesize_pcm):
+        """Renders every phrase not yet on disk with synthesize_pcm(text) -> PCM bytes."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        rendered = 0
+        for text in phrases:
+            text = text.strip()
+            if not text or self.get(voice, sample_rate, text) is not None:
+                continue
+            try:
+                pcm = synthesize_pcm(text)
+            except Exception as e:
+                print(f"⚠️ Could not pre-render phrase '{text}': {e}")
+                continue
+            if not pcm:
+                continue
+            path = self._path(voice, sample_rate, text)
+            # Write-then-rename so a crash never leaves a truncated clip behind
+            with open(path + ".tmp", "wb") as f:
+                f.write(pcm)
+            os.replace(path + ".tmp", path)
+            with self.lock:
+                self.pcm[(voice, sample_rate, text)] = pcm
+            rendered += 1
+        if rendered:
+            print(f"🔊 Pre-rendered {rendered} phrase(s) for {voice}")
+        return rendered
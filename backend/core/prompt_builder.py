@@ -0,0 +1,138 @@
+from collections import OrderedDict
+
+DEFAULT_CONTEXT_WINDOW = 2048
+# Keeps a little headroom for tokenizer mismatch and the stop sequence
+SAFETY_MARGIN_TOKENS = 16
+# Most of the window generation may reserve; the rest is always left for the prompt
+GENERATION_SHARE = 0.5
+# Share of the free budget retrieved context may take before history is considered
+CONTEXT_SHARE = 0.5
+# When history overflows, the window start jumps far enough to free this share of the
+# history budget, so the prompt prefix stays identical for the next several turns
+SLIDE_HEADROOM = 0.25
+
+def approx_tokens(text):
+    """Cheap token estimate (~3 characters per token, erring on the high side for BPE vocabularies)."""
+    return len(text) // 3 + 1
+
+
+class PromptBuilder:
+    """
+    Fits system prompt + retrieved context + history into the model's context window.
+
+    Layout is system prompt, older turns, retrieved context, latest user turn, so the
+    prefix up to the previous reply is byte-identical across turns and the server's
+    KV cache only has to prefill the new tail.
+    Token counts come from the active provider's tokenizer when it has one
+    (adapter.acount_tokens), otherwise from approx_tokens, and are cached per text.
+    """
+
+    def __init__(self, cache_size=4096):
+        self.cache_size = cache_size
+        self.counts = OrderedDict()
+        self.counter = None
+        self.last_stats = {}
+
+    async def count(self, llm, text):
+        counter = getattr(llm, "acount_tokens", None)
+        if counter != self.counter:
+            # Another provider means another tokenizer
+            self.counter = counter
+            self.counts.clear()
+
+        cached = self.counts.get(text)
+        if cached is not None:
+            self.counts.move_to_end(text)
+            return cached
+
+        tokens = None
+        if counter:
+            tokens = await counter(text)
+        if tokens is None:
+            tokens = approx_tokens(text)
+
+        self.counts[text] = tokens
+        if len(self.counts) > self.cache_size:
+            self.counts.popitem(last=False)
+        return tokens
+
+    def generation_reserve(self, llm, params):
+        """Tokens kept free for the reply: max_tokens, capped so a large setting can't starve the prompt."""
+        context_window = getattr(llm, "context_window", DEFAULT_CONTEXT_WINDOW)
+        return max(1, min(int(params.get("max_tokens", 128)), int(context_window * GENERATION_SHARE)))
+
+    async def build(self, llm, memory, retrieved, params):
+        """
+        Returns (prompt, sources). memory already holds the latest user turn;
+        the oldest history and the lowest-ranked context are dropped first.
+        """
+        context_window = getattr(llm, "context_window", DEFAULT_CONTEXT_WINDOW)
+        system_prompt = params.get("system_prompt", "You are Jarvis.")
+        lines = memory.get_rendered_lines()
+
+        budget = context_window - self.generation_reserve(llm, params) - SAFETY_MARGIN_TOKENS
+        budget -= await self.count(llm, f"{system_prompt}\n\n") + await self.count(llm, "Jarvis:")
+        # The latest user turn is always kept
+        if lines:
+            budget -= await self.count(llm, lines[-1])
+
+        # 1. Retrieved context, best match first, up to its share of the budget
+        context = ""
+        sources = []
+        context_tokens = 0
+        if retrieved:
+            header = "\nRELEVANT CONTEXT FROM KNOWLEDGE BASE:\n"
+            footer = "\nEND OF CONTEXT.\n"
+            context_budget = int(max(budget, 0) * CONTEXT_SHARE) - await self.count(llm, header + footer)
+            for item in retrieved:
+                block = f"--- Source: {item['source']} ---\n{item['content']}\n"
+                tokens = await self.count(llm, block)
+                if context_tokens + tokens > context_budget:
+                    continue
+                context += block
+                context_tokens += tokens
+                sources.append(item['source'])
+            if context:
+                context = header + context + footer
+                context_tokens += await self.count(llm, header + footer)
+        budget -= context_tokens
+
+        # 2. History from the session's sticky window start; only moved forward on overflow
+        first = memory.message_count - len(lines)
+        start = self._pair_start(lines, max(memory.prompt_start - first, 0))
+        older = lines[start:-1]
+        history_tokens = 0
+        for line in older:
+            history_tokens += await self.count(llm, line)
+        if history_tokens > budget:
+            target = budget * (1.0 - SLIDE_HEADROOM)
+            while start < len(lines) - 1 and history_tokens > target:
+                history_tokens -= await self.count(llm, lines[start])
+                start += 1
+            # Drop whole exchanges: never open the history on a reply without its question
+            while start < len(lines) - 1 and lines[start].startswith("Jarvis:"):
+                history_tokens -= await self.count(llm, lines[start])
+                start += 1
+            memory.prompt_start = first + start
+        budget -= history_tokens
+
+        self.last_stats = {
+            "context_window": context_window,
+            "history_messages": len(lines) - start,
+            "dropped_messages": start,
+            "context_tokens": context_tokens,
+            "free_tokens": max(budget, 0)
+        }
+        older_history = "".join(lines[start:-1])
+        latest = lines[-1] if lines else ""
+        # Retrieved context changes every turn, so it goes after everything that doesn't
+        return f"{system_prompt}\n\n{older_history}{context}{latest}Jarvis:", sources
+
+    def _pair_start(self, lines, start):
+        """Moves a window start past orphan replies (left behind by pruning or an old start)."""
+        while start < len(lines) - 1 and lines[start].startswith("Jarvis:"):
+            start += 1
+        return start
+
+    def get_status(self):
+        return {**self.last_stats, "cached_counts": len(self.counts)}
@@ -0,0 +1,171 @@
+import re
+import time
+import threading
+from collections import deque
+
+DEFAULT_ROUTE = "default"
+
+# Turns that read like chit-chat rather than a task
+SMALL_TALK = re.compile(
+    r"^(hi|hello|hey|thanks|thank you|good (morning|evening|night)|how are you|"
+    r"what'?s up|ok(ay)?|cool|nice|yes|no|bye)\b", re.IGNORECASE
+)
+# Turns that usually need the bigger model even when short
+HARD_TASK = re.compile(
+    r"\b(explain|why|compare|analy[sz]e|summari[sz]e|write|code|debug|calculate|plan|step by step)\b",
+    re.IGNORECASE
+)
+
+# Latency samples older than this no longer count, so a slow spell doesn't steer routing forever
+SAMPLE_MAX_AGE_S = 300
+# While the latency budget diverts turns, every Nth one still probes the default route
+PROBE_EVERY = 10
+# A route model that failed to load is retried after this long, doubling per failure
+LOAD_RETRY_S = 30
+LOAD_RETRY_MAX_S = 600
+
+class RouteStats:
+    """Rolling, time-stamped latency samples for one route."""
+
+    def __init__(self, window=200, max_age_s=SAMPLE_MAX_AGE_S):
+        self.latencies = deque(maxlen=window)
+        self.first_tokens = deque(maxlen=window)
+        self.max_age_s = max_age_s
+        self.requests = 0
+        self.errors = 0
+        self.reasons = {}
+
+    def percentile(self, samples, q):
+        cutoff = time.monotonic() - self.max_age_s
+        recent = [value for at, value in samples if at >= cutoff]
+        if not recent:
+            return None
+        ordered = sorted(recent)
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+    def get_status(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "p50_s": self.percentile(self.latencies, 0.5),
+            "p95_s": self.percentile(self.latencies, 0.95),
+            "first_token_p50_s": self.percentile(self.first_tokens, 0.5),
+            "reasons": dict(self.reasons)
+        }
+
+
+class RequestRouter:
+    """
+    Picks the LLM route for each request with cheap rules: retrieved context, prompt
+    length, small-talk vs task wording and the caller's latency budget. "default" is the
+    active model; other routes (e.g. "fast" = BitNet) name a provider + config.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.routes = {} # name -> {"provider": ..., "config": {...}}
+        self.fast_route = "fast" # Where cheap turns go
+        self.short_max_words = 20
+        self.diverted = 0
+        self.load_failures = {} # name -> {"error", "attempts", "retry_at"}
+        self.stats = {DEFAULT_ROUTE: RouteStats()}
+        self.lock = threading.Lock()
+
+    def configure(self, config):
+        """
+        config.json "routing": {"enabled", "short_max_words", "fast_route",
+        "routes": {"fast": {"Model Provider", "Model", ...}}}. fast_route defaults to
+        "fast", or the first configured route when there is none by that name.
+        """
+        self.enabled = bool(config.get("enabled", False))
+        self.short_max_words = int(config.get("short_max_words", 20))
+        self.routes = {}
+        for name, route in config.get("routes", {}).items():
+            route = {k.lower().replace(" ", "_"): v for k, v in route.items()}
+            provider = route.pop("model_provider", None)
+            if provider and name != DEFAULT_ROUTE:
+                self.routes[name] = {"provider": provider, "config": route}
+        # New settings may fix what made a route fail, so try those again at once
+        self.load_failures = {}
+        self.fast_route = config.get("fast_route") or ("fast" if "fast" in self.routes else next(iter(self.routes), "fast"))
+        with self.lock:
+            for name in self.routes:
+                self.stats.setdefault(name, RouteStats())
+
+    def load_failed(self, name, error):
+        """Records a failed route load; it isn't retried until the backoff has passed."""
+        with self.lock:
+            attempts = self.load_failures.get(name, {}).get("attempts", 0) + 1
+            delay = min(LOAD_RETRY_S * 2 ** (attempts - 1), LOAD_RETRY_MAX_S)
+            self.load_failures[name] = {"error": error, "attempts": attempts, "retry_at": time.monotonic() + delay}
+
+    def load_succeeded(self, name):
+        with self.lock:
+            self.load_failures.pop(name, None)
+
+    def can_load(self, name):
+        failure = self.load_failures.get(name)
+        return failure is None or time.monotonic() >= failure["retry_at"]
+
+    def choose(self, user_input, retrieved, params, available=()):
+        """Returns (route, reason). Only routes in `available` (loaded models) are picked besides default."""
+        if not self.enabled:
+            return DEFAULT_ROUTE, "default"
+        requested = params.get("route")
+        if requested == DEFAULT_ROUTE or requested in available:
+            return requested, "requested"
+        fast = self.fast_route
+        if fast not in available:
+            return DEFAULT_ROUTE, "default"
+        if retrieved:
+            return DEFAULT_ROUTE, "rag_context"
+
+        budget = params.get("latency_budget_ms")
+        if budget:
+            stats = self.stats[DEFAULT_ROUTE]
+            p50 = stats.percentile(stats.latencies, 0.5)
+            if p50 is not None and p50 * 1000 > float(budget):
+                self.diverted += 1
+                # Keep measuring the default model, or its p50 would never recover
+                if self.diverted % PROBE_EVERY == 0:
+                    return DEFAULT_ROUTE, "latency_probe"
+                return fast, "latency_budget"
+
+        text = user_input.strip()
+        if SMALL_TALK.match(text):
+            return fast, "small_talk"
+        if len(text.split()) <= self.short_max_words and not HARD_TASK.search(text):
+            return fast, "short_turn"
+        return DEFAULT_ROUTE, "complex_turn"
+
+    def record(self, route, reason, seconds, first_token_s=None, ok=True):
+        with self.lock:
+            stats = self.stats.setdefault(route, RouteStats())
+            stats.requests += 1
+            stats.reasons[reason] = stats.reasons.get(reason, 0) + 1
+            if ok:
+                now = time.monotonic()
+                stats.latencies.append((now, seconds))
+                if first_token_s is not None:
+                    stats.first_tokens.append((now, first_token_s))
+            else:
+                stats.errors += 1
+
+    def get_status(self):
+        with self.lock:
+            now = time.monotonic()
+            return {
+                "enabled": self.enabled,
+                "fast_route": self.fast_route,
+                "routes": {
+                    name: {
+                        "provider": self.routes[name]["provider"] if name in self.routes else None,
+                        "model": self.routes[name]["config"].get("model") if name in self.routes else None,
+                        "load_error": self.load_failures[name]["error"] if name in self.load_failures else None,
+                        "load_attempts": self.load_failures[name]["attempts"] if name in self.load_failures else 0,
+                        "retry_in_s": round(max(0, self.load_failures[name]["retry_at"] - now), 1) if name in self.load_failures else None,
+                        **stats.get_status()
+                    }
+                    for name, stats in self.stats.items()
+                }
+            }
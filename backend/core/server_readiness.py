@@ -0,0 +1,133 @@
+import os
+import re
+import time
+import threading
+from collections import deque
+
+# Lines model servers print once their HTTP listener is up
+READY_PATTERNS = [
+    r"server is listening",        # llama-server
+    r"whisper server listening",   # whisper.cpp server
+    r"HTTP server listening",      # older llama-server builds
+    r"all slots are idle",         # llama-server, model loaded
+    r"Uvicorn running on",         # vLLM
+    r"Application startup complete"
+]
+
+class ServerWatcher:
+    """
+    Waits for a spawned model server to become ready. It reacts to events instead of
+    sleeping a fixed second between polls:
+      - the server's output (stdout pipe or log file) is tailed, and a "listening" line
+        triggers an immediate health check,
+      - health checks otherwise back off exponentially from a few ms,
+      - the child exiting fails the wait at once, with its last log lines as the error.
+    """
+
+    def __init__(self, process, log_path=None, name="server", ready_patterns=READY_PATTERNS):
+        self.process = process
+        self.log_path = log_path
+        self.name = name
+        self.ready_re = re.compile("|".join(ready_patterns), re.IGNORECASE)
+        self.lines = deque(maxlen=50)
+        self.changed = threading.Event() # Set on a ready line or when output ends
+        self.stopped = threading.Event()
+        self.started_at = time.perf_counter()
+        self.listening_at = None
+        self.error = None
+        self.metrics = {}
+
+        if process.stdout is not None:
+            target = self._read_pipe
+        elif log_path:
+            target = self._tail_file
+        else:
+            target = None
+        if target:
+            threading.Thread(target=target, name=f"{name}-log", daemon=True).start()
+
+    def _on_line(self, line):
+        line = line.rstrip()
+        if not line:
+            return
+        self.lines.append(line)
+        if self.listening_at is None and self.ready_re.search(line):
+            self.listening_at = time.perf_counter()
+            self.changed.set()
+
+    def _read_pipe(self):
+        # Keeps draining after startup too, so a chatty server never blocks on a full pipe
+        for raw in iter(self.process.stdout.readline, b""):
+            self._on_line(raw.decode("utf-8", errors="replace"))
+        self.changed.set()
+
+    def _tail_file(self):
+        while not self.stopped.is_set() and not os.path.exists(self.log_path):
+            time.sleep(0.02)
+        with open(self.log_path, "r", errors="replace") as f:
+            while not self.stopped.is_set():
+                line = f.readline()
+                if line:
+                    self._on_line(line)
+                elif self.process.poll() is not None:
+                    self.changed.set()
+                    return
+                else:
+                    time.sleep(0.02)
+
+    def tail(self, n=5):
+        return list(self.lines)[-n:]
+
+    def wait_ready(self, session, health_url, timeout=60, min_interval=0.05, max_interval=1.0, ok_statuses=(200,)):
+        """Returns True once health_url answers with one of ok_statuses; on failure self.error says why."""
+        deadline = self.started_at + timeout
+        interval = min_interval
+        checks = 0
+        next_progress = 5
+
+        while True:
+            code = self.process.poll()
+            if code is not None:
+                last = " | ".join(self.tail(3))
+                self.error = f"{self.name} exited with code {code}" + (f": {last}" if last else "")
+                break
+
+            checks += 1
+            try:
+                res = session.get(health_url, timeout=1)
+                if res.status_code in ok_statuses:
+                    now = time.perf_counter()
+                    self.metrics = {
+                        "load_time_s": round(now - self.started_at, 3),
+                        "listening_s": round(self.listening_at - self.started_at, 3) if self.listening_at else None,
+                        "health_checks": checks
+                    }
+                    print(f"✅ {self.name} ready in {self.metrics['load_time_s']}s")
+                    self.stop()
+                    return True
+            except: pass
+
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                self.error = "Startup Timeout"
+                break
+            elapsed = time.perf_counter() - self.started_at
+            if elapsed >= next_progress:
+                print(f"⏳ Waiting for {self.name}... ({int(elapsed)}s)")
+                next_progress += 5
+
+            # Sleep until the next check, but wake early if the server logs that it is listening
+            if self.changed.wait(min(interval, remaining)):
+                self.changed.clear()
+                interval = min_interval
+            else:
+                interval = min(interval * 2, max_interval)
+
+        self.metrics = {"load_time_s": None, "health_checks": checks}
+        print(f"❌ {self.name} failed to start: {self.error}")
+        self.stop()
+        return False
+
+    def stop(self):
+        """Stops tailing a log file (a stdout pipe keeps draining until the process exits)."""
+        self.stopped.set()
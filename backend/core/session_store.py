@@ -0,0 +1,62 @@
+import asyncio
+import time
+from collections import OrderedDict
+from .memory_manager import MemoryManager
+
+DEFAULT_SESSION_ID = "default"
+
+class ChatSession:
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.memory = MemoryManager()
+        # One turn at a time per session; different sessions run concurrently
+        self.lock = asyncio.Lock()
+        self.last_used = time.time()
+
+
+class SessionStore:
+    """
+    Per-session conversation memory, evicting the least recently used session
+    once more than max_sessions are held.
+    """
+
+    def __init__(self, max_sessions=256):
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+        self.evictions = 0
+
+    def get(self, session_id=None):
+        session_id = session_id or DEFAULT_SESSION_ID
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = ChatSession(session_id)
+            self.sessions[session_id] = session
+            self._evict()
+        else:
+            self.sessions.move_to_end(session_id)
+        session.last_used = time.time()
+        return session
+
+    def clear(self, session_id=None):
+        """Clears one session's history, or every session when no id is given."""
+        if session_id is None:
+            self.sessions.clear()
+        elif session_id in self.sessions:
+            self.sessions[session_id].memory.clear()
+
+    def _evict(self):
+        # Sessions with a turn in flight are skipped so their history is not lost mid-reply
+        for session_id in list(self.sessions):
+            if len(self.sessions) <= self.max_sessions:
+                break
+            if self.sessions[session_id].lock.locked():
+                continue
+            del self.sessions[session_id]
+            self.evictions += 1
+
+    def get_status(self):
+        return {
+            "sessions": len(self.sessions),
+            "max_sessions": self.max_sessions,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,82 @@
+import asyncio
+import re
+
+# A sentence ends at terminal punctuation (optionally followed by closing quotes/brackets)
+# and whitespace, or at a line break.
+SENTENCE_END = re.compile(r'[.!?…]+["\')\]]*\s+|\n+')
+
+class SentenceSplitter:
+    """Incrementally splits streamed text into complete sentences."""
+
+    def __init__(self, min_chars=12):
+        # Very short fragments ("Mr.", "e.g.") are merged into the next sentence
+        self.min_chars = min_chars
+        self.buffer = ""
+
+    def feed(self, text):
+        self.buffer += text
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self.buffer):
+            candidate = self.buffer[start:match.end()].strip()
+            if len(candidate) < self.min_chars:
+                continue
+            sentences.append(candidate)
+            start = match.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self):
+        tail = self.buffer.strip()
+        self.buffer = ""
+        return tail or None
+
+
+class SpeechPipeline:
+    """
+    Synthesizes sentences while the LLM is still generating.
+    Sentences are spoken one at a time in arrival order, so chunks reach the client in sequence.
+    """
+
+    def __init__(self, synthesize_fn, send_fn):
+        # synthesize_fn: coroutine text -> base64 audio (or None)
+        # send_fn: coroutine taking the chunk payload
+        self.synthesize_fn = synthesize_fn
+        self.send_fn = send_fn
+        self.splitter = SentenceSplitter()
+        self.queue = asyncio.Queue()
+        self.chunks_sent = 0
+        self._worker = asyncio.create_task(self._run())
+
+    def feed(self, text):
+        for sentence in self.splitter.feed(text):
+            self.queue.put_nowait(sentence)
+
+    async def finish(self):
+        """Flushes the trailing partial sentence and waits for all audio to be sent."""
+        tail = self.splitter.flush()
+        if tail:
+            self.queue.put_nowait(tail)
+        self.queue.put_nowait(None)
+        await self._worker
+        return self.chunks_sent
+
+    def cancel(self):
+        self._worker.cancel()
+
+    async def _run(self):
+        while True:
+            sentence = await self.queue.get()
+            if sentence is None:
+                break
+            audio = await self.synthesize_fn(sentence)
+            if not audio:
+                continue
+            await self.send_fn({
+                "sender": "Jarvis",
+                "type": "audio_chunk",
+                "index": self.chunks_sent,
+                "text": sentence,
+                "audio": audio
+            })
+            self.chunks_sent += 1
@@ -0,0 +1,163 @@
+import queue
+import asyncio
+import numpy as np
+from .vad import SpeechSegmenter, create_vad
+from .audio_utils import TARGET_RATE, to_mono_16k, to_int16
+from ..adapters.base_module_adapter import BaseModuleAdapter
+
+class BufferedStream:
+    """
+    Incremental interface for batch-only engines (whisper.cpp, faster-whisper):
+    audio is buffered as it arrives and transcribed once speech ends. With
+    partial_interval_s set, the buffer is also re-transcribed periodically for partials.
+    With astream_fn (PCM -> async iterator of segment texts), afinish() hands back the
+    final transcript segment by segment as it decodes.
+    """
+
+    def __init__(self, transcribe_fn, sample_rate=16000, partial_interval_s=None, astream_fn=None):
+        self.transcribe_fn = transcribe_fn
+        self.astream_fn = astream_fn
+        self.sample_rate = sample_rate
+        self.partial_interval_s = partial_interval_s
+        self.chunks = []
+        self.samples = 0
+        self.samples_at_partial = 0
+
+    def accept(self, pcm):
+        """Adds int16 PCM; returns a partial transcript or None."""
+        self.chunks.append(np.asarray(pcm, dtype=np.int16))
+        self.samples += len(pcm)
+        if not self.partial_interval_s:
+            return None
+        if (self.samples - self.samples_at_partial) / self.sample_rate < self.partial_interval_s:
+            return None
+        self.samples_at_partial = self.samples
+        return self.transcribe_fn(self._audio())
+
+    def finish(self):
+        if not self.samples:
+            return ""
+        return self.transcribe_fn(self._audio())
+
+    async def afinish(self, on_partial):
+        """finish(), awaiting on_partial(text so far) after each decoded segment."""
+        if not self.astream_fn:
+            return await asyncio.to_thread(self.finish)
+        if not self.samples:
+            return ""
+        texts = []
+        async for text in self.astream_fn(self._audio()):
+            if text.startswith("Error"):
+                return text
+            texts.append(text)
+            await on_partial(" ".join(texts))
+        return " ".join(texts)
+
+    def close(self):
+        self.chunks = []
+        self.samples = 0
+
+    def _audio(self):
+        if len(self.chunks) > 1:
+            self.chunks = [np.concatenate(self.chunks)]
+        return self.chunks[0]
+
+
+def open_stream(asr, params=None, partial_interval_s=None):
+    """A streaming recognizer for the ASR adapter: its own when it has one, else a buffered one."""
+    params = params or {}
+    create_stream = getattr(asr, "create_stream", None)
+    if create_stream:
+        return create_stream(params)
+    # Engines with their own segment stream (Faster-Whisper) report the final pass as it decodes
+    astream_fn = None
+    if type(asr).agenerate_stream is not BaseModuleAdapter.agenerate_stream:
+        astream_fn = lambda pcm: asr.agenerate_stream(pcm, params)
+    return BufferedStream(
+        lambda pcm: asr.transcribe_pcm(pcm, params),
+        partial_interval_s=partial_interval_s,
+        astream_fn=astream_fn
+    )
+
+
+def transcribe_utterance(frames, segmenter, stream, on_partial=None, frame_timeout=1.0):
+    """
+    Pulls int16 frames from a queue (e.g. WakeWordListener.subscribe()) through the VAD
+    into the recognizer, and returns the final transcript as soon as speech ends.
+    Returns None when nobody spoke before the segmenter's timeout.
+    """
+    while True:
+        try:
+            frame = frames.get(timeout=frame_timeout)
+        except queue.Empty:
+            # The capture thread stopped
+            return stream.finish() if segmenter.in_speech else None
+
+        for event, audio in segmenter.feed(frame):
+            if event == "timeout":
+                return None
+            if event in ("speech_start", "speech"):
+                partial = stream.accept(audio)
+                if partial and on_partial:
+                    on_partial(partial)
+            elif event == "speech_end":
+                return stream.finish()
+
+
+class AudioUtterance:
+    """
+    One utterance streamed by a client: raw PCM bytes are split into frames, run through
+    the VAD and pushed into the recognizer. Recognition runs in a worker thread.
+    """
+
+    FRAME_SAMPLES = 512
+
+    def __init__(self, stream, sample_rate=TARGET_RATE, use_vad=True):
+        self.stream = stream
+        self.sample_rate = sample_rate
+        self.segmenter = SpeechSegmenter(create_vad()) if use_vad else None
+        self.leftover = b""
+        self.last_partial = None
+
+    async def feed(self, data):
+        """Returns a list of (event, text) with events speech_start, partial, speech_end, timeout."""
+        data = self.leftover + data
+        # int16 samples never straddle two messages
+        cut = len(data) - len(data) % 2
+        data, self.leftover = data[:cut], data[cut:]
+        pcm = np.frombuffer(data, dtype="<i2")
+        if self.sample_rate != TARGET_RATE:
+            pcm = to_int16(to_mono_16k(pcm, self.sample_rate))
+        return await asyncio.to_thread(self._feed, pcm)
+
+    async def finish(self, on_partial=None):
+        """The final transcript; streams that decode in segments await on_partial(text) as they go."""
+        afinish = getattr(self.stream, "afinish", None)
+        if afinish and on_partial:
+            return await afinish(on_partial)
+        return await asyncio.to_thread(self.stream.finish)
+
+    def close(self):
+        """Drops the utterance without transcribing it, releasing the recognizer."""
+        close = getattr(self.stream, "close", None)
+        if close:
+            close()
+
+    def _feed(self, pcm):
+        events = []
+        for start in range(0, len(pcm), self.FRAME_SAMPLES):
+            frame = pcm[start:start + self.FRAME_SAMPLES]
+            segments = self.segmenter.feed(frame) if self.segmenter else [("speech", frame)]
+            for event, audio in segments:
+                if event in ("speech_start", "speech"):
+                    if event == "speech_start":
+                        events.append(("speech_start", None))
+                    partial = self.stream.accept(audio)
+                    if partial and partial != self.last_partial:
+                        self.last_partial = partial
+                        events.append(("partial", partial))
+                else:
+                    # speech_end / timeout: the rest of this message is past the utterance
+                    events.append((event, None))
+                    return events
+        return events
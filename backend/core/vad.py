@@ -0,0 +1,116 @@
+import numpy as np
+from collections import deque
+
+class EnergyVAD:
+    """
+    Adaptive energy detector: a frame is speech when its RMS is well above the running
+    noise floor. Pure NumPy, no model, a few microseconds per frame.
+    """
+
+    def __init__(self, threshold_ratio=3.0, min_rms=200.0, floor_decay=0.95):
+        self.threshold_ratio = threshold_ratio
+        self.min_rms = min_rms # int16 scale; ignores near-silent rooms
+        self.floor_decay = floor_decay
+        self.noise_floor = None
+
+    def is_speech(self, frame):
+        rms = float(np.sqrt(np.mean(np.square(frame.astype(np.float32))))) if len(frame) else 0.0
+        if self.noise_floor is None:
+            self.noise_floor = rms
+        speech = rms > max(self.noise_floor * self.threshold_ratio, self.min_rms)
+        if not speech:
+            # Only learn the floor from non-speech so loud talking doesn't raise it
+            self.noise_floor = self.floor_decay * self.noise_floor + (1.0 - self.floor_decay) * rms
+        return speech
+
+
+class WebRTCVAD:
+    """webrtcvad (GMM-based, CPU-only). Re-frames input into the 30 ms frames it requires."""
+
+    def __init__(self, sample_rate=16000, aggressiveness=2):
+        import webrtcvad
+        self.vad = webrtcvad.Vad(aggressiveness)
+        self.sample_rate = sample_rate
+        self.frame_samples = sample_rate * 30 // 1000
+        self.pending = np.zeros(0, dtype=np.int16)
+        self.last = False
+
+    def is_speech(self, frame):
+        self.pending = np.concatenate([self.pending, frame.astype(np.int16, copy=False)])
+        votes = []
+        while len(self.pending) >= self.frame_samples:
+            chunk, self.pending = self.pending[:self.frame_samples], self.pending[self.frame_samples:]
+            votes.append(self.vad.is_speech(chunk.tobytes(), self.sample_rate))
+        if votes:
+            self.last = sum(votes) * 2 >= len(votes)
+        return self.last
+
+
+def create_vad(kind="auto", sample_rate=16000, aggressiveness=2):
+    """"webrtc", "energy", or "auto" (webrtcvad when installed, else energy)."""
+    if kind in ("auto", "webrtc"):
+        try:
+            return WebRTCVAD(sample_rate, aggressiveness)
+        except ImportError:
+            if kind == "webrtc":
+                print("⚠️ webrtcvad not installed, using the energy detector")
+    return EnergyVAD()
+
+
+class SpeechSegmenter:
+    """
+    Turns a stream of int16 frames into speech events in real time:
+      ("speech_start", preroll + frame), ("speech", frame), ("speech_end", None),
+      ("timeout", None) when nobody starts talking.
+    """
+
+    def __init__(self, vad, sample_rate=16000, start_ms=90, end_silence_ms=600,
+                 preroll_ms=300, max_speech_s=15.0, no_speech_timeout_s=5.0):
+        self.vad = vad
+        self.sample_rate = sample_rate
+        self.start_ms = start_ms
+        self.end_silence_ms = end_silence_ms
+        self.max_speech_s = max_speech_s
+        self.no_speech_timeout_s = no_speech_timeout_s
+        self.preroll = deque()
+        self.preroll_samples = 0
+        self.preroll_limit = sample_rate * preroll_ms // 1000
+        self.in_speech = False
+        self.voiced_ms = 0.0
+        self.silence_ms = 0.0
+        self.speech_s = 0.0
+        self.waited_s = 0.0
+        self.done = False
+
+    def feed(self, frame):
+        if self.done:
+            return []
+        frame_ms = 1000.0 * len(frame) / self.sample_rate
+        speech = self.vad.is_speech(frame)
+
+        if not self.in_speech:
+            self.preroll.append(frame)
+            self.preroll_samples += len(frame)
+            while self.preroll_samples - len(self.preroll[0]) >= self.preroll_limit:
+                self.preroll_samples -= len(self.preroll.popleft())
+
+            self.voiced_ms = self.voiced_ms + frame_ms if speech else 0.0
+            self.waited_s += frame_ms / 1000.0
+            if self.voiced_ms >= self.start_ms:
+                self.in_speech = True
+                audio = np.concatenate(list(self.preroll))
+                self.preroll.clear()
+                self.preroll_samples = 0
+                return [("speech_start", audio)]
+            if self.no_speech_timeout_s and self.waited_s >= self.no_speech_timeout_s:
+                self.done = True
+                return [("timeout", None)]
+            return []
+
+        self.speech_s += frame_ms / 1000.0
+        self.silence_ms = 0.0 if speech else self.silence_ms + frame_ms
+        events = [("speech", frame)]
+        if self.silence_ms >= self.end_silence_ms or self.speech_s >= self.max_speech_s:
+            self.done = True
+            events.append(("speech_end", None))
+        return events
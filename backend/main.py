@@ -2,14 +2,20 @@ from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
 import json
 import asyncio
+import base64
 import os
 import tempfile
+import uuid
 
 from .core.config_manager import ConfigManager
 from .core.module_manager import ModuleOrchestrator
 from .core.hardware_utils import get_system_specs
+from .core.speech_pipeline import SpeechPipeline
+from .core.streaming_asr import AudioUtterance
+from .core.audio_utils import TARGET_RATE
+from .adapters.knowledge.chunking import iter_text
 from .core.model_provider_utils import check_model_providers, install_provider, MARKETPLACE_MODELS, download_model_task
-from wake import init_wake_word_engine, wait_for_wake_word
+from wake import init_wake_word_engine, WakeWordListener
 
 from .api.audio_routes import router as audio_router
 
@@ -21,31 +27,77 @@ orchestrator = ModuleOrchestrator()
 # Global active websockets
 active_websockets = set()
 
+WAKE_ACKNOWLEDGEMENT = "Yes, sir? I'm listening."
+WAKE_RETRY_S = 60
+wake_listener = None
+
+async def synthesize_base64(text):
+    """Synthesizes text through the active TTS adapter and returns base64-encoded WAV."""
+    # Use a temp file for speech generation
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
+        tmp_path = tmp.name
+    
+    try:
+        # The client plays it; playing it here too would hold up the next sentence
+        tts_path = await orchestrator.synthesize(text, {"output_path": tmp_path, "play_local": False})
+        if tts_path and os.path.exists(tts_path):
+            with open(tts_path, "rb") as f:
+                return base64.b64encode(f.read()).decode("utf-8")
+        return None
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
 async def wake_word_task():
     """Background task to listen for the wake word."""
+    global wake_listener
     porcupine = init_wake_word_engine()
     if not porcupine:
         return
 
+    # The capture thread keeps the microphone open and pushes detections onto the loop
+    wake_listener = WakeWordListener(porcupine)
+    wake_listener.attach(asyncio.get_running_loop())
+    wake_listener.start()
+
     while True:
-        # wait_for_wake_word is blocking, so run in thread
-        if await asyncio.to_thread(wait_for_wake_word, porcupine):
-            print("🔔 Wake word 'Jarvis' detected!")
-            for ws in list(active_websockets):
-                try:
-                    await ws.send_json({
-                        "sender": "System",
-                        "type": "wake_word_detected",
-                        "text": "Yes, sir? I'm listening."
-                    })
-                except:
-                    active_websockets.remove(ws)
-        await asyncio.sleep(0.1)
+        try:
+            await wake_listener.next_detection()
+        except RuntimeError as e:
+            # The listener already retried with backoff; wait longer before reopening the microphone
+            print(f"❌ {e}, retrying in {WAKE_RETRY_S}s")
+            await asyncio.sleep(WAKE_RETRY_S)
+            wake_listener.start()
+            continue
+        print("🔔 Wake word 'Jarvis' detected!")
+        acknowledgement = {
+            "sender": "System",
+            "type": "wake_word_detected",
+            "text": WAKE_ACKNOWLEDGEMENT
+        }
+        # Pre-rendered at TTS load time, so the spoken reply goes out with the event
+        audio = orchestrator.phrase_audio(WAKE_ACKNOWLEDGEMENT)
+        if audio:
+            acknowledgement["audio"] = base64.b64encode(audio).decode("utf-8")
+        for ws in list(active_websockets):
+            try:
+                await ws.send_json(acknowledgement)
+            except:
+                active_websockets.remove(ws)
 
 @app.on_event("startup")
 async def startup_event():
     asyncio.create_task(wake_word_task())
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    if wake_listener:
+        wake_listener.stop()
+
+# Optional memory budget for resident models; defaults come from the detected hardware
+residency_config = config_mgr.config.get("residency", {})
+orchestrator.residency.set_budget(residency_config.get("ram_budget_gb"), residency_config.get("vram_budget_gb"))
+
 # Sync orchestrator with saved config at startup
 llm_provider = config_mgr.config.get("llm", {}).get("Model Provider")
 if llm_provider:
@@ -62,6 +114,14 @@ if tts_provider:
     orchestrator.switch_tts_provider(tts_provider)
     orchestrator.load_module("tts", config_mgr.config.get("tts", {}))
 
+knowledge_provider = config_mgr.config.get("knowledge", {}).get("Knowledge Provider")
+if knowledge_provider:
+    orchestrator.switch_knowledge_provider(knowledge_provider)
+    orchestrator.load_module("knowledge", config_mgr.config.get("knowledge", {}))
+
+# Extra models for per-request routing load in the background
+orchestrator.configure_routing(config_mgr.config.get("routing", {}))
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -79,7 +139,8 @@ async def get_specs():
 
 @app.get("/api/providers")
 async def get_providers():
-    return check_model_providers()
+    # Probes binaries and local servers; keep it off the event loop
+    return await asyncio.to_thread(check_model_providers)
 
 @app.get("/api/marketplace/models")
 async def get_marketplace_models():
@@ -97,13 +158,13 @@ async def download_marketplace_model(data: dict):
 async def install_provider_route(data: dict):
     provider = data.get("provider")
     password = data.get("password")
-    return install_provider(provider, password)
+    return await asyncio.to_thread(install_provider, provider, password)
 
 @app.post("/api/model/load")
 async def load_model_route():
     # Load settings from config
     llm_config = config_mgr.config.get("llm", {})
-    success = orchestrator.load_module("llm", llm_config)
+    success = await asyncio.to_thread(orchestrator.load_module, "llm", llm_config)
     return {"status": "success" if success else "error"}
 
 @app.get("/api/config")
@@ -123,19 +184,24 @@ async def update_config(new_config_part: dict):
         new_provider = llm_settings.get("Model Provider")
         new_model = llm_settings.get("Model")
         
-        # Switch provider if it changed or doesn't match the orchestrator's state
-        provider_changed = False
-        if new_provider and new_provider != active_provider:
-            orchestrator.switch_llm_provider(new_provider)
-            provider_changed = True
-            
-        # If provider or model changed, trigger a reload
-        if provider_changed or (new_model and new_model != old_model):
+        provider_changed = bool(new_provider and new_provider != active_provider)
+
+        # Server options are fixed when it starts, so a change to them also reloads
+        old_llm = current_config.get("llm", {})
+        engine_changed = any(
+            key in llm_settings and llm_settings[key] != old_llm.get(key)
+            for key in ("Parallel Slots", "queue_size", "Context Window", "CPU Threads", "GPU Layers")
+        )
+
+        # If provider, model or server options changed, swap models while the current one keeps answering
+        if provider_changed or engine_changed or (new_model and new_model != old_model):
             # Merge for full config
             merged_llm = current_config.get("llm", {}).copy()
             merged_llm.update(llm_settings)
-            # Run load in background thread to not block the response
-            asyncio.create_task(asyncio.to_thread(orchestrator.load_module, "llm", merged_llm))
+            # Run in a background thread to not block the response
+            asyncio.create_task(asyncio.to_thread(
+                orchestrator.hot_swap_llm, new_provider or active_provider, merged_llm
+            ))
     
     # Check if ASR settings are being updated
     asr_settings = new_config_part.get("asr")
@@ -152,8 +218,15 @@ async def update_config(new_config_part: dict):
             orchestrator.switch_asr_provider(new_provider)
             asr_provider_changed = True
             
-        # Trigger reload if provider or model changed
-        if asr_provider_changed or (new_model and new_model != old_model):
+        # Engine options are fixed at load time, so a change to them also reloads
+        old_asr = current_config.get("asr", {})
+        engine_changed = any(
+            key in asr_settings and asr_settings[key] != old_asr.get(key)
+            for key in ("Compute Type", "Beam Size", "Batch Size", "Workers", "Silence Detection")
+        )
+
+        # Trigger reload if provider, model or engine options changed
+        if asr_provider_changed or engine_changed or (new_model and new_model != old_model):
             merged_asr = current_config.get("asr", {}).copy()
             merged_asr.update(asr_settings)
             asyncio.create_task(asyncio.to_thread(orchestrator.load_module, "asr", merged_asr))
@@ -179,6 +252,17 @@ async def update_config(new_config_part: dict):
             merged_tts.update(tts_settings)
             asyncio.create_task(asyncio.to_thread(orchestrator.load_module, "tts", merged_tts))
 
+    # Check if knowledge settings are being updated
+    knowledge_settings = new_config_part.get("knowledge")
+    if knowledge_settings:
+        new_provider = knowledge_settings.get("Knowledge Provider")
+        if new_provider:
+            orchestrator.switch_knowledge_provider(new_provider)
+        merged_knowledge = current_config.get("knowledge", {}).copy()
+        merged_knowledge.update(knowledge_settings)
+        # Re-embedding can take a while, keep it off the request
+        asyncio.create_task(asyncio.to_thread(orchestrator.load_module, "knowledge", merged_knowledge))
+
     # Merge the new config part into existing config
     for key, value in new_config_part.items():
         if key in current_config and isinstance(current_config[key], dict) and isinstance(value, dict):
@@ -187,85 +271,207 @@ async def update_config(new_config_part: dict):
             current_config[key] = value
             
     config_mgr.save_config(current_config)
+
+    if "routing" in new_config_part:
+        orchestrator.configure_routing(current_config["routing"])
     return {"status": "success"}
 
 @app.post("/api/knowledge/ingest")
 async def ingest_knowledge(file: UploadFile = File(...)):
-    content = await file.read()
-    text = content.decode("utf-8")
-    orchestrator.ingest_knowledge(file.filename, text)
-    return {"status": "ingested", "filename": file.filename}
+    # Decode and chunk the spooled upload piece by piece instead of reading it whole
+    result = await orchestrator.ingest_knowledge_stream(file.filename, iter_text(file.file))
+    return {
+        "status": "ingested",
+        "filename": file.filename,
+        "added": len(result["added"]),
+        "removed": len(result["removed"]),
+        "unchanged": result["skipped"]
+    }
 
 @app.post("/api/memory/clear")
-async def clear_memory():
-    orchestrator.clear_memory()
+async def clear_memory(data: dict = None):
+    # Without a session id every conversation's memory is dropped
+    orchestrator.clear_memory((data or {}).get("session_id"))
     return {"status": "cleared"}
 
+def chat_params():
+    """Maps the saved LLM settings (UI labels) to generation params."""
+    llm_settings = config_mgr.config.get("llm", {})
+    personality = config_mgr.config.get("personality", {})
+    system_prompt = llm_settings.get("System Prompt") or personality.get("system_prompt", "You are Jarvis.")
+    
+    return {
+        "system_prompt": system_prompt,
+        "temperature": float(llm_settings.get("Temperature") if llm_settings.get("Temperature") is not None else 0.7),
+        "max_tokens": int(llm_settings.get("Max Tokens") if llm_settings.get("Max Tokens") is not None else 128),
+        "top_p": float(llm_settings.get("Top P") if llm_settings.get("Top P") is not None else 1.0),
+        "frequency_penalty": float(llm_settings.get("Frequency Penalty") if llm_settings.get("Frequency Penalty") is not None else 0.0),
+        "use_rag": llm_settings.get("rag_enabled", True),
+        "response_cache": llm_settings.get("Response Cache", False),
+        # Lets the router fall back to the fast route when the default model is slower than this
+        "latency_budget_ms": llm_settings.get("Latency Budget (ms)") or None
+    }
+
+async def run_chat_turn(websocket: WebSocket, user_text, message, session_id):
+    """Generates one reply and sends token / audio_chunk frames and the final payload over the websocket."""
+    params = chat_params()
+    # A client can pin a turn to a named route (or "default"); the router checks it is loaded
+    if message.get("route"):
+        params["route"] = message["route"]
+    llm_settings = config_mgr.config.get("llm", {})
+    
+    # Forward partial tokens as they arrive when streaming is enabled
+    stream = message.get("stream", llm_settings.get("Stream Responses", False))
+    speak = message.get("speak_response")
+    
+    # Generate with context and RAG
+    if stream or speak:
+        # Speech is synthesized sentence by sentence while the LLM is still generating
+        speech = SpeechPipeline(synthesize_base64, websocket.send_json) if speak else None
+        result = None
+        try:
+            async for event in orchestrator.generate_llm_stream(user_text, params, session_id):
+                if event["type"] == "token":
+                    if speech:
+                        speech.feed(event["text"])
+                    if stream:
+                        await websocket.send_json({
+                            "sender": "Jarvis",
+                            "type": "token",
+                            "text": event["text"]
+                        })
+                else:
+                    result = event
+            audio_chunks = await speech.finish() if speech else 0
+        except BaseException:
+            if speech:
+                speech.cancel()
+            raise
+    else:
+        result = await orchestrator.generate_llm(user_text, params, session_id)
+    
+    response_payload = {
+        "sender": "Jarvis",
+        "text": result["text"],
+        "sources": result.get("sources", [])
+    }
+    if speak:
+        response_payload["audio_chunks"] = audio_chunks
+
+    await websocket.send_json(response_payload)
+
 @app.websocket("/ws/chat")
 async def websocket_chat(websocket: WebSocket):
     await websocket.accept()
     active_websockets.add(websocket)
+    # Clients that don't name a conversation get memory private to this connection
+    connection_session_id = uuid.uuid4().hex
     try:
         while True:
             data = await websocket.receive_text()
             message = json.loads(data)
-            
-            user_text = message.get("text", "")
-            
-            # Retrieve current system settings
-            llm_settings = config_mgr.config.get("llm", {})
-            personality = config_mgr.config.get("personality", {})
-            system_prompt = llm_settings.get("System Prompt") or personality.get("system_prompt", "You are Jarvis.")
-            
-            # Map UI labels to generation params
-            params = {
-                "system_prompt": system_prompt,
-                "temperature": float(llm_settings.get("Temperature") if llm_settings.get("Temperature") is not None else 0.7),
-                "max_tokens": int(llm_settings.get("Max Tokens") if llm_settings.get("Max Tokens") is not None else 128),
-                "top_p": float(llm_settings.get("Top P") if llm_settings.get("Top P") is not None else 1.0),
-                "frequency_penalty": float(llm_settings.get("Frequency Penalty") if llm_settings.get("Frequency Penalty") is not None else 0.0),
-                "use_rag": llm_settings.get("rag_enabled", True)
-            }
-            
-            # Generate with context and RAG
-            result = await asyncio.to_thread(
-                orchestrator.generate_llm, 
-                user_text, 
-                params
-            )
-            
-            response_payload = {
-                "sender": "Jarvis",
-                "text": result["text"],
-                "sources": result.get("sources", [])
-            }
-
-            # Generate speech if requested
-            if message.get("speak_response"):
-                # Use a temp file for speech generation
-                with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-                    tmp_path = tmp.name
-                
-                tts_path = await asyncio.to_thread(
-                    orchestrator.synthesize,
-                    result["text"],
-                    {"output_path": tmp_path}
-                )
-                
-                if tts_path and os.path.exists(tts_path):
-                    import base64
-                    with open(tts_path, "rb") as f:
-                        audio_base64 = base64.b64encode(f.read()).decode("utf-8")
-                    response_payload["audio"] = audio_base64
-                    os.remove(tts_path)
-
-            await websocket.send_json(response_payload)
+            session_id = message.get("session_id") or connection_session_id
+            await run_chat_turn(websocket, message.get("text", ""), message, session_id)
             
     except WebSocketDisconnect:
         if websocket in active_websockets:
             active_websockets.remove(websocket)
         print("Client disconnected")
 
+@app.websocket("/ws/audio")
+async def websocket_audio(websocket: WebSocket):
+    """
+    Streaming speech recognition. Protocol:
+      client -> {"type": "start", "sample_rate": 16000, "session_id", "chat", "speak_response", "vad", "route"}
+      client -> binary frames of mono int16 little-endian PCM, as the user speaks
+      client -> {"type": "end"} to finish the utterance without waiting for the VAD
+      server -> {"type": "speech_start"}, {"type": "transcript_partial", "text"},
+                {"type": "transcript_final", "text"}, then (with "chat") the same
+                frames /ws/chat sends for the reply
+    """
+    await websocket.accept()
+    connection_session_id = uuid.uuid4().hex
+    utterance = None
+    options = {}
+
+    def drop_utterance():
+        nonlocal utterance
+        if utterance:
+            utterance.close()
+            utterance = None
+
+    async def finish_utterance():
+        nonlocal utterance
+        current, utterance = utterance, None
+
+        async def send_partial(text):
+            await websocket.send_json({"type": "transcript_partial", "text": text})
+
+        try:
+            # Engines that decode in segments (Faster-Whisper) keep sending partials during the final pass
+            text = (await current.finish(send_partial) or "").strip()
+        finally:
+            current.close()
+        await websocket.send_json({"type": "transcript_final", "text": text})
+        # Hand the transcript straight to the chat pipeline; no extra client round trip
+        if text and options.get("chat", True):
+            session_id = options.get("session_id") or connection_session_id
+            await run_chat_turn(websocket, text, options, session_id)
+
+    try:
+        while True:
+            packet = await websocket.receive()
+            if packet["type"] == "websocket.disconnect":
+                break
+
+            if packet.get("text"):
+                control = json.loads(packet["text"])
+                if control.get("type") == "start":
+                    # A new start abandons any utterance still in progress
+                    drop_utterance()
+                    options = control
+                    try:
+                        asr_params = {"threads": 4}
+                        if control.get("grammar"):
+                            # Command-style utterances: engines that support it only match these phrases
+                            asr_params["grammar"] = control["grammar"]
+                        stream = orchestrator.open_asr_stream(asr_params, control.get("partial_interval"))
+                    except Exception as e:
+                        stream = None
+                        print(f"❌ Could not open ASR stream: {e}")
+                    if not stream:
+                        await websocket.send_json({"type": "error", "text": "Speech recognition is not available."})
+                        continue
+                    utterance = AudioUtterance(
+                        stream,
+                        sample_rate=int(control.get("sample_rate", TARGET_RATE)),
+                        use_vad=control.get("vad", True)
+                    )
+                elif control.get("type") == "end" and utterance:
+                    await finish_utterance()
+                continue
+
+            if not packet.get("bytes") or not utterance:
+                continue
+            for event, text in await utterance.feed(packet["bytes"]):
+                if event == "speech_start":
+                    await websocket.send_json({"type": "speech_start"})
+                elif event == "partial":
+                    await websocket.send_json({"type": "transcript_partial", "text": text})
+                elif event == "timeout":
+                    drop_utterance()
+                    await websocket.send_json({"type": "transcript_final", "text": "", "timeout": True})
+                    break
+                elif event == "speech_end":
+                    await finish_utterance()
+                    break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # Pooled recognizers (Vosk) go back to the pool however the connection ends
+        drop_utterance()
+    print("Audio client disconnected")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
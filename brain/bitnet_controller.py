@@ -1,10 +1,11 @@
 import subprocess
 import os
 import platform
-import time
-import requests
 import signal
 
+from backend.core.http_utils import create_session
+from backend.core.server_readiness import ServerWatcher
+
 class BitNetController:
     def __init__(self, model_path=None, threads=4, port=8080):
         self.root_dir = os.path.join(os.getcwd(), "BitNet")
@@ -24,6 +25,8 @@ class BitNetController:
             self.model_path = os.path.join(self.root_dir, "models", "BitNet-b1.58-2B-4T", "ggml-model-i2_s.gguf")
             
         self.server_process = None
+        # Reuse one keep-alive connection for health polls and generations
+        self.session = create_session(pool_size=1)
         self.start_server()
 
     def start_server(self):
@@ -40,28 +43,20 @@ class BitNetController:
             "-ngl", "0"  # CPU only
         ]
         
-        # Start the server and redirect output to null to keep console clean
+        # Output is piped to the watcher rather than the console
         self.server_process = subprocess.Popen(
             command,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
             cwd=self.root_dir,
             preexec_fn=os.setsid if platform.system() != "Windows" else None
         )
         
         # Wait for server to be ready
         print("⏳ Waiting for model to load into RAM...")
-        max_retries = 30
-        for i in range(max_retries):
-            try:
-                response = requests.get(f"http://127.0.0.1:{self.port}/health")
-                if response.status_code == 200:
-                    print("✅ BitNet Loaded and Persistent.")
-                    return
-            except:
-                pass
-            time.sleep(1)
-        print("❌ Server failed to start.")
+        watcher = ServerWatcher(self.server_process, name="BitNet")
+        if watcher.wait_ready(self.session, f"http://127.0.0.1:{self.port}/health", timeout=30):
+            print("✅ BitNet Loaded and Persistent.")
 
     def generate(self, prompt, n_predict=128, temp=0.7):
         """Sends a request to the persistent server."""
@@ -74,7 +69,7 @@ class BitNetController:
         }
         
         try:
-            response = requests.post(url, json=data, timeout=60)
+            response = self.session.post(url, json=data, timeout=60)
             if response.status_code == 200:
                 return response.json()["content"].strip()
             else:
@@ -1,11 +1,14 @@
 import subprocess
 import os
+import io
 import tempfile
 import soundfile as sf
 import numpy as np
 
+from backend.adapters.asr.whisper_server import WhisperServer, find_whisper_server
+
 class WhisperCPPController:
-    def __init__(self, model_path=None, whisper_cpp_path=None, threads=4):
+    def __init__(self, model_path=None, whisper_cpp_path=None, threads=4, use_server=True, port=8178):
         self.root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         
         if whisper_cpp_path:
@@ -22,8 +25,24 @@ class WhisperCPPController:
             
         self.threads = threads
 
+        # Keep the model resident in a whisper.cpp server when one is built
+        self.server = None
+        server_path = find_whisper_server(self.whisper_cpp_path) if use_server else None
+        if server_path:
+            server = WhisperServer(server_path, port=port)
+            if server.start(self.model_path, threads=threads):
+                self.server = server
+            else:
+                print("⚠️ whisper.cpp server failed to start, using whisper-cli per request.")
+
     def transcribe_path(self, wav_path):
         """Transcribes a wav file at the given path."""
+        if self.server and self.server.is_running():
+            try:
+                return self.server.transcribe(wav_path)
+            except Exception as e:
+                print(f"Whisper server error, falling back to CLI: {e}")
+
         try:
             command = [
                 self.cli_path,
@@ -52,10 +71,22 @@ class WhisperCPPController:
         Transcribes audio data using whisper-cli.
         audio_data: speech_recognition.AudioData object
         """
-        # Convert audio data to PCM 16kHz Mono (required by whisper.cpp)
-        pcm = np.frombuffer(audio_data.get_raw_data(), dtype=np.int16).astype(np.float32)
+        return self.transcribe_pcm(np.frombuffer(audio_data.get_raw_data(), dtype=np.int16))
+
+    def transcribe_pcm(self, pcm):
+        """Transcribes 16 kHz mono int16 PCM (e.g. from the streaming capture)."""
+        # Convert to float PCM 16kHz Mono (required by whisper.cpp)
+        pcm = np.asarray(pcm, dtype=np.int16).astype(np.float32)
         pcm /= 32768.0
 
+        if self.server and self.server.is_running():
+            try:
+                buf = io.BytesIO()
+                sf.write(buf, pcm, 16000, format="WAV")
+                return self.server.transcribe_bytes(buf.getvalue())
+            except Exception as e:
+                print(f"Whisper server error, falling back to CLI: {e}")
+
         with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
             sf.write(f.name, pcm, 16000)
             wav_path = f.name
@@ -94,6 +125,10 @@ class WhisperCPPController:
             if os.path.exists(wav_path):
                 os.remove(wav_path)
 
+    def __del__(self):
+        if getattr(self, "server", None):
+            self.server.stop()
+
 # Example usage:
 # controller = WhisperCPPController()
 # text = controller.transcribe(audio_data)
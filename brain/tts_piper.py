@@ -1,9 +1,11 @@
 import subprocess
 import os
-import shlex
+
+from backend.adapters.tts.piper_worker import PiperWorker, read_voice_sample_rate
+from backend.core.phrase_cache import PhraseAudioCache, DEFAULT_PHRASES
 
 class PiperTTSController:
-    def __init__(self, piper_exe=None, model_path=None):
+    def __init__(self, piper_exe=None, model_path=None, phrases=DEFAULT_PHRASES):
         # Default paths relative to MARK-2 root
         self.root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         
@@ -19,46 +21,45 @@ class PiperTTSController:
             # Look for voice model in MARK-2/voices/
             self.model_path = os.path.join(self.root_dir, "voices", "en_US-ryan-high.onnx")
 
+        # Keep one piper process (and the loaded voice) alive for all utterances
+        self.sample_rate = read_voice_sample_rate(self.model_path)
+        self.worker = PiperWorker(self.piper_exe, self.model_path)
+        try:
+            self.worker.start()
+        except Exception as e:
+            print(f"Error starting Piper worker: {e}")
+
+        # "Yes, sir?" and friends play straight from disk instead of being re-synthesized
+        self.voice = os.path.basename(self.model_path)
+        self.phrases = PhraseAudioCache(os.path.join(self.root_dir, "phrase_cache"))
+        try:
+            self.phrases.prerender(self.voice, self.sample_rate, phrases, self.worker.synthesize)
+        except Exception as e:
+            print(f"Error pre-rendering phrases: {e}")
+
     def speak(self, text):
         if not text:
             return
         print(f"🗣️ Jarvis: {text}")
-        
-        # We need to make sure the environment has the necessary libraries for piper
-        piper_dir = os.path.dirname(self.piper_exe)
-        env = os.environ.copy()
-        
-        # Add piper dir to LD_LIBRARY_PATH for its shared objects
-        if os.path.exists(piper_dir):
-            if "LD_LIBRARY_PATH" in env:
-                env["LD_LIBRARY_PATH"] = f"{piper_dir}:{env['LD_LIBRARY_PATH']}"
-            else:
-                env["LD_LIBRARY_PATH"] = piper_dir
 
         try:
-            # 1. Start Piper process
-            piper_cmd = [
-                self.piper_exe,
-                "--model", self.model_path,
-                "--output_raw"
-            ]
-            
-            # 2. Start aplay process
+            pcm = self.phrases.get(self.voice, self.sample_rate, text) or self.worker.synthesize(text)
+            if not pcm:
+                return
+
             aplay_cmd = [
                 "aplay",
-                "-r", "22050",
+                "-r", str(self.sample_rate),
                 "-f", "S16_LE",
                 "-t", "raw",
                 "-"
             ]
-
-            # Chain them together
-            p1 = subprocess.Popen(piper_cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=env)
-            p2 = subprocess.Popen(aplay_cmd, stdin=p1.stdout, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            
-            p1.stdout.close()
-            p1.communicate(input=text.encode('utf-8'))
-            p2.wait()
+            player = subprocess.Popen(aplay_cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            player.communicate(input=pcm)
 
         except Exception as e:
             print(f"Error in Piper TTS: {e}")
+
+    def __del__(self):
+        if getattr(self, "worker", None):
+            self.worker.close()
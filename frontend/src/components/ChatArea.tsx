@@ -21,6 +21,7 @@ import {
 import ReactMarkdown from "react-markdown";
 import remarkGfm from "remark-gfm";
 import type { Message, AppSettings, AppStatus } from "@/types";
+import type { AudioStreamHandlers } from "@/hooks/useAudioStream";
 import { toast } from "sonner";
 import axios from "axios";
 
@@ -39,6 +40,7 @@ interface ChatAreaProps {
   onClearChat: () => void;
   onToggleMic?: (active: boolean) => void;
   isMicOpen?: boolean;
+  onStartVoiceStream?: (handlers: AudioStreamHandlers) => Promise<(() => void) | null>;
 }
 
 const StatusDot = ({ status }: { status: AppStatus }) => {
@@ -183,12 +185,14 @@ const ChatArea = ({
   onClearChat,
   onToggleMic,
   isMicOpen,
+  onStartVoiceStream,
 }: ChatAreaProps) => {
   const [input, setInput] = useState("");
   const [isRecording, setIsRecording] = useState(false);
   const [attachments, setAttachments] = useState<File[]>([]);
   const mediaRecorderRef = useRef<MediaRecorder | null>(null);
   const audioChunksRef = useRef<Blob[]>([]);
+  const stopVoiceStreamRef = useRef<(() => void) | null>(null);
   const audioPlayerRef = useRef<HTMLAudioElement | null>(null);
   const audioContextRef = useRef<AudioContext | null>(null);
   const fileInputRef = useRef<HTMLInputElement>(null);
@@ -253,6 +257,10 @@ const ChatArea = ({
   };
 
   const stopRecording = useCallback(() => {
+    if (stopVoiceStreamRef.current) {
+      stopVoiceStreamRef.current();
+      stopVoiceStreamRef.current = null;
+    }
     if (mediaRecorderRef.current && mediaRecorderRef.current.state !== "inactive") {
       mediaRecorderRef.current.stop();
     }
@@ -273,6 +281,35 @@ const ChatArea = ({
       return;
     }
 
+    if (onStartVoiceStream) {
+      // Stream PCM while speaking; partial transcripts fill the input box
+      const stop = await onStartVoiceStream({
+        onPartial: (text) => setInput(text),
+        onFinal: (text, timedOut) => {
+          stopVoiceStreamRef.current = null;
+          setInput("");
+          setIsRecording(false);
+          onToggleMic?.(false);
+          if (!text) toast.error(timedOut ? "No speech detected." : "Could not understand audio.");
+        },
+        onError: (text) => {
+          stopVoiceStreamRef.current = null;
+          setIsRecording(false);
+          onToggleMic?.(false);
+          toast.error(text);
+        },
+      });
+      if (!stop) {
+        toast.error("Microphone access denied.");
+        return;
+      }
+      stopVoiceStreamRef.current = stop;
+      setIsRecording(true);
+      onToggleMic?.(true);
+      toast.success("Listening...");
+      return;
+    }
+
     try {
       const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
       const recorder = new MediaRecorder(stream);
@@ -19,6 +19,9 @@ export const settingsConfig: Record<string, { title: string; fields: Array<{ lab
       { label: "Top P", type: "slider", description: "Nucleus sampling threshold.", min: 0, max: 1, step: 0.05, defaultValue: 1, advanced: true },
       { label: "Frequency Penalty", type: "slider", description: "Reduces repetition of token sequences.", min: 0, max: 2, step: 0.1, defaultValue: 0, advanced: true },
       { label: "Stream Responses", type: "toggle", description: "Display responses as they are generated.", defaultValue: true, advanced: true },
+      { label: "Response Cache", type: "toggle", description: "Reuse earlier answers to identical questions instead of regenerating them.", defaultValue: false, advanced: true },
+      { label: "Parallel Slots", type: "slider", description: "Requests llama.cpp / BitNet serve at once with continuous batching. Each slot holds its own KV cache.", min: 1, max: 8, step: 1, defaultValue: 1, advanced: true },
+      { label: "Latency Budget (ms)", type: "slider", description: "With routing enabled, send turns to the fast model while the main model is slower than this (0 = off).", min: 0, max: 10000, step: 250, defaultValue: 0, advanced: true },
     ],
   },
   asr: {
@@ -36,6 +39,10 @@ export const settingsConfig: Record<string, { title: string; fields: Array<{ lab
       { label: "Enabled", type: "toggle", description: "Enable automatic speech recognition.", defaultValue: true },
       { label: "Silence Detection", type: "toggle", description: "Automatically detect end of speech.", defaultValue: true, advanced: true },
       { label: "Noise Suppression", type: "toggle", description: "Filter background noise.", defaultValue: false, advanced: true },
+      { label: "Beam Size", type: "slider", description: "Decoding beams (Faster-Whisper). Lower is faster, higher is more accurate.", min: 1, max: 10, step: 1, defaultValue: 5, advanced: true },
+      { label: "Compute Type", type: "select", description: "Weight precision (Faster-Whisper).", options: ["auto", "int8", "int8_float16", "float16", "float32"], defaultValue: "auto", advanced: true },
+      { label: "Batch Size", type: "slider", description: "Audio chunks decoded together for long recordings (Faster-Whisper). Only applies with Silence Detection on, which splits the audio into chunks.", min: 1, max: 32, step: 1, defaultValue: 8, advanced: true },
+      { label: "Workers", type: "slider", description: "Transcriptions that can run at the same time (Faster-Whisper).", min: 1, max: 8, step: 1, defaultValue: 2, advanced: true },
     ],
   },
   tts: {
@@ -0,0 +1,42 @@
+import { useRef, useCallback } from 'react';
+
+const base64ToUrl = (audioData: string) => {
+  const byteCharacters = atob(audioData);
+  const byteArray = new Uint8Array(byteCharacters.length);
+  for (let i = 0; i < byteCharacters.length; i++) {
+    byteArray[i] = byteCharacters.charCodeAt(i);
+  }
+  return URL.createObjectURL(new Blob([byteArray], { type: 'audio/wav' }));
+};
+
+// Plays base64 WAV chunks back-to-back in the order they were enqueued
+export const useAudioQueue = () => {
+  const queueRef = useRef<string[]>([]);
+  const playingRef = useRef(false);
+
+  const playNext = useCallback(() => {
+    const url = queueRef.current.shift();
+    if (!url) {
+      playingRef.current = false;
+      return;
+    }
+    playingRef.current = true;
+    const audio = new Audio(url);
+    audio.onended = () => {
+      URL.revokeObjectURL(url);
+      playNext();
+    };
+    audio.play().catch((e) => {
+      console.error("❌ Audio playback failed:", e);
+      URL.revokeObjectURL(url);
+      playNext();
+    });
+  }, []);
+
+  const enqueue = useCallback((audioData: string) => {
+    queueRef.current.push(base64ToUrl(audioData));
+    if (!playingRef.current) playNext();
+  }, [playNext]);
+
+  return { enqueue };
+};
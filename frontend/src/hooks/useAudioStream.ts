@@ -0,0 +1,134 @@
+import { useRef, useCallback } from 'react';
+
+const WS_BASE = `${window.location.protocol === "https:" ? "wss:" : "ws:"}//${window.location.host}`;
+const TARGET_RATE = 16000;
+
+export interface AudioStreamHandlers {
+  onSpeechStart?: () => void;
+  onPartial?: (text: string) => void;
+  onFinal?: (text: string, timedOut?: boolean) => void;
+  onError?: (text: string) => void;
+  // Reply frames (tokens, audio chunks, final payload) for the transcript's chat turn
+  onMessage?: (data: any) => void;
+}
+
+export interface AudioStreamOptions {
+  sessionId?: string;
+  speakResponse?: boolean;
+}
+
+const floatTo16BitPCM = (input: Float32Array) => {
+  const output = new Int16Array(input.length);
+  for (let i = 0; i < input.length; i++) {
+    const s = Math.max(-1, Math.min(1, input[i]));
+    output[i] = s < 0 ? s * 0x8000 : s * 0x7fff;
+  }
+  return output;
+};
+
+// Streams microphone PCM to /ws/audio while the user speaks; the server runs VAD and
+// incremental recognition and hands the final transcript straight to the chat pipeline.
+export const useAudioStream = () => {
+  const socketRef = useRef<WebSocket | null>(null);
+  const contextRef = useRef<AudioContext | null>(null);
+  const mediaRef = useRef<MediaStream | null>(null);
+  const processorRef = useRef<ScriptProcessorNode | null>(null);
+
+  const stopCapture = useCallback(() => {
+    processorRef.current?.disconnect();
+    processorRef.current = null;
+    mediaRef.current?.getTracks().forEach((track) => track.stop());
+    mediaRef.current = null;
+    contextRef.current?.close();
+    contextRef.current = null;
+  }, []);
+
+  // Ends the utterance now (push-to-talk release) instead of waiting for the server's VAD
+  const stop = useCallback(() => {
+    stopCapture();
+    if (socketRef.current?.readyState === WebSocket.OPEN) {
+      socketRef.current.send(JSON.stringify({ type: "end" }));
+    }
+  }, [stopCapture]);
+
+  const start = useCallback(async (options: AudioStreamOptions, handlers: AudioStreamHandlers) => {
+    let media: MediaStream;
+    try {
+      media = await navigator.mediaDevices.getUserMedia({
+        audio: { channelCount: 1, echoCancellation: true, noiseSuppression: true },
+      });
+    } catch (e) {
+      return null;
+    }
+    socketRef.current?.close();
+    mediaRef.current = media;
+
+    // The browser resamples the capture to 16 kHz, so frames go out as-is
+    const context = new AudioContext({ sampleRate: TARGET_RATE });
+    contextRef.current = context;
+
+    const socket = new WebSocket(`${WS_BASE}/ws/audio`);
+    socketRef.current = socket;
+
+    socket.onopen = () => {
+      socket.send(JSON.stringify({
+        type: "start",
+        sample_rate: context.sampleRate,
+        session_id: options.sessionId,
+        speak_response: options.speakResponse,
+        chat: true,
+      }));
+
+      const source = context.createMediaStreamSource(media);
+      const processor = context.createScriptProcessor(2048, 1, 1);
+      processor.onaudioprocess = (e) => {
+        if (socket.readyState === WebSocket.OPEN) {
+          socket.send(floatTo16BitPCM(e.inputBuffer.getChannelData(0)).buffer);
+        }
+      };
+      source.connect(processor);
+      processor.connect(context.destination);
+      processorRef.current = processor;
+    };
+
+    socket.onmessage = (event) => {
+      const data = JSON.parse(event.data);
+      switch (data.type) {
+        case "speech_start":
+          handlers.onSpeechStart?.();
+          break;
+        case "transcript_partial":
+          handlers.onPartial?.(data.text);
+          break;
+        case "transcript_final":
+          stopCapture();
+          handlers.onFinal?.(data.text, data.timeout);
+          if (!data.text) socket.close();
+          break;
+        case "error":
+          stopCapture();
+          handlers.onError?.(data.text);
+          socket.close();
+          break;
+        default:
+          handlers.onMessage?.(data);
+          // The final reply payload ends the voice turn
+          if (data.sender === "Jarvis" && !data.type) socket.close();
+      }
+    };
+
+    socket.onerror = () => {
+      stopCapture();
+      handlers.onError?.("Audio connection failed.");
+    };
+
+    socket.onclose = () => {
+      stopCapture();
+      if (socketRef.current === socket) socketRef.current = null;
+    };
+
+    return stop;
+  }, [stop, stopCapture]);
+
+  return { start, stop };
+};
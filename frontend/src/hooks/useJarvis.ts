@@ -88,9 +88,9 @@ export const useJarvis = (settings: AppSettings) => {
     };
   }, [fetchSystemData, connectWS]);
 
-  const sendMessage = useCallback((text: string, speakResponse: boolean = false) => {
+  const sendMessage = useCallback((text: string, speakResponse: boolean = false, sessionId?: string) => {
     if (ws.current?.readyState === WebSocket.OPEN) {
-      ws.current.send(JSON.stringify({ text, speak_response: speakResponse }));
+      ws.current.send(JSON.stringify({ text, speak_response: speakResponse, session_id: sessionId }));
       return true;
     }
     console.error("Cannot send message: WebSocket is not open");
@@ -108,9 +108,9 @@ export const useJarvis = (settings: AppSettings) => {
     }
   };
 
-  const clearMemory = async () => {
+  const clearMemory = async (sessionId?: string) => {
     try {
-      await axios.post(`${API_BASE}/api/memory/clear`);
+      await axios.post(`${API_BASE}/api/memory/clear`, { session_id: sessionId });
     } catch (e) {}
   };
 
@@ -139,6 +139,11 @@ export const useJarvis = (settings: AppSettings) => {
     messageHandlerRef.current = callback;
   }, []);
 
+  // Routes frames that arrive on other sockets (e.g. /ws/audio replies) to the chat handler
+  const dispatchMessage = useCallback((data: any) => {
+    messageHandlerRef.current?.(data);
+  }, []);
+
   return {
     status,
     specs,
@@ -150,6 +155,7 @@ export const useJarvis = (settings: AppSettings) => {
     clearMemory,
     installProvider,
     downloadModel,
-    setOnMessage
+    setOnMessage,
+    dispatchMessage
   };
 };
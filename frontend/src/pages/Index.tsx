@@ -5,6 +5,8 @@ import ChatArea from "@/components/ChatArea";
 import SettingsPanel from "@/components/SettingsPanel";
 import { settingsConfig } from "@/config/settingsConfig";
 import { useJarvis } from "@/hooks/useJarvis";
+import { useAudioQueue } from "@/hooks/useAudioQueue";
+import { useAudioStream, type AudioStreamHandlers } from "@/hooks/useAudioStream";
 import type { Conversation, Message, AppSettings, AppStatus } from "@/types";
 import { toast } from "sonner";
 
@@ -35,6 +37,9 @@ const Index = () => {
   const [isGenerating, setIsGenerating] = useState(false);
   const [isMicOpen, setIsMicOpen] = useState(false);
   const [settings, setSettings] = useState<AppSettings>(defaultSettings);
+  const streamingMsgIdRef = useRef<string | null>(null);
+  const { enqueue: enqueueAudio } = useAudioQueue();
+  const { start: startAudioStream } = useAudioStream();
   
   const { 
     status, 
@@ -45,6 +50,7 @@ const Index = () => {
     sendMessage, 
     clearMemory, 
     setOnMessage, 
+    dispatchMessage,
     loadModel, 
     installProvider,
     downloadModel
@@ -58,28 +64,68 @@ const Index = () => {
     setOnMessage((data: any) => {
       if (data.type === "wake_word_detected") {
         toast.success(data.text);
+        if (data.audio) enqueueAudio(data.audio);
         setIsMicOpen(true);
         return;
       }
 
+      if (data.sender === "Jarvis" && data.type === "audio_chunk") {
+        enqueueAudio(data.audio);
+        return;
+      }
+
+      if (data.sender === "Jarvis" && data.type === "token") {
+        // Grow a single in-progress message while tokens stream in
+        if (!streamingMsgIdRef.current) {
+          const streamMsg: Message = {
+            id: generateId(),
+            role: "assistant",
+            content: "",
+            timestamp: Date.now(),
+          };
+          streamingMsgIdRef.current = streamMsg.id;
+          setConversations((prev) =>
+            prev.map((c) =>
+              c.id === activeConversationId ? { ...c, messages: [...c.messages, streamMsg] } : c
+            )
+          );
+        }
+        const streamId = streamingMsgIdRef.current;
+        setConversations((prev) =>
+          prev.map((c) =>
+            c.id === activeConversationId
+              ? { ...c, messages: c.messages.map((m) => (m.id === streamId ? { ...m, content: m.content + data.text } : m)) }
+              : c
+          )
+        );
+        return;
+      }
+
       if (data.sender === "Jarvis") {
         const aiMsg: Message = {
-          id: generateId(),
+          id: streamingMsgIdRef.current ?? generateId(),
           role: "assistant",
           content: data.text,
           timestamp: Date.now(),
           tokenCount: Math.ceil(data.text.length / 4),
         };
+        const streamId = streamingMsgIdRef.current;
+        streamingMsgIdRef.current = null;
         
         setConversations((prev) =>
-          prev.map((c) =>
-            c.id === activeConversationId ? { ...c, messages: [...c.messages, aiMsg] } : c
-          )
+          prev.map((c) => {
+            if (c.id !== activeConversationId) return c;
+            // Replace the streamed draft with the final text
+            if (streamId) {
+              return { ...c, messages: c.messages.map((m) => (m.id === streamId ? aiMsg : m)) };
+            }
+            return { ...c, messages: [...c.messages, aiMsg] };
+          })
         );
         setIsGenerating(false);
       }
     });
-  }, [activeConversationId, setOnMessage]);
+  }, [activeConversationId, setOnMessage, enqueueAudio]);
 
   const createConversation = useCallback((firstMessage?: Message): string => {
     const id = generateId();
@@ -129,11 +175,53 @@ const Index = () => {
       }
 
       setIsGenerating(true);
-      sendMessage(content, speakResponse);
+      // Each conversation keeps its own memory on the backend
+      sendMessage(content, speakResponse, convId ?? undefined);
     },
     [activeConversationId, conversations, createConversation, sendMessage]
   );
 
+  const handleStartVoiceStream = useCallback(
+    (handlers: AudioStreamHandlers) => {
+      // The conversation id doubles as the backend memory session, so it must exist up front
+      let convId = activeConversationId;
+      if (!convId || !conversations.find((c) => c.id === convId)) {
+        convId = createConversation();
+      }
+      const sessionId = convId;
+
+      return startAudioStream({ sessionId, speakResponse: true }, {
+        ...handlers,
+        onFinal: (text, timedOut) => {
+          handlers.onFinal?.(text, timedOut);
+          if (!text) return;
+          // The backend already handed the transcript to the LLM; just show it
+          const userMsg: Message = {
+            id: generateId(),
+            role: "user",
+            content: text,
+            timestamp: Date.now(),
+            tokenCount: Math.ceil(text.split(/\s+/).length * 1.3),
+          };
+          setConversations((prev) =>
+            prev.map((c) =>
+              c.id === sessionId
+                ? {
+                    ...c,
+                    messages: [...c.messages, userMsg],
+                    title: c.messages.length === 0 ? generateTitle(text) : c.title,
+                  }
+                : c
+            )
+          );
+          setIsGenerating(true);
+        },
+        onMessage: dispatchMessage,
+      });
+    },
+    [activeConversationId, conversations, createConversation, startAudioStream, dispatchMessage]
+  );
+
   const handleStopGenerating = useCallback(() => {
     setIsGenerating(false);
   }, []);
@@ -223,7 +311,7 @@ const Index = () => {
 
   const handleClearChat = useCallback(() => {
     if (!activeConversationId) return;
-    clearMemory();
+    clearMemory(activeConversationId);
     setConversations((prev) =>
       prev.map((c) => (activeConversationId === c.id ? { ...c, messages: [] } : c))
     );
@@ -289,6 +377,7 @@ const Index = () => {
           onClearChat={handleClearChat}
           isMicOpen={isMicOpen}
           onToggleMic={setIsMicOpen}
+          onStartVoiceStream={handleStartVoiceStream}
         />
       ) : (
         <SettingsPanel
@@ -5,10 +5,12 @@ import gc
 import speech_recognition as sr
 import numpy as np
 
-from wake import wait_for_wake_word, init_wake_word_engine
+from wake import WakeWordListener, init_wake_word_engine
 from brain.bitnet_controller import BitNetController
 from brain.stt_whisper import WhisperCPPController
 from brain.tts_piper import PiperTTSController
+from backend.core.vad import SpeechSegmenter, create_vad
+from backend.core.streaming_asr import BufferedStream, transcribe_utterance
 
 # ---------------- CONFIG ----------------
 
@@ -29,6 +31,31 @@ def clean_llm_output(text):
     sentences = re.split(r'(?<=[.!?])\s+', clean)
     return sentences[0] if sentences else clean
 
+def listen_streaming(wake_listener, stt, frames):
+    """
+    Captures the command from the microphone the wake-word listener already has open,
+    reading the frames queue subscribed to at the wake word.
+    The VAD ends the utterance ~0.6 s after the user stops talking, instead of waiting
+    out speech_recognition's phrase detection.
+    """
+    try:
+        print("🎙️ Listening...")
+        segmenter = SpeechSegmenter(create_vad(), sample_rate=wake_listener.sample_rate, max_speech_s=10, no_speech_timeout_s=5)
+        return transcribe_utterance(frames, segmenter, BufferedStream(stt.transcribe_pcm))
+    finally:
+        wake_listener.unsubscribe(frames)
+
+def listen_with_recognizer(recognizer, stt):
+    """Fallback when no wake-word engine owns the microphone."""
+    with sr.Microphone(sample_rate=SAMPLE_RATE) as source:
+        try:
+            print("🎙️ Listening...")
+            audio = recognizer.listen(source, timeout=5, phrase_time_limit=10)
+        except sr.WaitTimeoutError:
+            return None
+    print("📝 Transcribing...")
+    return stt.transcribe(audio)
+
 # ---------------- MAIN LOOP ----------------
 
 def main():
@@ -39,6 +66,10 @@ def main():
     stt = WhisperCPPController()
     tts = PiperTTSController()
     wake_engine = init_wake_word_engine()
+    # Opens the microphone once and keeps listening between turns
+    wake_listener = WakeWordListener(wake_engine) if wake_engine else None
+    if wake_listener:
+        wake_listener.start()
 
     recognizer = sr.Recognizer()
     recognizer.energy_threshold = 300
@@ -48,44 +79,55 @@ def main():
 
     try:
         while True:
-            if wake_engine:
-                wait_for_wake_word(wake_engine)
-            
-            tts.speak("Yes, sir?")
-            
-            with sr.Microphone(sample_rate=SAMPLE_RATE) as source:
+            frames = None
+            if wake_listener:
+                wake_listener.clear()
                 try:
-                    print("🎙️ Listening...")
-                    audio = recognizer.listen(source, timeout=5, phrase_time_limit=10)
-                    
-                    print("📝 Transcribing...")
-                    text = stt.transcribe(audio)
-
-                    if not text or len(text) < 2:
-                        continue
-
-                    print(f"👤 You: {text}")
-                    
-                    # Generate Response
-                    prompt = f"{AGENT_SYSTEM_PROMPT}\nUser: {text}\nJarvis:"
-                    print("🧠 Thinking...")
-                    response = llm.generate(prompt, n_predict=64, temp=0.7)
-                    
-                    final_speech = clean_llm_output(response)
-                    
-                    if final_speech:
-                        tts.speak(final_speech)
-                    else:
-                        tts.speak("I'm here, sir.")
-
-                except sr.WaitTimeoutError:
+                    event = wake_listener.wait()
+                except RuntimeError as e:
+                    # The listener already retried with backoff; wait longer before reopening the microphone
+                    print(f"❌ {e}, retrying in 60s")
+                    time.sleep(60)
+                    wake_listener.start()
                     continue
-                except Exception as e:
-                    print(f"❌ Error: {e}")
+                # Subscribe before answering, so what was said between the wake word and the reply is kept
+                frames = wake_listener.subscribe(from_frame=event["frame"])
+                # ...but not the reply itself, which the microphone hears too
+                with wake_listener.mute():
+                    tts.speak("Yes, sir?")
+            else:
+                tts.speak("Yes, sir?")
+            
+            try:
+                if wake_listener:
+                    text = listen_streaming(wake_listener, stt, frames)
+                else:
+                    text = listen_with_recognizer(recognizer, stt)
+
+                if not text or len(text) < 2:
+                    continue
+
+                print(f"👤 You: {text}")
+                
+                # Generate Response
+                prompt = f"{AGENT_SYSTEM_PROMPT}\nUser: {text}\nJarvis:"
+                print("🧠 Thinking...")
+                response = llm.generate(prompt, n_predict=64, temp=0.7)
+                
+                final_speech = clean_llm_output(response)
+                
+                if final_speech:
+                    tts.speak(final_speech)
+                else:
+                    tts.speak("I'm here, sir.")
+
+            except Exception as e:
+                print(f"❌ Error: {e}")
 
     except KeyboardInterrupt:
         print("\nStopping...")
     finally:
+        if wake_listener: wake_listener.stop()
         if wake_engine: wake_engine.delete()
         gc.collect()
 
@@ -1,4 +1,11 @@
 import os
+import time
+import queue
+import asyncio
+import threading
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
 from dotenv import load_dotenv
 import pvporcupine
 from pvrecorder import PvRecorder
@@ -27,6 +34,182 @@ def init_wake_word_engine():
         print(f"❌ Wake word engine init failed: {e}")
         return None
 
+class WakeWordListener:
+    """
+    Owns the microphone for the life of the process. A capture thread reads frames into a
+    ring buffer, runs the wake-word engine on each one and publishes detection events
+    (with the buffered pre-roll audio) to an asyncio queue, or to a plain queue for sync callers.
+    Other consumers can subscribe to the same frame stream, so the command that follows
+    the wake word is captured without reopening the device.
+    If the microphone fails, capture restarts with exponential backoff; after max_restarts
+    failures in a row the error is published, and waiters raise RuntimeError.
+    """
+
+    def __init__(self, porcupine_instance, preroll_seconds=1.5, device_index=-1, max_restarts=5):
+        self.porcupine = porcupine_instance
+        self.device_index = device_index
+        self.sample_rate = porcupine_instance.sample_rate
+        self.frame_length = porcupine_instance.frame_length
+        frames = max(1, int(preroll_seconds * self.sample_rate / self.frame_length))
+        self.ring = deque(maxlen=frames)
+        self.frames_read = 0 # Index of the next frame captured
+        self.max_restarts = max_restarts
+        self.error = None
+        self.subscribers = []
+        self.subscribers_lock = threading.Lock()
+        self.muted = False
+        self.detections = queue.Queue()
+        self.loop = None
+        self.async_detections = None
+        self.running = False
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def attach(self, loop):
+        """Publishes detections to an asyncio queue on the given loop instead of the sync queue."""
+        self.loop = loop
+        self.async_detections = asyncio.Queue()
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.stopped.clear()
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name="wake-word-capture", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.stopped.set()
+        if self.thread:
+            self.thread.join(timeout=2)
+            self.thread = None
+
+    def wait(self, timeout=None):
+        """Blocks until the next detection; returns the event, or None on timeout."""
+        try:
+            event = self.detections.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if "error" in event:
+            raise RuntimeError(f"Wake word capture stopped: {event['error']}")
+        return event
+
+    def clear(self):
+        """Drops detections that happened while the caller was busy (e.g. during a reply)."""
+        while not self.detections.empty():
+            self.detections.get_nowait()
+
+    async def next_detection(self):
+        event = await self.async_detections.get()
+        if "error" in event:
+            raise RuntimeError(f"Wake word capture stopped: {event['error']}")
+        return event
+
+    def subscribe(self, include_preroll=False, from_frame=None):
+        """
+        Returns a queue that receives every following int16 frame until unsubscribe().
+        include_preroll replays the buffered frames first; from_frame (a detection's "frame")
+        replays only those captured since then, so nothing said after the wake word is lost.
+        """
+        frames = queue.Queue()
+        with self.subscribers_lock:
+            if include_preroll or from_frame is not None:
+                first = self.frames_read - len(self.ring)
+                for i, frame in enumerate(list(self.ring)):
+                    if from_frame is None or first + i >= from_frame:
+                        frames.put(frame)
+            self.subscribers.append(frames)
+        return frames
+
+    @contextmanager
+    def mute(self):
+        """
+        Subscribers get no frames while this is held, e.g. while our own speech plays: without
+        echo cancellation the microphone would hand it to the VAD as the user talking.
+        Wake-word detection keeps running.
+        """
+        self.muted = True
+        try:
+            yield
+        finally:
+            self.muted = False
+
+    def unsubscribe(self, frames):
+        with self.subscribers_lock:
+            if frames in self.subscribers:
+                self.subscribers.remove(frames)
+
+    def _publish(self, event):
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.async_detections.put_nowait, event)
+        else:
+            self.detections.put(event)
+
+    def _run(self):
+        delay = 1.0
+        failures = 0
+        while self.running:
+            started = time.monotonic()
+            try:
+                self._capture()
+            except Exception as e:
+                self.error = str(e)
+                if time.monotonic() - started > 60:
+                    # It had been working for a while; this is a fresh failure, not a crash loop
+                    delay, failures = 1.0, 0
+                failures += 1
+                if failures > self.max_restarts:
+                    print(f"❌ Wake word capture stopped: {e}")
+                    self.running = False
+                    self._publish({"time": time.time(), "error": self.error})
+                    return
+                print(f"⚠️ Wake word capture failed ({e}), restarting in {delay:.0f}s")
+                self.stopped.wait(delay)
+                delay = min(delay * 2, 30.0)
+
+    def _capture(self):
+        recorder = PvRecorder(device_index=self.device_index, frame_length=self.frame_length)
+        try:
+            recorder.start()
+            print("🟢 Listening for 'Jarvis'...")
+            while self.running:
+                pcm = recorder.read()
+                frame = np.asarray(pcm, dtype=np.int16)
+                with self.subscribers_lock:
+                    self.ring.append(frame)
+                    self.frames_read += 1
+                    if not self.muted:
+                        for frames in self.subscribers:
+                            frames.put(frame)
+                if self.porcupine.process(pcm) >= 0:
+                    print("🟢 Wake word detected")
+                    self._publish({
+                        "time": time.time(),
+                        "sample_rate": self.sample_rate,
+                        "frame": self.frames_read,
+                        "preroll": np.concatenate(list(self.ring))
+                    })
+        finally:
+            try:
+                recorder.stop()
+            except Exception:
+                pass
+            recorder.delete()
+
+
+_listeners = {}
+
+def get_wake_word_listener(porcupine_instance):
+    """One running listener per engine instance, shared by every caller."""
+    listener = _listeners.get(id(porcupine_instance))
+    if listener is None or not listener.running:
+        listener = WakeWordListener(porcupine_instance)
+        listener.start()
+        _listeners[id(porcupine_instance)] = listener
+    return listener
+
 def wait_for_wake_word(porcupine_instance):
     """
     Waits for the wake word.
@@ -34,20 +217,5 @@ def wait_for_wake_word(porcupine_instance):
     if porcupine_instance is None:
         return True # Fallback to always active if no engine
 
-    recorder = PvRecorder(
-        device_index=-1,
-        frame_length=porcupine_instance.frame_length
-    )
-    recorder.start()
-
-    print("🟢 Listening for 'Jarvis'...")
-
-    try:
-        while True:
-            pcm = recorder.read()
-            if porcupine_instance.process(pcm) >= 0:
-                print("🟢 Wake word detected")
-                return True
-    finally:
-        recorder.stop()
-        recorder.delete()
+    get_wake_word_listener(porcupine_instance).wait()
+    return True